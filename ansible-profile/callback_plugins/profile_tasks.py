@@ -22,62 +22,248 @@
 '''
 A plugin for timing tasks
 
-This plugin records the time spent in each task.
-At the end of the playbook, it displays the time spent in the 10 slowest tasks.
+This plugin records when each task starts and ends on each host, keyed by the
+task's UUID so that tasks with the same name are told apart. At the end of the
+playbook, it displays the slowest tasks with percentiles of their duration
+across hosts, and optionally writes:
+
+- a Chrome trace (PROFILE_TASKS_TRACE=<path>), with a row per host, that can be
+  loaded in chrome://tracing or https://ui.perfetto.dev;
+- a CSV summary of every task (PROFILE_TASKS_CSV=<path>).
+
+The trace is written as results come in and only a bounded sample of the
+durations of each task is kept for the percentiles, so memory does not grow
+with the number of hosts times the number of tasks on long runs.
 '''
 
+import csv
+import json
+import math
+import os
+import random
 import time
 
+from ansible.plugins.callback import CallbackBase
+
+
+# Number of tasks displayed at the end of the playbook
+DEFAULT_LIMIT = 10
+# Number of durations kept per task to estimate the percentiles
+DEFAULT_SAMPLES = 200
+PERCENTILES = (50, 90, 99)
+CSV_FIELDS = ('task', 'path', 'hosts', 'total', 'mean', 'p50', 'p90', 'p99', 'max', 'max_host')
+
+
+def percentile(sorted_values, pct):
+    """Return the nearest-rank percentile of a sorted list of values."""
+    if not sorted_values:
+        return 0.0
+    rank = int(math.ceil(pct / 100.0 * len(sorted_values))) - 1
+    return sorted_values[max(0, min(rank, len(sorted_values) - 1))]
+
+
+class TaskStats(object):
+    """Durations of a task on all hosts, with a fixed-size random sample of them for the percentiles."""
+
+    # the running totals and the sample of a task are plain attributes, as they are
+    # updated for every host of every task
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, name, path, max_samples=DEFAULT_SAMPLES, rand=None):
+        self.name = name
+        self.path = path
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.max_host = None
+        self.samples = []
+        self.max_samples = max_samples
+        self.rand = rand or random.Random()
+
+    def add(self, host, duration):
+        """Record the duration of the task on a host."""
+        self.count += 1
+        self.total += duration
+        if self.max_host is None or duration > self.max:
+            self.max = duration
+            self.max_host = host
+        # reservoir sampling: every duration has the same chance to be in the sample
+        if len(self.samples) < self.max_samples:
+            self.samples.append(duration)
+        else:
+            index = self.rand.randint(0, self.count - 1)
+            if index < self.max_samples:
+                self.samples[index] = duration
+
+    def summary(self):
+        """Return a dict with the name, path, host count, total, mean, percentiles and maximum of the task."""
+        samples = sorted(self.samples)
+        summary = {
+            'task': self.name,
+            'path': self.path,
+            'hosts': self.count,
+            'total': self.total,
+            'mean': self.total / self.count if self.count else 0.0,
+            'max': self.max,
+            'max_host': self.max_host,
+        }
+        for pct in PERCENTILES:
+            summary['p{}'.format(pct)] = percentile(samples, pct)
+        return summary
+
+
+class ChromeTrace(object):
+    """Writes complete events to a file in the Chrome trace event format, as they are added."""
+
+    def __init__(self, outfile):
+        self.outfile = outfile
+        self.threads = {}
+        self.outfile.write('[\n')
+        self.first = True
+
+    def _write(self, event):
+        self.outfile.write(('' if self.first else ',\n') + json.dumps(event, sort_keys=True))
+        self.first = False
+
+    def thread_id(self, host):
+        """Return the trace thread (row) of a host, naming it the first time it is seen."""
+        if host not in self.threads:
+            self.threads[host] = len(self.threads) + 1
+            self._write({'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': self.threads[host],
+                         'args': {'name': host}})
+        return self.threads[host]
+
+    # pylint: disable=too-many-arguments
+    def add(self, host, name, start, end, status):
+        """Add a task that ran on a host between the start and end timestamps (in seconds)."""
+        self._write({
+            'name': name,
+            'cat': 'task',
+            'ph': 'X',
+            'ts': int(start * 1000000),
+            'dur': int((end - start) * 1000000),
+            'pid': 1,
+            'tid': self.thread_id(host),
+            'args': {'host': host, 'status': status},
+        })
+
+    def close(self):
+        """Terminate the JSON array and close the file."""
+        self.outfile.write('\n]\n')
+        self.outfile.close()
+
 
-class CallbackModule(object):
+def write_csv(outfile, summaries):
+    """Write a CSV with a row per task summary."""
+    writer = csv.writer(outfile)
+    writer.writerow(CSV_FIELDS)
+    for summary in summaries:
+        writer.writerow([
+            '{:.3f}'.format(summary[field]) if isinstance(summary[field], float) else summary[field]
+            for field in CSV_FIELDS
+        ])
+
+
+def slowest_tasks(tasks, limit=None):
+    """Return the summaries of tasks, ordered by the longest time any host spent in them."""
+    summaries = [stats.summary() for stats in tasks if stats.count]
+    summaries.sort(key=lambda summary: (-summary['max'], -summary['total']))
+    return summaries[:limit] if limit else summaries
+
+
+class CallbackModule(CallbackBase):
     """
     A plugin for timing tasks
     """
+    CALLBACK_VERSION = 2.0
+    CALLBACK_TYPE = 'aggregate'
+    CALLBACK_NAME = 'profile_tasks'
+    CALLBACK_NEEDS_WHITELIST = True
+
     def __init__(self):
-        self.stats = {}
-        self.current = None
+        super(CallbackModule, self).__init__()
+        self.limit = int(os.environ.get('PROFILE_TASKS_LIMIT', DEFAULT_LIMIT))
+        self.max_samples = int(os.environ.get('PROFILE_TASKS_SAMPLES', DEFAULT_SAMPLES))
+        self.csv_path = os.environ.get('PROFILE_TASKS_CSV')
+        trace_path = os.environ.get('PROFILE_TASKS_TRACE')
+        self.trace = ChromeTrace(open(trace_path, 'w')) if trace_path else None
+        # Stats of each task, by task UUID
+        self.tasks = {}
+        self.task_start = {}
+        # Start time of the tasks still running, by (task UUID, host)
+        self.running = {}
+
+    def _task_started(self, task):
+        uuid = task._uuid  # pylint: disable=protected-access; no public API for it
+        if uuid not in self.tasks:
+            self.tasks[uuid] = TaskStats(task.get_name().strip(), task.get_path(), self.max_samples)
+        self.task_start[uuid] = time.time()
 
     # Reason: The is_conditional parameter is part of the Ansible plugin API
     # Status: permanently disabled
     # pylint: disable=unused-argument
-    def playbook_on_task_start(self, name, is_conditional):
+    def v2_playbook_on_task_start(self, task, is_conditional):
         """
         Logs the start of each task
         """
-        if self.current is not None:
-            # Record the running time of the last executed task
-            self.stats[self.current] = time.time() - self.stats[self.current]
+        self._task_started(task)
 
-        # Record the start time of the current task
-        self.current = name
-        self.stats[self.current] = time.time()
+    def v2_playbook_on_handler_task_start(self, task):
+        """
+        Logs the start of each handler
+        """
+        self._task_started(task)
 
-    # Reason: The stats parameter is part of the Ansible plugin API
-    # Status: permanently disabled
-    # pylint: disable=unused-argument
-    def playbook_on_stats(self, stats):
+    def v2_runner_on_start(self, host, task):
+        """
+        Logs the start of a task on a host (Ansible 2.8 and later)
+        """
+        self.running[(task._uuid, host.get_name())] = time.time()  # pylint: disable=protected-access
+
+    def _task_ended(self, result, status):
+        # pylint: disable=protected-access; Ansible gives us no sufficient public
+        # API on TaskResult objects.
+        uuid = result._task._uuid
+        host = result._host.get_name()
+        stats = self.tasks.get(uuid)
+        if stats is None:
+            return
+        end = time.time()
+        # without v2_runner_on_start, hosts are considered to start with the task
+        start = self.running.pop((uuid, host), self.task_start[uuid])
+        stats.add(host, end - start)
+        if self.trace:
+            self.trace.add(host, stats.name, start, end, status)
+
+    def v2_runner_on_ok(self, result):
+        self._task_ended(result, 'ok')
+
+    def v2_runner_on_failed(self, result, ignore_errors=False):
+        self._task_ended(result, 'failed')
+
+    def v2_runner_on_skipped(self, result):
+        self._task_ended(result, 'skipped')
+
+    def v2_runner_on_unreachable(self, result):
+        self._task_ended(result, 'unreachable')
+
+    def v2_playbook_on_stats(self, stats):
         """
         Prints the timings
         """
-        # Record the timing of the very last task
-        if self.current is not None:
-            self.stats[self.current] = time.time() - self.stats[self.current]
-
-        # Sort the tasks by their running time
-        results = sorted(
-            self.stats.items(),
-            key=lambda value: value[1],
-            reverse=True,
-        )
-
-        # Just keep the top 10
-        results = results[:10]
-
-        # Print the timings
-        for name, elapsed in results:
-            print(
-                "{0:-<70}{1:->9}".format(
-                    '{0} '.format(name),
-                    ' {0:.02f}s'.format(elapsed),
+        if self.trace:
+            self.trace.close()
+            self.trace = None
+
+        summaries = slowest_tasks(self.tasks.values())
+        if self.csv_path:
+            with open(self.csv_path, 'w') as outfile:
+                write_csv(outfile, summaries)
+
+        for summary in summaries[:self.limit]:
+            self._display.display(
+                "{0:-<70}{1:->40}".format(
+                    '{0} '.format(summary['task']),
+                    ' {hosts} hosts, p50 {p50:.02f}s p90 {p90:.02f}s max {max:.02f}s'.format(**summary),
                 )
             )
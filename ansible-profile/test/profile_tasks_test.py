@@ -0,0 +1,74 @@
+'''
+ Unit tests for the profile_tasks callback plugin
+'''
+import csv
+import io
+import json
+import os
+import random
+import sys
+
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), os.pardir, 'callback_plugins'))
+
+from profile_tasks import ChromeTrace, TaskStats, percentile, slowest_tasks, write_csv  # noqa: E402
+
+
+def test_percentile():
+    values = [float(value) for value in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 90) == 90.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([3.0], 99) == 3.0
+    assert percentile([], 50) == 0.0
+
+
+def test_task_stats_keeps_a_bounded_sample():
+    stats = TaskStats('install packages', 'main.yml:3', max_samples=50, rand=random.Random(1))
+    for index in range(1000):
+        stats.add('node{}'.format(index), float(index % 100))
+    stats.add('slow-node', 500.0)
+
+    assert len(stats.samples) == 50
+    summary = stats.summary()
+    assert summary['hosts'] == 1001
+    assert summary['max'] == 500.0
+    assert summary['max_host'] == 'slow-node'
+    assert 30.0 <= summary['p50'] <= 70.0
+
+
+def test_slowest_tasks():
+    fast = TaskStats('fast', 'a.yml:1')
+    fast.add('node1', 1.0)
+    slow = TaskStats('slow', 'a.yml:2')
+    slow.add('node1', 1.0)
+    slow.add('node2', 9.0)
+    unfinished = TaskStats('unfinished', 'a.yml:3')
+
+    summaries = slowest_tasks([fast, unfinished, slow])
+    assert [summary['task'] for summary in summaries] == ['slow', 'fast']
+    assert slowest_tasks([fast, slow], limit=1)[0]['max_host'] == 'node2'
+
+    outfile = io.StringIO() if sys.version_info[0] > 2 else io.BytesIO()
+    write_csv(outfile, summaries)
+    rows = list(csv.reader(outfile.getvalue().splitlines()))
+    assert rows[0][:3] == ['task', 'path', 'hosts']
+    assert rows[1][:5] == ['slow', 'a.yml:2', '2', '10.000', '5.000']
+
+
+def test_chrome_trace():
+    outfile = io.StringIO() if sys.version_info[0] > 2 else io.BytesIO()
+    outfile.close = lambda: None
+    trace = ChromeTrace(outfile)
+    trace.add('node1', 'install', 10.0, 12.5, 'ok')
+    trace.add('node2', 'install', 10.0, 11.0, 'failed')
+    trace.add('node1', 'start', 12.5, 13.0, 'ok')
+    trace.close()
+
+    events = json.loads(outfile.getvalue())
+    threads = dict((event['args']['name'], event['tid']) for event in events if event['ph'] == 'M')
+    assert threads == {'node1': 1, 'node2': 2}
+    tasks = [event for event in events if event['ph'] == 'X']
+    assert tasks[0]['ts'] == 10000000
+    assert tasks[0]['dur'] == 2500000
+    assert [task['tid'] for task in tasks] == [1, 2, 1]
+    assert tasks[1]['args'] == {'host': 'node2', 'status': 'failed'}
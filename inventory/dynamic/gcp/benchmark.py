@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+'''
+Benchmark of the GCE inventory script against a mocked libcloud driver.
+
+Lists 5000 instances (or the number given as the first argument) spread over
+four zones, with a simulated API latency per list call, and times listing
+all zones at once, per zone with and without concurrency, and reading the
+listed instances back from the cache.
+
+    $ python inventory/dynamic/gcp/benchmark.py [instances] [latency_seconds]
+'''
+
+from __future__ import print_function
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import types
+
+ZONES = ['us-central1-a', 'us-central1-b', 'us-central1-c', 'us-central1-f']
+
+
+class FakeZone(object):
+    '''A libcloud zone'''
+    def __init__(self, name):
+        self.name = name
+
+
+class FakeNode(object):
+    '''A libcloud GCE node, with the attributes the inventory script uses'''
+    # pylint: disable=too-few-public-methods,invalid-name
+    def __init__(self, index):
+        zone = ZONES[index % len(ZONES)]
+        self.uuid = 'uuid-%d' % index
+        self.id = str(index)
+        self.name = 'node-%05d' % index
+        self.image = None if index % 3 else 'rhel-7'
+        self.size = 'n1-standard-%d' % (2 ** (index % 3))
+        self.private_ips = ['10.0.%d.%d' % (index // 250, index % 250)]
+        self.public_ips = ['35.1.%d.%d' % (index // 250, index % 250)] if index % 2 else []
+        self.extra = {
+            'metadata': {'items': [{'key': 'cluster', 'value': 'bench'}]},
+            'networkInterfaces': [{'network': 'projects/bench/global/networks/default'}],
+            'description': '',
+            'status': 'RUNNING' if index % 10 else 'TERMINATED',
+            'zone': FakeZone(zone),
+            'tags': ['benchocp', 'ocp-node' if index % 5 else 'ocp-master'],
+        }
+
+
+class FakeDriver(object):
+    '''A libcloud GCE driver answering list calls after a fixed latency'''
+    nodes = []
+    latency = 0.0
+
+    def __init__(self, *args, **kwargs):
+        self.project = kwargs.get('project')
+        self.connection = types.SimpleNamespace(user_agent_append=lambda agent: None) \
+            if hasattr(types, 'SimpleNamespace') else None
+
+    def list_nodes(self, ex_zone=None):
+        '''List the nodes of a zone, or of all of them'''
+        time.sleep(self.latency)
+        if ex_zone is None:
+            return list(self.nodes)
+        return [node for node in self.nodes if node.extra['zone'].name == ex_zone]
+
+
+def install_fake_libcloud():
+    '''Make the inventory script import the fake driver instead of libcloud'''
+    modules = {}
+    for name in ['libcloud', 'libcloud.compute', 'libcloud.compute.types', 'libcloud.compute.providers',
+                 'libcloud.common', 'libcloud.common.google']:
+        modules[name] = sys.modules[name] = types.ModuleType(name)
+    modules['libcloud.compute.types'].Provider = types.ModuleType('Provider')
+    modules['libcloud.compute.types'].Provider.GCE = 'gce'
+    modules['libcloud.compute.providers'].get_driver = lambda provider: FakeDriver
+    modules['libcloud.common.google'].ResourceNotFoundError = type('ResourceNotFoundError', (Exception,), {})
+
+
+def run_inventory(hosts, argv, env):
+    '''Run the inventory script, returning the seconds it took'''
+    saved_environ = dict(os.environ)
+    os.environ.update(env)
+    sys.argv = ['hosts.py', '--list'] + argv
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    start = time.time()
+    try:
+        hosts.GceInventory()
+    except SystemExit:
+        pass
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+        os.environ.clear()
+        os.environ.update(saved_environ)
+    return time.time() - start
+
+
+def main():
+    '''Time the inventory script in its different modes'''
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    FakeDriver.latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+    FakeDriver.nodes = [FakeNode(index) for index in range(count)]
+    install_fake_libcloud()
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import hosts  # pylint: disable=import-error
+
+    cache_path = tempfile.mkdtemp()
+    env = {'GCE_EMAIL': 'bench@example.com', 'GCE_PEM_FILE_PATH': '/dev/null', 'GCE_PROJECT': 'bench',
+           'GCE_TAGGED_INSTANCES': 'benchocp', 'GCE_CACHE_PATH': cache_path, 'GCE_CACHE_MAX_AGE': '0'}
+    zones = ','.join(ZONES)
+    try:
+        print('%d instances, %.2fs per list call' % (count, FakeDriver.latency))
+        for label, argv, extra_env in [
+                ('all zones at once', [], {'GCE_ZONE': ''}),
+                ('per zone', [], {'GCE_ZONE': zones, 'GCE_ZONE_CONCURRENCY': '1'}),
+                ('per zone, 4 at a time', [], {'GCE_ZONE': zones, 'GCE_ZONE_CONCURRENCY': '4'}),
+                ('refreshing the cache', ['--refresh-cache'], {'GCE_ZONE': zones, 'GCE_CACHE_MAX_AGE': '300'}),
+                ('from the cache', [], {'GCE_ZONE': zones, 'GCE_CACHE_MAX_AGE': '300'}),
+        ]:
+            run_env = dict(env, **extra_env)
+            print('%-25s %.3fs' % (label, run_inventory(hosts, argv, run_env)))
+    finally:
+        shutil.rmtree(cache_path)
+
+
+if __name__ == '__main__':
+    main()
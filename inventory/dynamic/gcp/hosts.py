@@ -69,6 +69,17 @@ When run in --list mode, instances are grouped by the following categories:
    your instance was created with a root persistent disk it will be set to
    'persistent_disk' since there is no current way to determine the image.
 
+Caching:
+  As Ansible may run this script several times in a playbook run, the listed
+  instances can be cached for a number of seconds, set by cache_max_age in
+  the [cache] section of gce.ini or GCE_CACHE_MAX_AGE (0, the default,
+  disables the cache). The cache is kept in cache_path (GCE_CACHE_PATH),
+  ~/.ansible/tmp by default, and is refreshed with --refresh-cache.
+
+  When zones are given with GCE_ZONE, the instances of each zone are listed
+  separately, up to zone_concurrency zones at a time (GCE_ZONE_CONCURRENCY,
+  1 by default), each with its own connection.
+
 Examples:
   Execute uname on all instances in the us-central1-a zone
   $ ansible -i gce.py us-central1-a -m shell -a "/bin/uname -a"
@@ -98,7 +109,14 @@ import sys
 import os
 import time
 import argparse
-import ConfigParser
+import hashlib
+import tempfile
+import threading
+from collections import defaultdict
+try:
+    import ConfigParser
+except ImportError:
+    import configparser as ConfigParser
 
 import logging
 logging.getLogger('libcloud.common.google').addHandler(logging.NullHandler())
@@ -137,7 +155,11 @@ class GceInventory(object):
         zones = self.parse_env_zones()
 
         # Otherwise, assume user wants all instances grouped
-        print(self.json_format_dict(self.group_instances(zones),
+        nodes = self.get_cached_nodes(zones)
+        if nodes is None:
+            nodes = self.list_nodes(zones)
+            self.write_cache(zones, nodes)
+        print(self.json_format_dict(self.group_instances(nodes, zones),
             pretty=self.args.pretty))
         sys.exit(0)
 
@@ -157,17 +179,22 @@ class GceInventory(object):
         # This provides empty defaults to each key, so that environment
         # variable configuration (as opposed to INI configuration) is able
         # to work.
-        config = ConfigParser.SafeConfigParser(defaults={
+        config = getattr(ConfigParser, 'SafeConfigParser', ConfigParser.ConfigParser)(defaults={
             'gce_service_account_email_address': '',
             'gce_service_account_pem_file_path': '',
             'gce_project_id': '',
             'libcloud_secrets': '',
             'inventory_ip_type': '',
+            'zone_concurrency': '1',
+            'cache_path': '~/.ansible/tmp',
+            'cache_max_age': '0',
         })
         if 'gce' not in config.sections():
             config.add_section('gce')
         if 'inventory' not in config.sections():
             config.add_section('inventory')
+        if 'cache' not in config.sections():
+            config.add_section('cache')
 
         config.read(gce_ini_path)
 
@@ -183,6 +210,13 @@ class GceInventory(object):
             if states:
                 self.instance_states = states.split(',')
 
+        self.zone_concurrency = int(os.environ.get(
+            'GCE_ZONE_CONCURRENCY', config.get('gce', 'zone_concurrency')))
+        self.cache_path = os.path.expanduser(os.environ.get(
+            'GCE_CACHE_PATH', config.get('cache', 'cache_path')))
+        self.cache_max_age = int(os.environ.get(
+            'GCE_CACHE_MAX_AGE', config.get('cache', 'cache_max_age')))
+
         return config
 
     def get_inventory_options(self):
@@ -204,7 +238,7 @@ class GceInventory(object):
         secrets_found = False
         try:
             import secrets
-            args = list(getattr(secrets, 'GCE_PARAMS', []))
+            args = list(secrets.GCE_PARAMS)  # not the secrets module of Python 3
             kwargs = getattr(secrets, 'GCE_KEYWORD_PARAMS', {})
             secrets_found = True
         except:
@@ -218,7 +252,7 @@ class GceInventory(object):
             sys.path.append(os.path.dirname(secrets_path))
             try:
                 import secrets
-                args = list(getattr(secrets, 'GCE_PARAMS', []))
+                args = list(secrets.GCE_PARAMS)  # not the secrets module of Python 3
                 kwargs = getattr(secrets, 'GCE_KEYWORD_PARAMS', {})
                 secrets_found = True
             except:
@@ -264,6 +298,8 @@ class GceInventory(object):
                            help='Only include instances with this tag')
         parser.add_argument('--pretty', action='store_true', default=False,
                            help='Pretty format (default: False)')
+        parser.add_argument('--refresh-cache', action='store_true', default=False,
+                           help='List instances from GCE even if they are cached (default: False)')
         self.args = parser.parse_args()
 
         tag_env = os.environ.get('GCE_TAGGED_INSTANCES')
@@ -276,7 +312,7 @@ class GceInventory(object):
         if inst is None:
             return {}
 
-        if inst.extra['metadata'].has_key('items'):
+        if 'items' in inst.extra['metadata']:
             for entry in inst.extra['metadata']['items']:
                 md[entry['key']] = entry['value']
 
@@ -312,27 +348,78 @@ class GceInventory(object):
         except Exception as e:
             return None
 
-    def group_instances(self, zones=None):
-        '''Group all instances'''
-        groups = {}
-        meta = {}
-        meta["hostvars"] = {}
+    def cache_file(self, zones):
+        '''Returns the path of the file caching the instances listed for
+        the project, zones and IP type'''
+        key = json.dumps([self.driver.project, sorted(zones or []), self.ip_type])
+        return os.path.join(self.cache_path, 'ansible-gce-%s.json' % (
+            hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]))
+
+    def get_cached_nodes(self, zones):
+        '''Returns the instances listed by a previous run, if they are
+        recent enough, or None'''
+        if self.args.refresh_cache or self.cache_max_age <= 0:
+            return None
+        path = self.cache_file(zones)
+        try:
+            if time.time() - os.path.getmtime(path) > self.cache_max_age:
+                return None
+            with open(path) as cache:
+                return json.load(cache)
+        except (IOError, OSError, ValueError):
+            return None
 
-        # list_nodes will fail if a disk is in the process of being deleted
-        # from a node, which is not uncommon if other playbooks are managing
-        # the same project. Retry if we receive a not found error.
-        nodes = []
-        tries = 0
-        while True:
+    def write_cache(self, zones, nodes):
+        '''Caches the listed instances, replacing the cache file atomically
+        so that concurrent runs never read a partial one'''
+        if self.cache_max_age <= 0:
+            return
+        try:
+            if not os.path.isdir(self.cache_path):
+                os.makedirs(self.cache_path)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_path, prefix='.ansible-gce-')
+            with os.fdopen(fd, 'w') as cache:
+                json.dump(nodes, cache)
+            os.rename(tmp_path, self.cache_file(zones))
+        except (IOError, OSError):
+            pass  # the cache is only an optimization
+
+    def list_nodes(self, zones=None):
+        '''Lists the instances, in the given zones if any, as dicts of
+        their hostvars'''
+        if not zones:
+            return [self.node_to_dict(node) for node in list_nodes(self.driver)]
+
+        # split the zones among threads, each with its own connection
+        concurrency = max(1, min(self.zone_concurrency, len(zones)))
+        chunks = [zones[i::concurrency] for i in range(concurrency)]
+        drivers = [self.driver] + [self.get_gce_driver() for _ in chunks[1:]]
+        results = [None] * concurrency
+        errors = []
+
+        def list_chunk(index):
             try:
-                nodes = self.driver.list_nodes()
-                break
-            except ResourceNotFoundError:
-                tries = tries + 1
-                if tries > 15:
-                    raise e
-                time.sleep(1)
-                continue
+                results[index] = [node for zone in chunks[index]
+                                  for node in list_nodes(drivers[index], zone)]
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=list_chunk, args=(i,)) for i in range(1, concurrency)]
+        for thread in threads:
+            thread.start()
+        list_chunk(0)
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+
+        return [self.node_to_dict(node) for chunk in results for node in chunk]
+
+    def group_instances(self, nodes, zones=None):
+        '''Group all instances, given as dicts of their hostvars'''
+        groups = defaultdict(list)
+        meta = {}
+        meta["hostvars"] = {}
 
         for node in nodes:
 
@@ -343,53 +430,37 @@ class GceInventory(object):
             #
             # If the instance_states list is _populated_ then check the current
             # state against the instance_states list
-            if self.instance_states and not node.extra['status'] in self.instance_states:
+            if self.instance_states and not node['gce_status'] in self.instance_states:
                 continue
 
-            name = node.name
+            name = node['gce_name']
 
-            if self.args.tagged and self.args.tagged not in node.extra['tags']:
+            if self.args.tagged and self.args.tagged not in node['gce_tags']:
                 continue
 
-            meta["hostvars"][name] = self.node_to_dict(node)
+            meta["hostvars"][name] = node
 
-            zone = node.extra['zone'].name
+            zone = node['gce_zone']
 
-            # To avoid making multiple requests per zone
-            # we list all nodes and then filter the results
+            # Nodes are only listed per zone when zones are given, but
+            # filter anyway in case they were listed otherwise
             if zones and zone not in zones:
                 continue
 
-            if groups.has_key(zone): groups[zone].append(name)
-            else: groups[zone] = [name]
+            groups[zone].append(name)
 
-            tags = node.extra['tags']
-            for t in tags:
+            for t in node['gce_tags']:
                 if t.startswith('group-'):
-                    tag = t[6:]
+                    groups[t[6:]].append(name)
                 else:
-                    tag = 'tag_%s' % t
-                if groups.has_key(tag): groups[tag].append(name)
-                else: groups[tag] = [name]
-
-            net = node.extra['networkInterfaces'][0]['network'].split('/')[-1]
-            net = 'network_%s' % net
-            if groups.has_key(net): groups[net].append(name)
-            else: groups[net] = [name]
+                    groups['tag_%s' % t].append(name)
 
-            machine_type = node.size
-            if groups.has_key(machine_type): groups[machine_type].append(name)
-            else: groups[machine_type] = [name]
-
-            image = node.image and node.image or 'persistent_disk'
-            if groups.has_key(image): groups[image].append(name)
-            else: groups[image] = [name]
-
-            status = node.extra['status']
-            stat = 'status_%s' % status.lower()
-            if groups.has_key(stat): groups[stat].append(name)
-            else: groups[stat] = [name]
+            groups['network_%s' % node['gce_network']].append(name)
+            groups[node['gce_machine_type']].append(name)
+            groups[node['gce_image'] or 'persistent_disk'].append(name)
+            groups['status_%s' % node['gce_status'].lower()].append(name)
 
+        groups = dict(groups)
         groups["_meta"] = meta
 
         return groups
@@ -404,5 +475,22 @@ class GceInventory(object):
             return json.dumps(data)
 
 
+def list_nodes(driver, zone=None):
+    '''Lists the instances of a zone, or of all zones, with the driver'''
+    # list_nodes will fail if a disk is in the process of being deleted
+    # from a node, which is not uncommon if other playbooks are managing
+    # the same project. Retry if we receive a not found error.
+    tries = 0
+    while True:
+        try:
+            return driver.list_nodes(ex_zone=zone)
+        except ResourceNotFoundError:
+            tries = tries + 1
+            if tries > 15:
+                raise
+            time.sleep(1)
+
+
 # Run the script
-GceInventory()
+if __name__ == '__main__':
+    GceInventory()
@@ -4,13 +4,22 @@ This library is used by the OpenStack's dynamic inventories.
 
 It produces the inventory in a Python dict structure based on the current
 environment.
+
+The inventory can be cached for OPENSTACK_INVENTORY_CACHE_MAX_AGE seconds (0,
+the default, disables the cache), in OPENSTACK_INVENTORY_CACHE_PATH, as Ansible
+reads it several times in a playbook run.
 """
 
 from __future__ import print_function
 
 import argparse
+import hashlib
 import json
 import os
+import re
+import tempfile
+import time
+from multiprocessing.pool import ThreadPool
 try:
     import ConfigParser
 except ImportError:
@@ -78,6 +87,75 @@ def get_docker_storage_mountpoints(volumes):
     return docker_storage_mountpoints
 
 
+def is_cluster_server(server, cluster_id, show_compute_nodes):
+    '''Whether the server belongs to the cluster (any cluster if cluster_id is
+    not given) and should be listed.'''
+    metadata = server.get('metadata') or {}
+    if 'clusterid' not in metadata:
+        return False
+    if cluster_id and metadata['clusterid'] != cluster_id:
+        return False
+    return show_compute_nodes or metadata.get('sub-host-type') != 'app'
+
+
+def list_named_servers(cloud, name):
+    '''List the servers whose name matches the regular expression `name`,
+    filtered by the API, as cloud.list_servers() lists them.
+
+    list_servers takes no filters in shade 1.24 (see requirements.txt), so
+    there the servers are queried and expanded the way it does, with the name
+    as a parameter of the query.'''
+    try:
+        return cloud.list_servers(filters={'name': name})
+    except TypeError:
+        pass
+    # pylint: disable=protected-access
+    data = cloud._compute_client.get(
+        '/servers/detail', params={'name': name}, error_message="Error fetching server list")
+    servers = cloud._normalize_servers(cloud._get_and_munchify('servers', data))
+    return [cloud._expand_server(server, detailed=False, bare=False) for server in servers]
+
+
+def list_cluster_servers(cloud, cluster_id, show_compute_nodes):
+    '''List the servers of the cluster.
+
+    When the cluster ID is known, the servers are first filtered by the API by
+    name, as servers are named after the cluster's domain with
+    `openshift_openstack_fqdn_nodes`, and then by their `clusterid` metadata.
+    All servers of the tenant are listed when this finds none (e.g. servers
+    not named with FQDNs).'''
+    if cluster_id:
+        servers = list_named_servers(cloud, r'\.{}$'.format(re.escape(cluster_id)))
+        cluster_servers = [server for server in servers
+                           if is_cluster_server(server, cluster_id, show_compute_nodes)]
+        if cluster_servers:
+            return cluster_servers
+    return [server for server in cloud.list_servers()
+            if is_cluster_server(server, cluster_id, show_compute_nodes)]
+
+
+def list_attached_volumes(cloud, servers, pool):
+    '''Get the volumes attached to the servers, using the thread pool.'''
+    volume_ids = sorted(set(
+        volume['id']
+        for server in servers
+        for volume in server.get('os-extended-volumes:volumes_attached') or []))
+    if not volume_ids:
+        return []
+
+    def get_volume(volume_id):
+        try:
+            return cloud.get_volume_by_id(volume_id)
+        except shade.OpenStackCloudException:
+            return None  # deleted since the server was listed
+
+    # Some clouds don't have Cinder. That's okay:
+    try:
+        return [volume for volume in pool.map(get_volume, volume_ids) if volume]
+    except EndpointNotFound:
+        return []
+
+
 def _get_hostvars(server, docker_storage_mountpoints):
     ssh_ip_address = server.public_v4 or server.private_v4
     hostvars = {
@@ -116,29 +194,78 @@ def _get_hostvars(server, docker_storage_mountpoints):
     return hostvars
 
 
-def build_inventory():
-    '''Build the dynamic inventory.'''
-    cloud = shade.openstack_cloud()
+def inventory_cache_file(show_compute_nodes):
+    '''Path of the file caching the inventory of the current cloud and cluster.'''
+    cache_dir = os.path.expanduser(os.environ.get(
+        'OPENSTACK_INVENTORY_CACHE_PATH', '~/.cache/openshift-ansible'))
+    key = json.dumps([os.environ.get('OS_CLOUD'), os.environ.get('OS_PROJECT_NAME'),
+                      os.environ.get('OPENSHIFT_CLUSTER'), os.environ.get('OPENSHIFT_CLUSTER_ID'),
+                      show_compute_nodes])
+    return os.path.join(cache_dir, 'openstack-inventory-{}.json'.format(
+        hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]))
+
+
+def read_cached_inventory(path, max_age):
+    '''Return the cached inventory if it is recent enough, or None.'''
+    try:
+        if time.time() - os.path.getmtime(path) > max_age:
+            return None
+        with open(path) as cache:
+            return json.load(cache)
+    except (IOError, OSError, ValueError):
+        return None
 
+
+def write_cached_inventory(path, inventory):
+    '''Replace the cached inventory atomically. It may contain credentials, so
+    it is only readable by its owner.'''
+    try:
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.openstack-inventory-')
+        with os.fdopen(fd, 'w') as cache:
+            json.dump(inventory, cache)
+        os.rename(tmp_path, path)
+    except (IOError, OSError):
+        pass  # the cache is only an optimization
+
+
+def build_inventory(cloud=None):
+    '''Build the dynamic inventory, from the cache if it is enabled and recent enough.'''
     # Use an environment variable to optionally skip returning the app nodes.
     show_compute_nodes = os.environ.get('OPENSTACK_SHOW_COMPUTE_NODES', 'true').lower() == "true"
 
-    # TODO(shadower): filter the servers based on the `OPENSHIFT_CLUSTER`
-    # environment variable.
-    cluster_hosts = [
-        server for server in cloud.list_servers()
-        if 'metadata' in server and 'clusterid' in server.metadata and
-        (show_compute_nodes or server.metadata.get('sub-host-type') != 'app')]
+    max_age = int(os.environ.get('OPENSTACK_INVENTORY_CACHE_MAX_AGE', 0))
+    if max_age <= 0:
+        return _build_inventory(cloud or shade.openstack_cloud(), show_compute_nodes)
 
-    inventory = base_openshift_inventory(cluster_hosts)
+    cache_file = inventory_cache_file(show_compute_nodes)
+    inventory = read_cached_inventory(cache_file, max_age)
+    if inventory is None:
+        inventory = _build_inventory(cloud or shade.openstack_cloud(), show_compute_nodes)
+        write_cached_inventory(cache_file, inventory)
+    return inventory
 
-    inventory['_meta'] = {'hostvars': {}}
 
-    # Some clouds don't have Cinder. That's okay:
+def _build_inventory(cloud, show_compute_nodes):
+    '''Build the dynamic inventory from the cloud.'''
+    cluster_id = os.environ.get('OPENSHIFT_CLUSTER_ID')
+
+    # The servers, the stack and then the volumes attached to the servers
+    # don't depend on each other, so are fetched concurrently.
+    pool = ThreadPool(int(os.environ.get('OPENSTACK_INVENTORY_CONCURRENCY', 8)))
     try:
-        volumes = cloud.list_volumes()
-    except EndpointNotFound:
-        volumes = []
+        servers_result = pool.apply_async(list_cluster_servers, (cloud, cluster_id, show_compute_nodes))
+        stack_result = pool.apply_async(_get_stack_outputs, (cloud,))
+        cluster_hosts = servers_result.get()
+        volumes = list_attached_volumes(cloud, cluster_hosts, pool)
+        stout = stack_result.get()
+    finally:
+        pool.close()
+
+    inventory = base_openshift_inventory(cluster_hosts)
+
+    inventory['_meta'] = {'hostvars': {}}
 
     # cinder volumes used for docker storage
     docker_storage_mountpoints = get_docker_storage_mountpoints(volumes)
@@ -147,7 +274,6 @@ def build_inventory():
             server,
             docker_storage_mountpoints)
 
-    stout = _get_stack_outputs(cloud)
     if stout is not None:
         try:
             inventory['localhost'].update({
@@ -0,0 +1,191 @@
+'''
+ Unit tests for the OpenStack dynamic inventory, against a fake shade cloud
+'''
+import os
+import re
+import sys
+
+import pytest
+
+pytest.importorskip('shade')
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import resources  # noqa: E402 pylint: disable=wrong-import-position
+
+
+class Munch(dict):
+    '''A dict whose keys are also attributes, like the objects shade returns'''
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+def server(name, host_type, sub_host_type='default', clusterid='openshift.example.com', volumes=()):
+    return Munch({
+        'id': name + '-id',
+        'name': name,
+        'public_v4': '',
+        'private_v4': '192.168.0.{}'.format(len(name)),
+        'metadata': {'clusterid': clusterid, 'host-type': host_type, 'sub-host-type': sub_host_type},
+        'os-extended-volumes:volumes_attached': [{'id': volume} for volume in volumes],
+    })
+
+
+class FakeCloud(object):
+    '''A shade cloud recording the API calls made to it'''
+    def __init__(self, servers, volumes=None, stack=None, filters=True):
+        self.servers = servers
+        self.volumes = volumes or {}
+        self.stack = stack
+        self.filters = filters
+        self.calls = []
+
+    def list_servers(self, **kwargs):
+        self.calls.append(('list_servers', kwargs))
+        if 'filters' in kwargs and not self.filters:
+            raise TypeError("list_servers() got an unexpected keyword argument 'filters'")
+        return self.named_servers(kwargs.get('filters', {}).get('name'))
+
+    def named_servers(self, name):
+        return [server for server in self.servers if not name or re.search(name, server.name)]
+
+    # the internals list_servers uses in shade 1.24, which has no filters
+    @property
+    def _compute_client(self):
+        cloud = self
+
+        class ComputeClient(object):
+            def get(self, path, params=None, error_message=None):
+                cloud.calls.append(('get', path, params))
+                return {'servers': cloud.named_servers(params.get('name'))}
+        return ComputeClient()
+
+    def _get_and_munchify(self, key, data):
+        return data[key]
+
+    def _normalize_servers(self, servers):
+        return servers
+
+    def _expand_server(self, server, detailed, bare):
+        assert not detailed and not bare
+        return server
+
+    def list_volumes(self):
+        raise AssertionError('volumes of the whole tenant should not be listed')
+
+    def get_volume_by_id(self, volume_id):
+        self.calls.append(('get_volume_by_id', volume_id))
+        return self.volumes[volume_id]
+
+    def get_stack(self, name):
+        self.calls.append(('get_stack', name))
+        return self.stack
+
+
+SERVERS = [
+    server('master-0.openshift.example.com', 'master', volumes=['vol-m']),
+    server('app-node-0.openshift.example.com', 'node', 'app', volumes=['vol-a', 'vol-x']),
+    server('infra-node-0.openshift.example.com', 'node', 'infra'),
+    server('master-0.other.example.com', 'master', clusterid='other.example.com'),
+    Munch({'id': 'unrelated', 'name': 'unrelated', 'metadata': {}}),
+]
+VOLUMES = {
+    'vol-m': Munch({'metadata': {'purpose': 'openshift_docker_storage'},
+                    'attachments': [Munch({'server_id': 'master-0.openshift.example.com-id', 'device': '/dev/vdb'})]}),
+    'vol-a': Munch({'metadata': {'purpose': 'openshift_docker_storage'},
+                    'attachments': [Munch({'server_id': 'app-node-0.openshift.example.com-id', 'device': '/dev/vdb'})]}),
+    'vol-x': Munch({'metadata': {}, 'attachments': []}),
+}
+
+
+@pytest.fixture
+def env(monkeypatch, tmpdir):
+    for name in ('OPENSHIFT_CLUSTER_ID', 'OPENSTACK_SHOW_COMPUTE_NODES', 'OPENSTACK_INVENTORY_CACHE_MAX_AGE'):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv('OPENSTACK_INVENTORY_CACHE_PATH', str(tmpdir))
+    return monkeypatch
+
+
+def test_build_inventory(env):
+    cloud = FakeCloud(SERVERS, VOLUMES)
+
+    inventory = resources.build_inventory(cloud)
+
+    assert sorted(inventory['OSEv3']['hosts']) == [
+        'app-node-0.openshift.example.com', 'infra-node-0.openshift.example.com',
+        'master-0.openshift.example.com', 'master-0.other.example.com']
+    hostvars = inventory['_meta']['hostvars']
+    assert hostvars['app-node-0.openshift.example.com']['docker_storage_mountpoints'] == '/dev/vdb'
+    assert 'docker_storage_mountpoints' not in hostvars['infra-node-0.openshift.example.com']
+    # only the volumes attached to the cluster's servers are fetched, once each
+    assert sorted(call[1] for call in cloud.calls if call[0] == 'get_volume_by_id') == ['vol-a', 'vol-m', 'vol-x']
+    assert ('get_stack', 'openshift-cluster') in cloud.calls
+
+
+def test_build_inventory_filters_by_cluster_id(env):
+    env.setenv('OPENSHIFT_CLUSTER_ID', 'openshift.example.com')
+    env.setenv('OPENSTACK_SHOW_COMPUTE_NODES', 'false')
+    cloud = FakeCloud(SERVERS, VOLUMES)
+
+    inventory = resources.build_inventory(cloud)
+
+    assert sorted(inventory['OSEv3']['hosts']) == [
+        'infra-node-0.openshift.example.com', 'master-0.openshift.example.com']
+    assert [call for call in cloud.calls if call[0] == 'list_servers'] == [
+        ('list_servers', {'filters': {'name': r'\.openshift\.example\.com$'}})]
+    assert sorted(call[1] for call in cloud.calls if call[0] == 'get_volume_by_id') == ['vol-m']
+
+
+def test_build_inventory_filters_by_cluster_id_without_list_servers_filters(env):
+    # shade 1.24, as in requirements.txt
+    env.setenv('OPENSHIFT_CLUSTER_ID', 'openshift.example.com')
+    cloud = FakeCloud(SERVERS, VOLUMES, filters=False)
+
+    inventory = resources.build_inventory(cloud)
+
+    assert sorted(inventory['OSEv3']['hosts']) == [
+        'app-node-0.openshift.example.com', 'infra-node-0.openshift.example.com', 'master-0.openshift.example.com']
+    assert ('get', '/servers/detail', {'name': r'\.openshift\.example\.com$'}) in cloud.calls
+    # the whole tenant is not listed
+    assert ('list_servers', {}) not in cloud.calls
+
+
+def test_build_inventory_lists_all_servers_without_name_filter(env):
+    # servers not named after the cluster's domain
+    cloud = FakeCloud([server('master-0', 'master', volumes=['vol-m'])], VOLUMES)
+    env.setenv('OPENSHIFT_CLUSTER_ID', 'openshift.example.com')
+
+    inventory = resources.build_inventory(cloud)
+
+    assert 'master-0.other.example.com' not in inventory['OSEv3']['hosts']
+    assert [call for call in cloud.calls if call[0] == 'list_servers'][-1] == ('list_servers', {})
+
+
+def test_build_inventory_stack_outputs(env):
+    stack = {'stack_status': 'CREATE_COMPLETE', 'outputs': [
+        {'output_key': 'private_api_ip', 'output_value': '192.168.0.10'},
+        {'output_key': 'public_api_ip', 'output_value': '10.0.0.10'},
+    ]}
+
+    inventory = resources.build_inventory(FakeCloud(SERVERS, VOLUMES, stack))
+
+    assert inventory['OSEv3']['vars']['openshift_master_cluster_hostname'] == '192.168.0.10'
+    assert inventory['localhost']['openshift_openstack_public_api_ip'] == '10.0.0.10'
+
+
+def test_build_inventory_cache(env):
+    env.setenv('OPENSTACK_INVENTORY_CACHE_MAX_AGE', '300')
+    cloud = FakeCloud(SERVERS, VOLUMES)
+
+    inventory = resources.build_inventory(cloud)
+    calls = len(cloud.calls)
+
+    assert resources.build_inventory(cloud) == inventory
+    assert len(cloud.calls) == calls
+
+    # a cluster of its own is cached separately
+    env.setenv('OPENSHIFT_CLUSTER_ID', 'other.example.com')
+    assert resources.build_inventory(cloud)['OSEv3']['hosts'] == ['master-0.other.example.com']
+    assert len(cloud.calls) > calls
@@ -1,11 +1,27 @@
 """Ansible callback plugin to print a summary completion status of installation
 phases.
+
+When a history file is configured, the duration of each phase is also appended
+to it at the end of the run, and phases that took noticeably longer than they
+usually do are pointed out.
 """
-from datetime import datetime
+from collections import deque
+from datetime import datetime, timedelta
+import json
+import os
+import time
 from ansible.plugins.callback import CallbackBase
 from ansible import constants as C
 
 
+# Key of the set_stats data configuring the phase history, rather than a phase
+HISTORY_KEY = 'installer_checkpoint_history'
+# Number of previous runs of a phase its duration is compared to
+DEFAULT_HISTORY_RUNS = 5
+# How much longer than its baseline a phase may take before it is pointed out
+DEFAULT_REGRESSION_PERCENT = 20
+
+
 class CallbackModule(CallbackBase):
     """This callback summarizes installation phase status."""
 
@@ -19,7 +35,8 @@ class CallbackModule(CallbackBase):
 
     def v2_playbook_on_stats(self, stats):
 
-        phases = stats.custom['_run']
+        phases = dict(stats.custom['_run'])
+        history = phases.pop(HISTORY_KEY, None)
 
         # Find the longest phase title
         max_column = 0
@@ -51,6 +68,33 @@ class CallbackModule(CallbackBase):
                     '\t{}'.format(
                         phases[phase]['message']))
 
+        if history and history.get('file'):
+            self.record_history(history, phases, len(stats.processed))
+
+    def record_history(self, history, phases, host_count):
+        """Compare the phases to their previous runs, then add this run to the history file"""
+        path = os.path.expanduser(history['file'])
+        runs = int(history.get('runs', DEFAULT_HISTORY_RUNS))
+        threshold = float(history.get('regression_percent', DEFAULT_REGRESSION_PERCENT))
+        entry = history_entry(phases, host_count, history.get('version', ''))
+
+        try:
+            baselines = phase_baselines(path, runs)
+        except (IOError, OSError) as err:
+            self._display.warning('Could not read installer phase history {}: {}'.format(path, err))
+            baselines = {}
+
+        for regression in phase_regressions(entry, baselines, threshold):
+            self._display.display(
+                '{title} took {duration}, {percent:.0f}% longer than its baseline of {baseline} '
+                'over the last {runs} runs'.format(**regression),
+                color=C.COLOR_WARN)
+
+        try:
+            append_history(path, entry)
+        except (IOError, OSError) as err:
+            self._display.warning('Could not write installer phase history {}: {}'.format(path, err))
+
     def phase_color(self, status):
         """ Return color code for installer phase"""
         valid_status = [
@@ -71,10 +115,10 @@ class CallbackModule(CallbackBase):
         return phase_color
 
 
-def phase_time_delta(phase):
-    """ Calculate the difference between phase start and end times """
+def phase_duration(phase):
+    """ Calculate the difference between phase start and end times, as a timedelta """
     if not phase.get('start'):
-        return ''
+        return None
     time_format = '%Y%m%d%H%M%SZ'
     phase_start = datetime.strptime(phase['start'], time_format)
     if 'end' not in phase:
@@ -82,6 +126,91 @@ def phase_time_delta(phase):
         phase_end = datetime.now()
     else:
         phase_end = datetime.strptime(phase['end'], time_format)
-    delta = str(phase_end - phase_start).split(".")[0]  # Trim microseconds
+    return phase_end - phase_start
+
+
+def phase_time_delta(phase):
+    """ Calculate the difference between phase start and end times """
+    duration = phase_duration(phase)
+    if duration is None:
+        return ''
+    delta = str(duration).split(".")[0]  # Trim microseconds
 
     return delta
+
+
+def history_entry(phases, host_count, version):
+    """ Return the history record of a run: the duration in seconds, title and status of each phase """
+    entry = {
+        'time': time.strftime('%Y%m%d%H%M%SZ', time.gmtime()),
+        'hosts': host_count,
+        'version': version,
+        'phases': {},
+    }
+    for phase, data in phases.items():
+        duration = phase_duration(data)
+        if duration is None:
+            continue
+        entry['phases'][phase] = {
+            'title': data.get('title', phase),
+            'status': data.get('status'),
+            'duration': int(duration.total_seconds()),
+        }
+    return entry
+
+
+def phase_baselines(path, runs):
+    """ Read the history file and return the median duration of the last completed runs of each phase
+
+    Returns a dict of phase: (baseline duration, number of runs it is computed from).
+    The history is read a line at a time and only the last runs of each phase are kept.
+    """
+    durations = {}
+    if not os.path.exists(path):
+        return {}
+    with open(path) as history_file:
+        for line in history_file:
+            try:
+                phases = json.loads(line)['phases']
+            except (ValueError, KeyError, TypeError):
+                continue  # skip a line that was cut short or edited
+            for phase, data in phases.items():
+                if data.get('status') == 'Complete':
+                    durations.setdefault(phase, deque(maxlen=runs)).append(data['duration'])
+
+    baselines = {}
+    for phase, last_durations in durations.items():
+        ordered = sorted(last_durations)
+        middle = len(ordered) // 2
+        median = ordered[middle] if len(ordered) % 2 else (ordered[middle - 1] + ordered[middle]) / 2.0
+        baselines[phase] = (median, len(ordered))
+    return baselines
+
+
+def phase_regressions(entry, baselines, threshold):
+    """ Return the completed phases of a run that took more than threshold percent longer than their baseline """
+    regressions = []
+    for phase, data in sorted(entry['phases'].items()):
+        if data['status'] != 'Complete' or phase not in baselines:
+            continue
+        baseline, runs = baselines[phase]
+        if baseline <= 0 or data['duration'] <= baseline * (1 + threshold / 100.0):
+            continue
+        regressions.append({
+            'phase': phase,
+            'title': data['title'],
+            'duration': str(timedelta(seconds=data['duration'])),
+            'baseline': str(timedelta(seconds=int(baseline))),
+            'percent': (data['duration'] - baseline) * 100.0 / baseline,
+            'runs': runs,
+        })
+    return regressions
+
+
+def append_history(path, entry):
+    """ Append the history record of a run to the history file, as a line of JSON """
+    history_dir = os.path.dirname(path)
+    if history_dir and not os.path.isdir(history_dir):
+        os.makedirs(history_dir)
+    with open(path, 'a') as history_file:
+        history_file.write(json.dumps(entry, sort_keys=True) + '\n')
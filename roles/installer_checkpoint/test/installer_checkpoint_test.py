@@ -0,0 +1,71 @@
+import json
+import os
+import sys
+
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), os.pardir, 'callback_plugins'))
+
+from installer_checkpoint import (  # noqa: E402
+    append_history, history_entry, phase_baselines, phase_regressions, phase_time_delta,
+)
+
+
+def phase(title, start, end=None, status='Complete'):
+    data = dict(title=title, status=status, start=start)
+    if end:
+        data['end'] = end
+    return data
+
+
+def test_phase_time_delta():
+    assert phase_time_delta(phase('Node Install', '20180101100000Z', '20180101101411Z')) == '0:14:11'
+    assert phase_time_delta(dict(title='Node Install')) == ''
+
+
+def test_history_entry():
+    entry = history_entry({
+        'installer_phase_node': phase('Node Install', '20180101100000Z', '20180101101411Z'),
+        'installer_phase_master': phase('Master Install', '20180101100000Z', status='In Progress'),
+        'installer_phase_etcd': dict(title='etcd Install', status='In Progress'),
+    }, 3, '3.10.0')
+
+    assert entry['hosts'] == 3
+    assert entry['version'] == '3.10.0'
+    assert sorted(entry['phases']) == ['installer_phase_master', 'installer_phase_node']
+    assert entry['phases']['installer_phase_node'] == dict(title='Node Install', status='Complete', duration=851)
+
+
+def run(**durations):
+    return dict(hosts=3, version='3.10.0', phases=dict(
+        (name, dict(title=name.title(), status='Complete', duration=duration))
+        for name, duration in durations.items()
+    ))
+
+
+def test_phase_baselines(tmpdir):
+    path = str(tmpdir.join('history', 'phases.jsonl'))
+    assert phase_baselines(path, 3) == {}
+
+    for entry in [run(node=1000, master=100), run(node=100), run(node=200), run(node=300, master=200)]:
+        append_history(path, entry)
+    failed = run(node=5000)
+    failed['phases']['node']['status'] = 'In Progress'
+    append_history(path, failed)
+    with open(path, 'a') as history_file:
+        history_file.write('{"phases": {"node": {"sta\n')
+
+    # only the last 3 completed runs of a phase make its baseline
+    assert phase_baselines(path, 3) == {'node': (200, 3), 'master': (150.0, 2)}
+    assert json.loads(open(path).readline())['phases']['node']['duration'] == 1000
+
+
+def test_phase_regressions():
+    baselines = {'node': (100, 5), 'master': (100, 5), 'etcd': (0, 1)}
+    entry = run(node=150, master=110, etcd=10, hosted=1000)
+
+    regressions = phase_regressions(entry, baselines, 20)
+
+    assert [regression['phase'] for regression in regressions] == ['node']
+    assert regressions[0]['percent'] == 50.0
+    assert regressions[0]['duration'] == '0:02:30'
+    assert regressions[0]['baseline'] == '0:01:40'
+    assert phase_regressions(entry, baselines, 5)[0]['phase'] == 'master'
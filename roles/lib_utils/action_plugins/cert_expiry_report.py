@@ -0,0 +1,147 @@
+"""
+Ansible action plugin to write the openshift_cert_expiry results of many hosts
+into a single report file.
+
+Unlike rendering `oo_cert_expiry_results_to_json` through a template, the
+results of each host are written to the file as soon as they are read, and
+the summary is added up along the way, so the whole report never needs to
+be held in memory or templated at once.
+"""
+import heapq
+import json
+import os
+import tempfile
+
+from ansible.plugins.action import ActionBase
+from ansible import errors
+
+
+REPORT_FORMATS = ('json', 'jsonl')
+# Kinds of certificates in the check_results of openshift_cert_expiry
+CERT_KINDS = ('ocp_certs', 'etcd', 'kubeconfigs', 'router', 'registry', 'secrets')
+SUMMARY_KEYS = ('warning', 'expired', 'ok', 'total')
+
+
+def host_certs(host, check_results):
+    """Yield one dict for each certificate in a host's check results, for the expiring soonest index"""
+    for kind in CERT_KINDS:
+        for cert in check_results.get(kind) or []:
+            yield {
+                'host': host,
+                'kind': kind,
+                'cert_cn': cert.get('cert_cn'),
+                'path': cert.get('path'),
+                'expiry': cert.get('expiry'),
+                'days_remaining': cert.get('days_remaining'),
+                'health': cert.get('health'),
+            }
+
+
+def expiry_key(cert):
+    """Sort key for certificates by expiry date, which openshift_cert_expiry reports like '2019-01-10 16:35:21'."""
+    return (str(cert['expiry']), cert['host'], str(cert['path']))
+
+
+def write_report(outfile, host_results, report_format='json', expiring_soonest=0):
+    """Write the results of each host to outfile, in one pass over host_results.
+
+    `host_results` is an iterable of (host, result) tuples, `result` being what
+    the openshift_cert_expiry module returned on the host. In 'json' format the
+    report has the same `data` and `summary` keys `oo_cert_expiry_results_to_json`
+    gives; in 'jsonl' format, each host is a line of its own, followed by a
+    line with the summary. If `expiring_soonest` is non-zero, that many of the
+    reported certificates that expire first are added to the report as well,
+    soonest first.
+
+    Returns the summary.
+    """
+    summary = dict((key, 0) for key in SUMMARY_KEYS)
+    summary['hosts'] = 0
+    soonest = []
+
+    if report_format == 'json':
+        outfile.write('{"data": {')
+    for host, result in host_results:
+        check_results = result.get('check_results', {})
+        if report_format == 'json':
+            outfile.write('{}{}: {}'.format(', ' if summary['hosts'] else '', json.dumps(host),
+                                            json.dumps(check_results)))
+        else:
+            outfile.write(json.dumps({'host': host, 'check_results': check_results}) + '\n')
+
+        summary['hosts'] += 1
+        for key in SUMMARY_KEYS:
+            summary[key] += result.get('summary', {}).get(key, 0)
+
+        if expiring_soonest:
+            # only ever keep the certificates expiring first so far
+            soonest = heapq.nsmallest(expiring_soonest, soonest + list(host_certs(host, check_results)),
+                                      key=expiry_key)
+
+    if report_format == 'json':
+        outfile.write('}, "summary": ' + json.dumps(summary))
+        if expiring_soonest:
+            outfile.write(', "expiring_soonest": ' + json.dumps(soonest))
+        outfile.write('}\n')
+    else:
+        outfile.write(json.dumps({'summary': summary}) + '\n')
+        if expiring_soonest:
+            outfile.write(json.dumps({'expiring_soonest': soonest}) + '\n')
+
+    return summary
+
+
+# pylint: disable=too-few-public-methods
+class ActionModule(ActionBase):
+    """Action plugin to write a certificate expiry report for the play hosts."""
+
+    def run(self, tmp=None, task_vars=None):
+        """Run this action module"""
+        result = super(ActionModule, self).run(tmp, task_vars)
+        task_vars = task_vars or {}
+
+        dest = self._task.args.get('dest')
+        if not dest:
+            raise errors.AnsibleModuleError("'dest' is required")
+        report_format = self._task.args.get('format', 'json')
+        if report_format not in REPORT_FORMATS:
+            raise errors.AnsibleModuleError(
+                "'format' must be one of {}, not '{}'".format(', '.join(REPORT_FORMATS), report_format))
+        try:
+            expiring_soonest = int(self._task.args.get('expiring_soonest', 0))
+        except ValueError:
+            raise errors.AnsibleModuleError("'expiring_soonest' must be a number")
+        hosts = self._task.args.get('hosts') or task_vars.get('ansible_play_hosts', [])
+        result_var = self._task.args.get('result_var', 'check_results')
+
+        hostvars = task_vars.get('hostvars', {})
+        missing = []
+
+        def host_results():
+            """Read the registered results lazily, so only one host's are held at a time."""
+            for host in hosts:
+                host_result = hostvars[host].get(result_var)
+                if not host_result or 'check_results' not in host_result:
+                    missing.append(host)
+                    continue
+                yield host, host_result
+
+        dest = os.path.expanduser(dest)
+        dest_dir = os.path.dirname(os.path.abspath(dest))
+        # write to a temporary file and rename it, so a partial report is never left at dest
+        tmp_fd, tmp_path = tempfile.mkstemp(dir=dest_dir, prefix='.cert-expiry-report-')
+        try:
+            with os.fdopen(tmp_fd, 'w') as outfile:
+                summary = write_report(outfile, host_results(), report_format, expiring_soonest)
+            os.chmod(tmp_path, 0o644)
+            os.rename(tmp_path, dest)
+        except Exception:  # pylint: disable=broad-except; cleaned up, then raised again
+            os.remove(tmp_path)
+            raise
+
+        result['changed'] = True
+        result['dest'] = dest
+        result['summary'] = summary
+        if missing:
+            result['hosts_without_results'] = missing
+        return result
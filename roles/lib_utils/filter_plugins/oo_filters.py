@@ -5,13 +5,14 @@
 Custom filters for use in openshift-ansible
 """
 import ast
+import hashlib
 import json
 import os
 import pdb
 import random
 
 from base64 import b64encode
-from collections import Mapping
+from collections import Mapping, OrderedDict
 # pylint no-name-in-module and import-error disabled here because pylint
 # fails to properly detect the packages when installed in a virtualenv
 from distutils.util import strtobool  # pylint:disable=no-name-in-module,import-error
@@ -35,6 +36,14 @@ except ImportError:
     pass
 
 
+# Most certificates parsed by the filters below, see _certificate_names
+CERTIFICATE_NAMES_MEMO_SIZE = 256
+_CERTIFICATE_NAMES_MEMO = OrderedDict()
+# Most results of lib_utils_oo_collect(..., memoize=True) remembered
+COLLECT_MEMO_SIZE = 32
+_COLLECT_MEMO = OrderedDict()
+
+
 # pylint: disable=C0103
 
 def lib_utils_oo_pdb(arg):
@@ -58,8 +67,13 @@ def get_attr(data, attribute=None):
     if not attribute:
         raise errors.AnsibleFilterError("|failed expects attribute to be set")
 
+    return _get_attr_path(data, attribute.split('.'))
+
+
+def _get_attr_path(data, path):
+    """ Like get_attr, with the attribute already split into a list of keys """
     ptr = data
-    for attr in attribute.split('.'):
+    for attr in path:
         if attr in ptr:
             ptr = ptr[attr]
         else:
@@ -78,7 +92,7 @@ def oo_flatten(data):
     return [item for sublist in data for item in sublist]
 
 
-def lib_utils_oo_collect(data_list, attribute=None, filters=None):
+def lib_utils_oo_collect(data_list, attribute=None, filters=None, memoize=False):
     """ This takes a list of dict and collects all attributes specified into a
         list. If filter is specified then we will include all items that
         match _ALL_ of filters.  If a dict entry is missing the key in a
@@ -105,6 +119,16 @@ def lib_utils_oo_collect(data_list, attribute=None, filters=None):
             attribute = 'a'
             filters   = {'z': 'z'}
             returns [1, 2, 3, 5]
+
+        The attribute and filter keys are split once, items are tested
+        against the filters until one does not match, and nested lists are
+        walked without recursion.
+
+        With memoize=True, the result is remembered for the same list object
+        (not merely an equal one), attribute and filters, so that collecting
+        the same thing from a large list several times is done once. Only use
+        it for lists that are not modified in between, e.g. built once in a
+        play's vars. The last COLLECT_MEMO_SIZE results are remembered.
     """
     if not isinstance(data_list, list):
         raise errors.AnsibleFilterError("lib_utils_oo_collect expects to filter on a List")
@@ -112,29 +136,65 @@ def lib_utils_oo_collect(data_list, attribute=None, filters=None):
     if not attribute:
         raise errors.AnsibleFilterError("lib_utils_oo_collect expects attribute to be set")
 
-    data = []
-    retval = []
+    if filters is not None and not isinstance(filters, dict):
+        raise errors.AnsibleFilterError(
+            "lib_utils_oo_collect expects filter to be a dict")
 
-    for item in data_list:
-        if isinstance(item, list):
-            retval.extend(lib_utils_oo_collect(item, attribute, filters))
+    memo_key = None
+    if memoize:
+        try:
+            memo_key = (id(data_list), attribute, tuple(sorted((filters or {}).items())))
+            hash(memo_key)
+        except TypeError:
+            memo_key = None  # unhashable filter values, not remembered
+        memo = _COLLECT_MEMO.pop(memo_key, None)
+        # the list itself is kept in the memo, so its id cannot be reused
+        if memo is not None and memo[0] is data_list:
+            _COLLECT_MEMO[memo_key] = memo
+            return list(memo[1])
+
+    path = attribute.split('.')
+    filter_paths = [(key.split('.'), value) for key, value in iteritems(filters or {})]
+
+    retval = []
+    for item in _collect_order(data_list):
+        for filter_path, value in filter_paths:
+            if _get_attr_path(item, filter_path) != value:
+                break
         else:
-            data.append(item)
-
-    if filters is not None:
-        if not isinstance(filters, dict):
-            raise errors.AnsibleFilterError(
-                "lib_utils_oo_collect expects filter to be a dict")
-        retval.extend([get_attr(d, attribute) for d in data if (
-            all([get_attr(d, key) == filters[key] for key in filters]))])
-    else:
-        retval.extend([get_attr(d, attribute) for d in data])
+            val = _get_attr_path(item, path)
+            if val is not None:
+                retval.append(val)
 
-    retval = [val for val in retval if val is not None]
+    if memo_key is not None:
+        if len(_COLLECT_MEMO) >= COLLECT_MEMO_SIZE:
+            _COLLECT_MEMO.popitem(last=False)
+        _COLLECT_MEMO[memo_key] = (data_list, tuple(retval))
 
     return retval
 
 
+def _collect_order(data_list):
+    """ Returns the items of data_list and of the lists nested in it, in the
+        order lib_utils_oo_collect has always returned them: the items of the
+        nested lists first, then those of the list itself.
+    """
+    items = []
+    # each frame is an iterator over a list and the items of that list seen so far
+    stack = [(iter(data_list), [])]
+    while stack:
+        iterator, own_items = stack[-1]
+        for item in iterator:
+            if isinstance(item, list):
+                stack.append((iter(item), []))
+                break
+            own_items.append(item)
+        else:
+            stack.pop()
+            items.extend(own_items)
+    return items
+
+
 def lib_utils_oo_select_keys_from_list(data, keys):
     """ This returns a list, which contains the value portions for the keys
         Ex: data = { 'a':1, 'b':2, 'c':3 }
@@ -281,6 +341,36 @@ def haproxy_backend_masters(hosts, port):
     return servers
 
 
+def _certificate_names(pem):
+    """ Returns a tuple (common name, [subjectAltName entries]) for a
+        PEM certificate, the entries being like 'DNS:name' or
+        'IP Address:1.2.3.4'.
+
+        Filters are templated again each time a variable using them is
+        referenced, on every host, so the same certificates would be
+        parsed over and over. Results are remembered by digest of the
+        certificate contents, for the most recently used
+        CERTIFICATE_NAMES_MEMO_SIZE certificates.
+    """
+    if not isinstance(pem, bytes):
+        pem = pem.encode('utf-8')
+    key = hashlib.sha256(pem).hexdigest()
+    names = _CERTIFICATE_NAMES_MEMO.pop(key, None)
+    if names is None:
+        cert = OpenSSL.crypto.load_certificate(OpenSSL.crypto.FILETYPE_PEM, pem)
+        alt_names = []
+        for i in range(cert.get_extension_count()):
+            if cert.get_extension(i).get_short_name() in ('subjectAltName', b'subjectAltName'):
+                alt_names = str(cert.get_extension(i)).split(', ')
+        common_name = cert.get_subject().commonName
+        names = (common_name.decode() if isinstance(common_name, bytes) else common_name, tuple(alt_names))
+        if len(_CERTIFICATE_NAMES_MEMO) >= CERTIFICATE_NAMES_MEMO_SIZE:
+            _CERTIFICATE_NAMES_MEMO.popitem(last=False)
+    # (re)insert as the most recently used
+    _CERTIFICATE_NAMES_MEMO[key] = names
+    return names[0], list(names[1])
+
+
 # pylint: disable=too-many-branches, too-many-nested-blocks
 def lib_utils_oo_parse_named_certificates(certificates, named_certs_dir, internal_hostnames):
     """ Parses names from list of certificate hashes.
@@ -323,13 +413,11 @@ def lib_utils_oo_parse_named_certificates(certificates, named_certs_dir, interna
 
         try:
             st_cert = open(certificate['certfile'], 'rt').read()
-            cert = OpenSSL.crypto.load_certificate(OpenSSL.crypto.FILETYPE_PEM, st_cert)
-            certificate['names'].append(str(cert.get_subject().commonName.decode()))
-            for i in range(cert.get_extension_count()):
-                if cert.get_extension(i).get_short_name() == 'subjectAltName':
-                    for name in str(cert.get_extension(i)).split(', '):
-                        if 'DNS:' in name:
-                            certificate['names'].append(name.replace('DNS:', ''))
+            common_name, alt_names = _certificate_names(st_cert)
+            certificate['names'].append(str(common_name))
+            for name in alt_names:
+                if 'DNS:' in name:
+                    certificate['names'].append(name.replace('DNS:', ''))
         except Exception:
             raise errors.AnsibleFilterError(("|failed to parse certificate '%s', " % certificate['certfile'] +
                                              "please specify certificate names in host inventory"))
@@ -390,13 +478,12 @@ def lib_utils_oo_parse_certificate_san(certificate):
     names = []
 
     try:
-        lcert = OpenSSL.crypto.load_certificate(OpenSSL.crypto.FILETYPE_PEM, certificate)
-        for i in range(lcert.get_extension_count()):
-            if lcert.get_extension(i).get_short_name() == 'subjectAltName':
-                sanstr = str(lcert.get_extension(i))
-                sanstr = sanstr.replace('DNS:', '')
-                sanstr = sanstr.replace('IP Address:', '')
-                names = sanstr.split(', ')
+        alt_names = _certificate_names(certificate)[1]
+        if alt_names:
+            sanstr = ', '.join(alt_names)
+            sanstr = sanstr.replace('DNS:', '')
+            sanstr = sanstr.replace('IP Address:', '')
+            names = sanstr.split(', ')
     except Exception:
         raise errors.AnsibleFilterError("|failed to parse certificate")
 
@@ -1,14 +1,19 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 # pylint: disable=line-too-long,invalid-name
+# pylint: disable=too-many-lines; the module is sent to hosts on its own, so it
+# carries the DER certificate parser used on hosts without pyOpenSSL.
 
 """For details on this module see DOCUMENTATION (below)"""
 
 import base64
 import datetime
+import hashlib
 import io
+import json
 import os
 import subprocess
+import tempfile
 import yaml
 
 # pylint import-error disabled because pylint cannot find the package
@@ -69,6 +74,17 @@ options:
       - By default only certificates which have expired, or will expire within the C(warning_days) window will be reported.
     required: false
     default: false
+  secret_discovery:
+    description:
+      - Check every secret of the C(secret_namespaces) holding a certificate instead of only C(router-certs) and C(registry-certificates).
+      - Certificates inlined in route objects (C(spec.tls) of edge and re-encrypt routes) are not examined, only those kept in secrets.
+    required: false
+    default: false
+  secret_namespaces:
+    description:
+      - Namespaces searched for secrets when C(secret_discovery) is enabled, with one C(oc get secrets -n) call each.
+    required: false
+    default: [default]
 
 author: "Tim Bielawa (@tbielawa) <tbielawa@redhat.com>"
 '''
@@ -228,6 +244,242 @@ object"""
         return self.subjects
 
 
+######################################################################
+# In-process certificate parsing
+#
+# Without PyOpenSSL, forking 'openssl x509' for every certificate adds
+# up on hosts with many certificates. The few fields we need are easy
+# to read straight from the DER encoding, so we do that instead, and
+# only fall back to the openssl command if a certificate cannot be
+# parsed this way.
+
+PEM_CERT_BEGIN = '-----BEGIN CERTIFICATE-----'
+PEM_CERT_END = '-----END CERTIFICATE-----'
+
+# Short names for the attribute types seen in certificate subjects, as openssl prints them
+DER_NAME_OIDS = {
+    '2.5.4.3': 'CN',
+    '2.5.4.5': 'serialNumber',
+    '2.5.4.6': 'C',
+    '2.5.4.7': 'L',
+    '2.5.4.8': 'ST',
+    '2.5.4.10': 'O',
+    '2.5.4.11': 'OU',
+    '1.2.840.113549.1.9.1': 'emailAddress',
+}
+DER_SAN_OID = '2.5.29.17'
+
+# DER tags
+DER_INTEGER = 0x02
+DER_OID = 0x06
+DER_UTCTIME = 0x17
+DER_GENERALIZEDTIME = 0x18
+DER_VERSION = 0xa0  # [0] EXPLICIT
+DER_EXTENSIONS = 0xa3  # [3] EXPLICIT
+
+# GeneralName tags in a subjectAltName and their openssl prefixes
+DER_SAN_PREFIXES = {
+    0x81: 'email',
+    0x82: 'DNS',
+    0x86: 'URI',
+}
+DER_SAN_IP = 0x87
+
+
+def pem_to_der(pem_string):
+    """Return the DER bytes of each certificate in a PEM string, in order."""
+    ders = []
+    for block in pem_string.split(PEM_CERT_BEGIN)[1:]:
+        body = block.split(PEM_CERT_END)[0]
+        ders.append(base64.b64decode(''.join(body.split())))
+    return ders
+
+
+def der_read(data, offset):
+    """Read the DER element at `offset` in the bytearray `data`.
+
+Returns a tuple of (tag, start of value, end of value)"""
+    if offset + 2 > len(data):
+        raise ValueError('truncated DER element')
+    tag = data[offset]
+    length = data[offset + 1]
+    start = offset + 2
+    if length & 0x80:
+        num_bytes = length & 0x7f
+        if not num_bytes or start + num_bytes > len(data):
+            raise ValueError('unsupported DER length')
+        length = 0
+        for byte in data[start:start + num_bytes]:
+            length = (length << 8) | byte
+        start += num_bytes
+    if start + length > len(data):
+        raise ValueError('truncated DER element')
+    return tag, start, start + length
+
+
+def der_children(data, start, end):
+    """Return a list of (tag, start, end) for the elements between `start` and `end`"""
+    children = []
+    offset = start
+    while offset < end:
+        child = der_read(data, offset)
+        children.append(child)
+        offset = child[2]
+    return children
+
+
+def der_oid(data, start, end):
+    """Return an OBJECT IDENTIFIER value in dotted form"""
+    arcs = []
+    value = 0
+    for byte in data[start:end]:
+        value = (value << 7) | (byte & 0x7f)
+        if not byte & 0x80:
+            arcs.append(value)
+            value = 0
+    if not arcs:
+        raise ValueError('empty OID')
+    first = min(arcs[0] // 40, 2)
+    return '.'.join(str(arc) for arc in [first, arcs[0] - 40 * first] + arcs[1:])
+
+
+def der_text(data, start, end):
+    """Return a string value (UTF8String, PrintableString, IA5String, ...) as text"""
+    return bytes(data[start:end]).decode('utf-8', 'replace')
+
+
+def der_time(data, tag, start, end):
+    """Return a UTCTime or GeneralizedTime value in the form '20180922170439Z'"""
+    value = der_text(data, start, end)
+    if tag == DER_UTCTIME:
+        # two-digit years: 50 and above are in the 1900s (RFC 5280)
+        value = ('19' if int(value[:2]) >= 50 else '20') + value
+    elif tag != DER_GENERALIZEDTIME:
+        raise ValueError('not a time value')
+    return value
+
+
+def der_ip_address(octets):
+    """Format an iPAddress GeneralName the way openssl does"""
+    if len(octets) == 4:
+        return '.'.join(str(byte) for byte in octets)
+    if len(octets) == 16:
+        return ':'.join('{:X}'.format((octets[i] << 8) | octets[i + 1]) for i in range(0, 16, 2))
+    return '<invalid>'
+
+
+class DERCertificate(object):
+    """Provides the same accessors as `OpenSSL.crypto.load_certificate()`
+and `FakeOpenSSLCertificate` (serial, subject, subjectAltName and
+notAfter), reading them directly from the DER encoding of a certificate.
+
+Raises ValueError if the certificate cannot be parsed.
+    """
+    def __init__(self, der_bytes):
+        self.serial = None
+        self.subject = None
+        self.extensions = []
+        self.not_after = None
+        try:
+            self._parse_cert(bytearray(der_bytes))
+        except IndexError:
+            raise ValueError('missing certificate fields')
+
+    def _parse_cert(self, data):
+        """Walk the TBSCertificate structure of RFC 5280, section 4.1"""
+        _, cert_start, cert_end = der_read(data, 0)
+        _, tbs_start, tbs_end = der_children(data, cert_start, cert_end)[0]
+        fields = der_children(data, tbs_start, tbs_end)
+        if fields and fields[0][0] == DER_VERSION:
+            fields = fields[1:]
+        if len(fields) < 6 or fields[0][0] != DER_INTEGER:
+            raise ValueError('not a certificate')
+        # serialNumber, signature, issuer, validity, subject, subjectPublicKeyInfo, [extensions]
+        serial, validity, subject = fields[0], fields[3], fields[4]
+
+        self.serial = 0
+        for byte in data[serial[1]:serial[2]]:
+            self.serial = (self.serial << 8) | byte
+
+        not_after = der_children(data, validity[1], validity[2])[1]
+        self.not_after = der_time(data, *not_after)
+
+        self.subject = DERCertificateSubjects(self._parse_subject(data, subject[1], subject[2]))
+
+        for tag, ext_start, _ in fields[5:]:
+            if tag == DER_EXTENSIONS:
+                self.extensions.extend(self._parse_extensions(data, ext_start))
+
+    @staticmethod
+    def _parse_subject(data, start, end):
+        """Return the (name, value) components of a subject Name"""
+        components = []
+        for _, rdn_start, rdn_end in der_children(data, start, end):
+            for _, attr_start, attr_end in der_children(data, rdn_start, rdn_end):
+                attr = der_children(data, attr_start, attr_end)
+                oid = der_oid(data, attr[0][1], attr[0][2])
+                components.append((DER_NAME_OIDS.get(oid, oid), der_text(data, attr[1][1], attr[1][2])))
+        return components
+
+    @staticmethod
+    def _parse_extensions(data, offset):
+        """Return the subjectAltName extensions of the [3] Extensions at `offset`"""
+        extensions = []
+        _, start, end = der_read(data, offset)
+        for _, ext_start, ext_end in der_children(data, start, end):
+            ext = der_children(data, ext_start, ext_end)
+            if der_oid(data, ext[0][1], ext[0][2]) == DER_SAN_OID:
+                # the last element is the OCTET STRING holding the GeneralNames
+                extensions.append(FakeOpenSSLCertificateSANExtension(DERCertificate._parse_san(data, ext[-1][1])))
+        return extensions
+
+    @staticmethod
+    def _parse_san(data, offset):
+        """Format subjectAltName GeneralNames like 'DNS:foo, IP Address:10.0.0.1'"""
+        names = []
+        _, start, end = der_read(data, offset)
+        for tag, name_start, name_end in der_children(data, start, end):
+            if tag in DER_SAN_PREFIXES:
+                names.append('{}:{}'.format(DER_SAN_PREFIXES[tag], der_text(data, name_start, name_end)))
+            elif tag == DER_SAN_IP:
+                names.append('IP Address:' + der_ip_address(data[name_start:name_end]))
+        return ', '.join(names)
+
+    def get_serial_number(self):
+        """Return the serial number of the cert"""
+        return self.serial
+
+    def get_subject(self):
+        """Return the subject, which implements get_components()"""
+        return self.subject
+
+    def get_extension(self, i):
+        """Return an extension, which implements get_short_name()"""
+        return self.extensions[i]
+
+    def get_extension_count(self):
+        """ get_extension_count """
+        return len(self.extensions)
+
+    def get_notAfter(self):
+        """Returns a date stamp as a string in the form
+'20180922170439Z'. strptime the result with format param:
+'%Y%m%d%H%M%SZ'."""
+        return self.not_after
+
+
+# pylint: disable=too-few-public-methods
+class DERCertificateSubjects(object):
+    """What `get_subject` returns for a DERCertificate"""
+
+    def __init__(self, components):
+        self.subjects = components
+
+    def get_components(self):
+        """Returns a list of tuples"""
+        return self.subjects
+
+
 ######################################################################
 def filter_paths(path_list):
     """`path_list` - A list of file paths to check. Only files which exist
@@ -268,8 +520,16 @@ A tuple of the form:
         cert_loaded = OpenSSL.crypto.load_certificate(
             OpenSSL.crypto.FILETYPE_PEM, _cert_string)
     else:
-        # Missing library, work-around required. Run the 'openssl'
-        # command on it to decode it
+        # Missing library, work-around required. Read the first
+        # certificate of the PEM data ourselves, like openssl would.
+        cert_loaded = None
+        try:
+            cert_loaded = DERCertificate(pem_to_der(_cert_string)[0])
+        except (IndexError, TypeError, ValueError):
+            pass
+
+    if cert_loaded is None:
+        # Run the 'openssl' command on it to decode it
         cmd = 'openssl x509 -text'
         try:
             openssl_proc = subprocess.Popen(cmd.split(),
@@ -324,6 +584,191 @@ A tuple of the form:
     return (cert_subject, cert_expiry_date, time_remaining, cert_loaded.get_serial_number())
 
 
+CERT_CACHE_VERSION = 1
+CERT_CACHE_DATE_FORMAT = '%Y%m%d%H%M%SZ'
+
+
+class CertCache(object):
+    """Parsed certificate metadata from previous runs, stored as a JSON file.
+
+Entries are keyed by where a certificate was read from (a file path or
+a secret selfLink). Each records the inode, mtime and size of the file
+the certificate was read from, if any, and a digest of the certificate
+data. A certificate whose file is unchanged, or whose data has the same
+digest, is not parsed again; only its expiry date is needed to classify
+it against the current time.
+
+The cache is only an optimization. If it cannot be read or written,
+every certificate is simply parsed as before.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        # Entries used in this run. Only these are saved, so certificates
+        # which have gone away drop out of the cache.
+        self.used = {}
+        self.hits = 0
+        self.misses = 0
+        try:
+            with io.open(path, 'r', encoding='utf-8') as fp:
+                cache = json.load(fp)
+            if cache.get('version') == CERT_CACHE_VERSION:
+                self.entries = cache.get('certs', {})
+        except (IOError, OSError, ValueError, AttributeError):
+            pass
+
+    def lookup(self, key, stat=None, digest=None):
+        """Return the entry for `key` if its file `stat` or data `digest`
+still match, otherwise None"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if stat is not None and entry.get('stat') == stat:
+            pass
+        elif digest is not None and entry.get('digest') == digest:
+            # Same certificate, the file was just touched or replaced
+            entry['stat'] = stat
+        else:
+            return None
+        self.hits += 1
+        self.used[key] = entry
+        return entry
+
+    # pylint: disable=too-many-arguments
+    def store(self, key, stat, digest, subject, expiry, serial):
+        """Record the metadata of a certificate which was just parsed"""
+        self.misses += 1
+        entry = {
+            'stat': stat,
+            'digest': digest,
+            'subject': subject,
+            'expiry': expiry.strftime(CERT_CACHE_DATE_FORMAT),
+            'serial': serial,
+        }
+        self.entries[key] = entry
+        self.used[key] = entry
+        return entry
+
+    def save(self):
+        """Write the entries used in this run to the cache file"""
+        try:
+            cache_dir = os.path.dirname(self.path)
+            if not os.path.isdir(cache_dir):
+                os.makedirs(cache_dir)
+            # Write to a temporary file and rename it, so a concurrent
+            # run never reads a partial cache
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w') as fp:
+                json.dump({'version': CERT_CACHE_VERSION, 'certs': self.used}, fp)
+            os.rename(tmp_path, self.path)
+        except (IOError, OSError):
+            pass
+
+
+def cached_cert_result(entry, now):
+    """Return a `CertCache` entry in the form `load_and_handle_cert`
+returns: (subject, expiry_date, time_remaining, serial)"""
+    cert_expiry_date = datetime.datetime.strptime(entry['expiry'], CERT_CACHE_DATE_FORMAT)
+    return (entry['subject'], cert_expiry_date, cert_expiry_date - now, entry['serial'])
+
+
+# pylint: disable=too-many-arguments
+def load_cert_cached(cert_string, now, cache, key, base64decode=False, ans_module=None, stat=None):
+    """Like `load_and_handle_cert`, but use the metadata in `cache`
+(a `CertCache`, or None to not use a cache) recorded under `key` if the
+certificate has not changed since it was parsed."""
+    if cache is None:
+        return load_and_handle_cert(cert_string, now, base64decode=base64decode, ans_module=ans_module)
+
+    digest = hashlib.sha256(cert_string.encode('utf-8')).hexdigest()
+    entry = cache.lookup(key, stat=stat, digest=digest)
+    if entry is None:
+        (cert_subject,
+         cert_expiry_date,
+         _,
+         cert_serial) = load_and_handle_cert(cert_string, now, base64decode=base64decode, ans_module=ans_module)
+        entry = cache.store(key, stat, digest, cert_subject, cert_expiry_date, cert_serial)
+    return cached_cert_result(entry, now)
+
+
+def load_cert_file(path, now, cache=None, ans_module=None):
+    """Like `load_cert_cached` for a certificate file. The file is not
+even read if its inode, mtime and size are the ones in `cache`."""
+    stat = None
+    if cache is not None:
+        file_stat = os.stat(path)
+        stat = [file_stat.st_ino, file_stat.st_mtime, file_stat.st_size]
+        entry = cache.lookup(path, stat=stat)
+        if entry is not None:
+            return cached_cert_result(entry, now)
+
+    with io.open(path, 'r', encoding='utf-8') as fp:
+        cert = fp.read()
+    return load_cert_cached(cert, now, cache, path, ans_module=ans_module, stat=stat)
+
+
+# Data keys of secrets which hold a certificate, in order of preference
+TLS_SECRET_KEYS = ['tls.crt', 'registry.crt']
+# Set on the secrets generated for service serving certificates
+ORIGINATING_SERVICE_ANNOTATION = 'service.alpha.openshift.io/originating-service-name'
+
+
+def tls_secret_key(secret):
+    """Return the data key of the certificate held in `secret`, or None"""
+    data = secret.get('data') or {}
+    for key in TLS_SECRET_KEYS:
+        if data.get(key):
+            return key
+    return None
+
+
+def list_tls_secrets(namespaces):
+    """Return the secrets holding a certificate in the given namespaces,
+listed by one 'oc get' command per namespace so that no secret outside
+of them is ever read. A namespace which can not be listed is
+skipped. On hosts without an 'oc' command an empty list is returned."""
+    tls_secrets = []
+    for namespace in namespaces:
+        try:
+            secrets_raw = subprocess.Popen(['oc', 'get', 'secrets', '-n', namespace, '-o', 'json'],
+                                           stdout=subprocess.PIPE)
+            secrets = json.loads(secrets_raw.communicate()[0].decode('utf-8'))
+        except OSError:
+            # The OC command doesn't exist here. Move along.
+            return []
+        except ValueError:
+            # Not a master, or the namespace can not be listed
+            continue
+        tls_secrets.extend(secret for secret in secrets.get('items', []) if tls_secret_key(secret))
+    return tls_secrets
+
+
+def secret_owner(secret):
+    """Return what a secret belongs to, like 'service/router', or None if unknown"""
+    metadata = secret.get('metadata', {})
+    service = (metadata.get('annotations') or {}).get(ORIGINATING_SERVICE_ANNOTATION)
+    if service:
+        return 'service/{}'.format(service)
+    for owner in metadata.get('ownerReferences') or []:
+        return '{}/{}'.format(owner.get('kind', '').lower(), owner.get('name'))
+    return None
+
+
+def secret_kind(secret):
+    """Classify a secret holding a certificate as 'router', 'registry' or 'secrets'"""
+    metadata = secret.get('metadata', {})
+    name = metadata.get('name', '')
+    service = (metadata.get('annotations') or {}).get(ORIGINATING_SERVICE_ANNOTATION, '')
+    if name == 'registry-certificates' or service == 'docker-registry':
+        return 'registry'
+    # 'oc adm router NAME' serves with the 'NAME-certs' secret of the NAME service
+    if name == 'router-certs' or service.startswith('router') or \
+            (name.startswith('router') and name.endswith('-certs')):
+        return 'router'
+    return 'secrets'
+
+
 def classify_cert(cert_meta, now, time_remaining, expire_window, cert_list):
     """Given metadata about a certificate under examination, classify it
     into one of three categories, 'ok', 'warning', and 'expired'.
@@ -358,7 +803,8 @@ Return:
     return cert_list
 
 
-def tabulate_summary(certificates, kubeconfigs, etcd_certs, router_certs, registry_certs):
+# pylint: disable=too-many-arguments
+def tabulate_summary(certificates, kubeconfigs, etcd_certs, router_certs, registry_certs, secret_certs=None):
     """Calculate the summary text for when the module finishes
 running. This includes counts of each classification and what have
 you.
@@ -369,13 +815,16 @@ Params:
   dicts with filled in `health` keys for system certificates.
 - `kubeconfigs` - as above for kubeconfigs
 - `etcd_certs` - as above for etcd certs
+- `router_certs`, `registry_certs` - as above for router and registry certs
+- `secret_certs` - as above for the other certs found in secrets, if any
 
 Return:
 
 - `summary_results` (dict) - Counts of each cert type classification
   and total items examined.
     """
-    items = certificates + kubeconfigs + etcd_certs + router_certs + registry_certs
+    secret_certs = secret_certs or []
+    items = certificates + kubeconfigs + etcd_certs + router_certs + registry_certs + secret_certs
 
     summary_results = {
         'system_certificates': len(certificates),
@@ -383,6 +832,7 @@ Return:
         'etcd_certificates': len(etcd_certs),
         'router_certs': len(router_certs),
         'registry_certs': len(registry_certs),
+        'secret_certs': len(secret_certs),
         'total': len(items),
         'ok': 0,
         'warning': 0,
@@ -422,7 +872,19 @@ an OpenShift Container Platform cluster
             show_all=dict(
                 required=False,
                 default=False,
-                type='bool')
+                type='bool'),
+            cache_path=dict(
+                required=False,
+                default='',
+                type='str'),
+            secret_discovery=dict(
+                required=False,
+                default=False,
+                type='bool'),
+            secret_namespaces=dict(
+                required=False,
+                default=['default'],
+                type='list')
         ),
         supports_check_mode=True,
     )
@@ -482,6 +944,10 @@ an OpenShift Container Platform cluster
     check_results['meta']['show_all'] = str(module.params['show_all'])
     # All the analyzed certs accumulate here
     ocp_certs = []
+    # Metadata of certs parsed by previous runs, if enabled
+    cert_cache = None
+    if module.params['cache_path']:
+        cert_cache = CertCache(module.params['cache_path'])
 
     ######################################################################
     # Sure, why not? Let's enable check mode.
@@ -540,23 +1006,21 @@ an OpenShift Container Platform cluster
         # Load the certificate and the CA, parse their expiration dates into
         # datetime objects so we can manipulate them later
         for v in cert_meta.values():
-            with io.open(v, 'r', encoding='utf-8') as fp:
-                cert = fp.read()
-                (cert_subject,
-                 cert_expiry_date,
-                 time_remaining,
-                 cert_serial) = load_and_handle_cert(cert, now, ans_module=module)
+            (cert_subject,
+             cert_expiry_date,
+             time_remaining,
+             cert_serial) = load_cert_file(v, now, cert_cache, ans_module=module)
 
-                expire_check_result = {
-                    'cert_cn': cert_subject,
-                    'path': fp.name,
-                    'expiry': cert_expiry_date,
-                    'days_remaining': time_remaining.days,
-                    'health': None,
-                    'serial': cert_serial
-                }
+            expire_check_result = {
+                'cert_cn': cert_subject,
+                'path': v,
+                'expiry': cert_expiry_date,
+                'days_remaining': time_remaining.days,
+                'health': None,
+                'serial': cert_serial
+            }
 
-                classify_cert(expire_check_result, now, time_remaining, expire_window, ocp_certs)
+            classify_cert(expire_check_result, now, time_remaining, expire_window, ocp_certs)
 
     ######################################################################
     # /Check for OpenShift Container Platform specific certs
@@ -598,7 +1062,7 @@ an OpenShift Container Platform cluster
             (cert_subject,
              cert_expiry_date,
              time_remaining,
-             cert_serial) = load_and_handle_cert(c, now, base64decode=True, ans_module=module)
+             cert_serial) = load_cert_cached(c, now, cert_cache, fp.name, base64decode=True, ans_module=module)
 
             expire_check_result = {
                 'cert_cn': cert_subject,
@@ -628,7 +1092,7 @@ an OpenShift Container Platform cluster
         (cert_subject,
          cert_expiry_date,
          time_remaining,
-         cert_serial) = load_and_handle_cert(c, now, base64decode=True, ans_module=module)
+         cert_serial) = load_cert_cached(c, now, cert_cache, fp.name, base64decode=True, ans_module=module)
 
         expire_check_result = {
             'cert_cn': cert_subject,
@@ -679,23 +1143,21 @@ an OpenShift Container Platform cluster
         pass
 
     for etcd_cert in filter_paths(etcd_certs_to_check):
-        with io.open(etcd_cert, 'r', encoding='utf-8') as fp:
-            c = fp.read()
-            (cert_subject,
-             cert_expiry_date,
-             time_remaining,
-             cert_serial) = load_and_handle_cert(c, now, ans_module=module)
+        (cert_subject,
+         cert_expiry_date,
+         time_remaining,
+         cert_serial) = load_cert_file(etcd_cert, now, cert_cache, ans_module=module)
 
-            expire_check_result = {
-                'cert_cn': cert_subject,
-                'path': fp.name,
-                'expiry': cert_expiry_date,
-                'days_remaining': time_remaining.days,
-                'health': None,
-                'serial': cert_serial
-            }
+        expire_check_result = {
+            'cert_cn': cert_subject,
+            'path': etcd_cert,
+            'expiry': cert_expiry_date,
+            'days_remaining': time_remaining.days,
+            'health': None,
+            'serial': cert_serial
+        }
 
-            classify_cert(expire_check_result, now, time_remaining, expire_window, etcd_certs)
+        classify_cert(expire_check_result, now, time_remaining, expire_window, etcd_certs)
 
     ######################################################################
     # /Check etcd certs
@@ -711,74 +1173,117 @@ an OpenShift Container Platform cluster
     ######################################################################
     router_certs = []
     registry_certs = []
+    secret_certs = []
+
+    if module.params['secret_discovery']:
+        # One 'oc get' per namespace lists its secrets. Those holding a
+        # certificate are parsed here, including the ones of router
+        # shards, service serving certs and the like. Certificates
+        # inlined in routes are not covered.
+        for secret in list_tls_secrets(module.params['secret_namespaces']):
+            secret_path = secret['metadata'].get('selfLink')
+            owner = secret_owner(secret)
+            try:
+                (cert_subject,
+                 cert_expiry_date,
+                 time_remaining,
+                 cert_serial) = load_cert_cached(secret['data'][tls_secret_key(secret)], now, cert_cache,
+                                                 secret_path, base64decode=True, ans_module=module)
+            # pylint: disable=broad-except; a secret holding anything but a
+            # certificate must not keep the others from being reported.
+            except Exception:
+                check_results['meta'].setdefault('unparsed_secrets', []).append(secret_path)
+                continue
 
-    ######################################################################
-    # First the router certs
-    try:
-        router_secrets_raw = subprocess.Popen('oc get -n default secret router-certs -o yaml'.split(),
-                                              stdout=subprocess.PIPE)
-        router_ds = yaml.load(router_secrets_raw.communicate()[0])
-        router_c = router_ds['data']['tls.crt']
-        router_path = router_ds['metadata']['selfLink']
-    except TypeError:
-        # YAML couldn't load the result, this is not a master
-        pass
-    except OSError:
-        # The OC command doesn't exist here. Move along.
-        pass
+            expire_check_result = {
+                'cert_cn': cert_subject,
+                'path': secret_path,
+                'owner': owner,
+                'expiry': cert_expiry_date,
+                'days_remaining': time_remaining.days,
+                'health': None,
+                'serial': cert_serial
+            }
+
+            cert_list = {'router': router_certs, 'registry': registry_certs}.get(secret_kind(secret), secret_certs)
+            classify_cert(expire_check_result, now, time_remaining, expire_window, cert_list)
     else:
-        (cert_subject,
-         cert_expiry_date,
-         time_remaining,
-         cert_serial) = load_and_handle_cert(router_c, now, base64decode=True, ans_module=module)
+        ######################################################################
+        # First the router certs
+        try:
+            router_secrets_raw = subprocess.Popen('oc get -n default secret router-certs -o yaml'.split(),
+                                                  stdout=subprocess.PIPE)
+            router_ds = yaml.load(router_secrets_raw.communicate()[0])
+            router_c = router_ds['data']['tls.crt']
+            router_path = router_ds['metadata']['selfLink']
+        except TypeError:
+            # YAML couldn't load the result, this is not a master
+            pass
+        except OSError:
+            # The OC command doesn't exist here. Move along.
+            pass
+        else:
+            (cert_subject,
+             cert_expiry_date,
+             time_remaining,
+             cert_serial) = load_cert_cached(router_c, now, cert_cache, router_path,
+                                             base64decode=True, ans_module=module)
 
-        expire_check_result = {
-            'cert_cn': cert_subject,
-            'path': router_path,
-            'expiry': cert_expiry_date,
-            'days_remaining': time_remaining.days,
-            'health': None,
-            'serial': cert_serial
-        }
+            expire_check_result = {
+                'cert_cn': cert_subject,
+                'path': router_path,
+                'expiry': cert_expiry_date,
+                'days_remaining': time_remaining.days,
+                'health': None,
+                'serial': cert_serial
+            }
 
-        classify_cert(expire_check_result, now, time_remaining, expire_window, router_certs)
+            classify_cert(expire_check_result, now, time_remaining, expire_window, router_certs)
 
-    ######################################################################
-    # Now for registry
-    try:
-        registry_secrets_raw = subprocess.Popen('oc get -n default secret registry-certificates -o yaml'.split(),
-                                                stdout=subprocess.PIPE)
-        registry_ds = yaml.load(registry_secrets_raw.communicate()[0])
-        registry_c = registry_ds['data']['registry.crt']
-        registry_path = registry_ds['metadata']['selfLink']
-    except TypeError:
-        # YAML couldn't load the result, this is not a master
-        pass
-    except OSError:
-        # The OC command doesn't exist here. Move along.
-        pass
-    else:
-        (cert_subject,
-         cert_expiry_date,
-         time_remaining,
-         cert_serial) = load_and_handle_cert(registry_c, now, base64decode=True, ans_module=module)
+        ######################################################################
+        # Now for registry
+        try:
+            registry_secrets_raw = subprocess.Popen('oc get -n default secret registry-certificates -o yaml'.split(),
+                                                    stdout=subprocess.PIPE)
+            registry_ds = yaml.load(registry_secrets_raw.communicate()[0])
+            registry_c = registry_ds['data']['registry.crt']
+            registry_path = registry_ds['metadata']['selfLink']
+        except TypeError:
+            # YAML couldn't load the result, this is not a master
+            pass
+        except OSError:
+            # The OC command doesn't exist here. Move along.
+            pass
+        else:
+            (cert_subject,
+             cert_expiry_date,
+             time_remaining,
+             cert_serial) = load_cert_cached(registry_c, now, cert_cache, registry_path,
+                                             base64decode=True, ans_module=module)
 
-        expire_check_result = {
-            'cert_cn': cert_subject,
-            'path': registry_path,
-            'expiry': cert_expiry_date,
-            'days_remaining': time_remaining.days,
-            'health': None,
-            'serial': cert_serial
-        }
+            expire_check_result = {
+                'cert_cn': cert_subject,
+                'path': registry_path,
+                'expiry': cert_expiry_date,
+                'days_remaining': time_remaining.days,
+                'health': None,
+                'serial': cert_serial
+            }
 
-        classify_cert(expire_check_result, now, time_remaining, expire_window, registry_certs)
+            classify_cert(expire_check_result, now, time_remaining, expire_window, registry_certs)
 
     ######################################################################
     # /Check router/registry certs
     ######################################################################
 
-    res = tabulate_summary(ocp_certs, kubeconfigs, etcd_certs, router_certs, registry_certs)
+    if cert_cache is not None:
+        # check mode must not change the host, cached entries included
+        if not module.check_mode:
+            cert_cache.save()
+        check_results['meta']['cached_certificates'] = cert_cache.hits
+        check_results['meta']['parsed_certificates'] = cert_cache.misses
+
+    res = tabulate_summary(ocp_certs, kubeconfigs, etcd_certs, router_certs, registry_certs, secret_certs)
     warn_certs = bool(res['expired'] + res['warning'])
     msg = "Checked {count} total certificates. Expired/Warning/OK: {exp}/{warn}/{ok}. Warning window: {window} days".format(
         count=res['total'],
@@ -797,18 +1302,20 @@ an OpenShift Container Platform cluster
         check_results['etcd'] = [crt for crt in etcd_certs if crt['health'] in ['expired', 'warning']]
         check_results['registry'] = [crt for crt in registry_certs if crt['health'] in ['expired', 'warning']]
         check_results['router'] = [crt for crt in router_certs if crt['health'] in ['expired', 'warning']]
+        check_results['secrets'] = [crt for crt in secret_certs if crt['health'] in ['expired', 'warning']]
     else:
         check_results['ocp_certs'] = ocp_certs
         check_results['kubeconfigs'] = kubeconfigs
         check_results['etcd'] = etcd_certs
         check_results['registry'] = registry_certs
         check_results['router'] = router_certs
+        check_results['secrets'] = secret_certs
 
     # Sort the final results to report in order of ascending safety
     # time. That is to say, the certificates which will expire sooner
     # will be at the front of the list and certificates which will
-    # expire later are at the end. Router and registry certs should be
-    # limited to just 1 result, so don't bother sorting those.
+    # expire later are at the end. Without secret discovery, router and
+    # registry certs are limited to just 1 result.
     def cert_key(item):
         ''' return the days_remaining key '''
         return item['days_remaining']
@@ -816,6 +1323,9 @@ an OpenShift Container Platform cluster
     check_results['ocp_certs'] = sorted(check_results['ocp_certs'], key=cert_key)
     check_results['kubeconfigs'] = sorted(check_results['kubeconfigs'], key=cert_key)
     check_results['etcd'] = sorted(check_results['etcd'], key=cert_key)
+    check_results['router'] = sorted(check_results['router'], key=cert_key)
+    check_results['registry'] = sorted(check_results['registry'], key=cert_key)
+    check_results['secrets'] = sorted(check_results['secrets'], key=cert_key)
 
     # This module will never change anything, but we might want to
     # change the return code parameter if there is some catastrophic
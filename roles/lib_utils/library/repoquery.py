@@ -66,7 +66,15 @@ options:
   name:
     description:
     - The name of the package to query
-    required: true
+    - One of name or names is required.
+    required: false
+    default: None
+    aliases: []
+  names:
+    description:
+    - A list of packages to query with a single repoquery, instead of name.
+    - The results for each package are returned under results.packages, keyed by the given name.
+    required: false
     default: None
     aliases: []
   query_type:
@@ -100,6 +108,27 @@ options:
     required: false
     default: None
     aliases: []
+  ignore_excluders:
+    description:
+    - Ignore the packages excluded in yum.conf.
+    required: false
+    default: false
+    aliases: []
+  cache_dir:
+    description:
+    - Directory in which the results of querying a list of packages are kept between runs.
+    - They are used as long as the repo metadata in the yum cache, the repo definitions and yum.conf do not change.
+    - Results of other repo metadata and results older than C(cache_max_age) are removed from it when new ones are kept.
+    - Set to an empty string to not cache results.
+    required: false
+    default: /var/cache/openshift-ansible/repoquery
+    aliases: []
+  cache_max_age:
+    description:
+    - Seconds after which cached results are not used anymore, even if the repo metadata did not change.
+    required: false
+    default: 3600
+    aliases: []
 author:
 - "Matt Woodson <mwoodson@redhat.com>"
 extends_documentation_fragment: []
@@ -247,7 +276,20 @@ EXAMPLES = '''
 #        }
 #    }
 
-# Example 3: Match a specific version
+# Example 3: Get the versions of several packages at once
+  - name: Get OpenShift package versions
+    repoquery:
+      names:
+      - atomic-openshift
+      - atomic-openshift-node
+      - atomic-openshift-excluder
+      ignore_excluders: True
+    register: openshift_out
+
+# Results are under openshift_out.results.packages['atomic-openshift'], and so on,
+# each like the results of querying a single package.
+
+# Example 4: Match a specific version
   - name: matched versions repoquery test
     repoquery:
       name: atomic-openshift
@@ -334,13 +376,42 @@ EXAMPLES = '''
 
 from collections import defaultdict  # noqa: E402
 
+import fnmatch  # noqa: E402
+import glob  # noqa: E402
+import hashlib  # noqa: E402
+import subprocess  # noqa: E402
 
-# pylint: disable=no-name-in-module,import-error
-# Reason: pylint errors with "No name 'version' in module 'distutils'".
-#         This is a bug: https://github.com/PyCQA/pylint/issues/73
-from distutils.version import LooseVersion  # noqa: E402
 
-import subprocess  # noqa: E402
+# Sort keys for the parts of an RPM version string, see rpm_version_key
+RPM_TILDE = (0,)
+RPM_END = (1,)
+RPM_CARET = (2,)
+RPM_ALPHA = 3
+RPM_NUMERIC = 4
+RPM_SEGMENT_RE = re.compile(r'(~|\^|[0-9]+|[a-zA-Z]+)')
+
+
+def rpm_version_key(version):
+    ''' Return a key that sorts version (or release) strings the way rpmvercmp compares them.
+
+        Strings are split into numeric and alphabetic segments, anything else
+        only separating them. Numeric segments are compared as numbers and
+        are newer than alphabetic ones, which are compared as strings. A
+        version with segments left over is newer, unless what is left starts
+        with "~" (a pre-release, older) or the other one has a "^" there.
+    '''
+    key = []
+    for segment in RPM_SEGMENT_RE.findall(version):
+        if segment == '~':
+            key.append(RPM_TILDE)
+        elif segment == '^':
+            key.append(RPM_CARET)
+        elif segment.isdigit():
+            key.append((RPM_NUMERIC, int(segment)))
+        else:
+            key.append((RPM_ALPHA, segment))
+    key.append(RPM_END)
+    return tuple(key)
 
 
 class RepoqueryCLIError(Exception):
@@ -416,6 +487,105 @@ class RepoqueryCLI(object):
 
         return rval
 
+
+class RepoqueryCache(object):
+    ''' Repoquery output for each package, kept on the host between runs.
+
+        Entries are keyed by the repo metadata currently on the host (the
+        repomd.xml of each repo in the yum cache, the repo definitions and
+        yum.conf) and the query options, so they are only used until yum
+        fetches new metadata or the repos change. They also expire after
+        max_age seconds, in case the metadata on the host is out of date.
+        Entries of other metadata states and expired ones are removed when
+        new ones are recorded, so the cache does not grow without bound.
+    '''
+    REPOMD_GLOB = '/var/cache/yum/*/*/*/repomd.xml'
+    CONFIG_GLOBS = ['/etc/yum.conf', '/etc/yum.repos.d/*.repo']
+
+    def __init__(self, cache_dir, max_age):
+        ''' Constructor for RepoqueryCache '''
+        self.cache_dir = cache_dir
+        self.max_age = max_age
+        self._metadata_state = False
+        self._pruned = False
+
+    def metadata_state(self):
+        ''' digest of the repo metadata and configuration, or None if there is no metadata to go by '''
+        if self._metadata_state is False:
+            repomds = sorted(glob.glob(self.REPOMD_GLOB))
+            if not repomds:
+                self._metadata_state = None
+                return None
+
+            digest = hashlib.sha256()
+            for path in repomds + sorted(sum([glob.glob(pattern) for pattern in self.CONFIG_GLOBS], [])):
+                try:
+                    with open(path, 'rb') as file_handler:
+                        digest.update(path.encode('utf-8') + b'\0' + file_handler.read() + b'\0')
+                except (IOError, OSError):
+                    pass
+            self._metadata_state = digest.hexdigest()
+        return self._metadata_state
+
+    def path(self, query, name):
+        ''' file holding the output of the query for the package, or None if not cacheable '''
+        state = self.metadata_state()
+        if state is None:
+            return None
+        key = hashlib.sha256(json.dumps([state, query, name]).encode('utf-8')).hexdigest()
+        # the file name starts with the metadata state, to tell the entries of other states apart
+        return os.path.join(self.cache_dir, '%s-%s.json' % (state[:16], key))
+
+    def prune(self):
+        ''' remove the entries of other metadata states, the expired ones and leftover temporary files '''
+        prefix = self.metadata_state()[:16] + '-'
+        try:
+            file_names = os.listdir(self.cache_dir)
+        except (IOError, OSError):
+            return
+        now = time.time()
+        for file_name in file_names:
+            path = os.path.join(self.cache_dir, file_name)
+            try:
+                if file_name.endswith('.json') and not file_name.startswith(prefix) or \
+                        now - os.path.getmtime(path) > self.max_age:
+                    os.remove(path)
+            except (IOError, OSError):
+                pass
+
+    def get(self, query, name):
+        ''' the cached output of the query for the package, or None '''
+        path = self.path(query, name)
+        if path is None:
+            return None
+        try:
+            with open(path) as file_handler:
+                entry = json.load(file_handler)
+        except (IOError, OSError, ValueError):
+            return None
+        if time.time() - entry.get('time', 0) > self.max_age:
+            return None
+        return entry.get('output')
+
+    def put(self, query, name, output):
+        ''' record the output of the query for the package; failing to do so only means querying again '''
+        path = self.path(query, name)
+        if path is None:
+            return
+        if not self._pruned:
+            self._pruned = True
+            self.prune()
+        try:
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            # write to a temporary file and rename it, so a concurrent reader never sees a partial entry
+            tmp_fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(tmp_fd, 'w') as file_handler:
+                json.dump({'time': time.time(), 'output': output}, file_handler)
+            os.rename(tmp_path, path)
+        except (IOError, OSError):
+            pass
+
 # -*- -*- -*- End included fragment: lib/repoquery.py -*- -*- -*-
 
 # -*- -*- -*- Begin included fragment: class/repoquery.py -*- -*- -*-
@@ -426,10 +596,15 @@ class Repoquery(RepoqueryCLI):
     '''
     # pylint: disable=too-many-arguments,too-many-instance-attributes
     def __init__(self, name, query_type, show_duplicates,
-                 match_version, ignore_excluders, verbose):
-        ''' Constructor for YumList '''
+                 match_version, ignore_excluders, verbose, cache=None):
+        ''' Constructor for YumList
+
+            name is a package name, or a list of them to query all at once.
+            cache is a RepoqueryCache, only used for lists of packages.
+        '''
         super(Repoquery, self).__init__(None)
         self.name = name
+        self.cache = cache
         self.query_type = query_type
         self.show_duplicates = show_duplicates
         self.match_version = match_version
@@ -440,16 +615,21 @@ class Repoquery(RepoqueryCLI):
             self.show_duplicates = True
 
         self.query_format = "%{version}|%{release}|%{arch}|%{repo}|%{version}-%{release}"
+        # a list of packages is queried at once, each line then says which package it is about
+        self.packages_query_format = "%{name}|%{epoch}|" + self.query_format
 
         self.tmp_file = None
 
-    def build_cmd(self):
-        ''' build the repoquery cmd options '''
+    def build_cmd(self, names=None):
+        ''' build the repoquery cmd options
+
+            names is a list of packages to query at once instead of self.name
+        '''
 
         repo_cmd = []
 
         repo_cmd.append("--pkgnarrow=" + self.query_type)
-        repo_cmd.append("--queryformat=" + self.query_format)
+        repo_cmd.append("--queryformat=" + (self.packages_query_format if names else self.query_format))
 
         if self.show_duplicates:
             repo_cmd.append('--show-duplicates')
@@ -457,7 +637,10 @@ class Repoquery(RepoqueryCLI):
         if self.ignore_excluders:
             repo_cmd.append('--config=' + self.tmp_file.name)
 
-        repo_cmd.append(self.name)
+        if names:
+            repo_cmd.extend(names)
+        else:
+            repo_cmd.append(self.name)
 
         return repo_cmd
 
@@ -465,9 +648,12 @@ class Repoquery(RepoqueryCLI):
     def process_versions(query_output):
         ''' format the package data into something that can be presented '''
 
+        if isinstance(query_output, bytes):
+            query_output = query_output.decode()
+
         version_dict = defaultdict(dict)
 
-        for version in query_output.decode().split('\n'):
+        for version in query_output.split('\n'):
             pkg_info = version.split("|")
 
             pkg_version = {}
@@ -484,102 +670,198 @@ class Repoquery(RepoqueryCLI):
     def format_versions(self, formatted_versions):
         ''' Gather and present the versions of each package '''
 
-        versions_dict = {}
-        versions_dict['available_versions_full'] = list(formatted_versions.keys())
+        # compute the sort key of each "full version (version - release)" once,
+        # versions first then releases, like rpm compares them. Builds share
+        # versions and releases, so the key of each of those is computed once too.
+        part_keys = {}
 
-        # set the match version, if called
-        if self.match_version:
-            versions_dict['matched_versions_full'] = []
-            versions_dict['requested_match_version'] = self.match_version
-            versions_dict['matched_versions'] = []
+        def part_key(part):
+            ''' memoized rpm_version_key '''
+            if part not in part_keys:
+                part_keys[part] = rpm_version_key(part)
+            return part_keys[part]
 
-        # get the "full version (version - release)
-        versions_dict['available_versions_full'].sort(key=LooseVersion)
-        versions_dict['latest_full'] = versions_dict['available_versions_full'][-1]
-
-        # get the "short version (version)
-        versions_dict['available_versions'] = []
-        for version in versions_dict['available_versions_full']:
-            versions_dict['available_versions'].append(formatted_versions[version]['version'])
+        keys = dict(
+            (version, (part_key(info['version']), part_key(info['release'])))
+            for version, info in formatted_versions.items()
+        )
 
-            if self.match_version:
-                if version.startswith(self.match_version):
-                    versions_dict['matched_versions_full'].append(version)
-                    versions_dict['matched_versions'].append(formatted_versions[version]['version'])
+        versions_dict = {}
+        versions_dict['available_versions_full'] = sorted(formatted_versions, key=keys.get)
+        versions_dict['latest_full'] = versions_dict['available_versions_full'][-1]
 
-        versions_dict['available_versions'].sort(key=LooseVersion)
+        # get the "short version (version), in the same order. Matched versions
+        # below are filtered from the sorted full versions, so they are ordered too
+        versions_dict['available_versions'] = [
+            formatted_versions[version]['version'] for version in versions_dict['available_versions_full']
+        ]
         versions_dict['latest'] = versions_dict['available_versions'][-1]
 
-        # finish up the matched version
+        # set the match version, if called
         if self.match_version:
+            versions_dict['requested_match_version'] = self.match_version
+            versions_dict['matched_versions_full'] = [
+                version for version in versions_dict['available_versions_full']
+                if version.startswith(self.match_version)
+            ]
+            versions_dict['matched_versions'] = [
+                formatted_versions[version]['version'] for version in versions_dict['matched_versions_full']
+            ]
+
             if versions_dict['matched_versions_full']:
                 versions_dict['matched_version_found'] = True
-                versions_dict['matched_versions'].sort(key=LooseVersion)
                 versions_dict['matched_version_latest'] = versions_dict['matched_versions'][-1]
                 versions_dict['matched_version_full_latest'] = versions_dict['matched_versions_full'][-1]
             else:
                 versions_dict['matched_version_found'] = False
-                versions_dict['matched_versions'] = []
                 versions_dict['matched_version_latest'] = ""
                 versions_dict['matched_version_full_latest'] = ""
 
         return versions_dict
 
-    def repoquery(self):
-        '''perform a repoquery '''
-
-        if self.ignore_excluders:
-            # Duplicate yum.conf and reset exclude= line to an empty string
-            # to clear a list of all excluded packages
-            self.tmp_file = tempfile.NamedTemporaryFile()
-
-            with open("/etc/yum.conf", "r") as file_handler:
-                yum_conf_lines = file_handler.readlines()
-
-            yum_conf_lines = [l for l in yum_conf_lines if not l.startswith("exclude=")]
-
-            with open(self.tmp_file.name, "w") as file_handler:
-                file_handler.writelines(yum_conf_lines)
-                file_handler.flush()
-
-        repoquery_cmd = self.build_cmd()
+    @staticmethod
+    def package_matches(spec, name, epoch, version, release, arch):
+        ''' whether a package matches a package spec, in any of the forms yum accepts '''
+        forms = [
+            name,
+            '%s.%s' % (name, arch),
+            '%s-%s' % (name, version),
+            '%s-%s-%s' % (name, version, release),
+            '%s-%s-%s.%s' % (name, version, release, arch),
+            '%s:%s-%s-%s.%s' % (epoch, name, version, release, arch),
+            '%s-%s:%s-%s.%s' % (name, epoch, version, release, arch),
+        ]
+        return any(fnmatch.fnmatchcase(form, spec) for form in forms)
 
-        rval = self._repoquery_cmd(repoquery_cmd, True, 'raw')
+    @staticmethod
+    def split_packages(query_output, names):
+        ''' split the output of a query for several packages into the output for each of them,
+            in the format of a query for a single package
+        '''
+        if isinstance(query_output, bytes):
+            query_output = query_output.decode()
+
+        outputs = dict((name, []) for name in names)
+        for line in query_output.strip().split('\n'):
+            pkg_info = line.split('|')
+            if len(pkg_info) < 7:
+                continue
+            name, epoch, version, release, arch = pkg_info[:5]
+            for spec in names:
+                if Repoquery.package_matches(spec, name, epoch or '0', version, release, arch):
+                    outputs[spec].append('|'.join(pkg_info[2:]))
+
+        return dict((name, '\n'.join(lines)) for name, lines in outputs.items())
+
+    def package_results(self, name, query_output):
+        ''' the results for a package, given the output of querying it '''
+        rval = {'package_name': name}
 
         # check to see if there are actual results
-        rval['package_name'] = self.name
-        if rval['results']:
-            processed_versions = Repoquery.process_versions(rval['results'].strip())
-            formatted_versions = self.format_versions(processed_versions)
-
+        if query_output:
+            processed_versions = Repoquery.process_versions(query_output)
             rval['package_found'] = True
-            rval['versions'] = formatted_versions
+            rval['versions'] = self.format_versions(processed_versions)
 
             if self.verbose:
                 rval['raw_versions'] = processed_versions
-            else:
-                del rval['results']
 
         # No packages found
         else:
             rval['package_found'] = False
 
+        return rval
+
+    def write_yum_conf(self):
+        ''' Duplicate yum.conf and reset exclude= line to an empty string
+            to clear a list of all excluded packages
+        '''
+        self.tmp_file = tempfile.NamedTemporaryFile()
+
+        with open("/etc/yum.conf", "r") as file_handler:
+            yum_conf_lines = file_handler.readlines()
+
+        yum_conf_lines = [l for l in yum_conf_lines if not l.startswith("exclude=")]
+
+        with open(self.tmp_file.name, "w") as file_handler:
+            file_handler.writelines(yum_conf_lines)
+            file_handler.flush()
+
+    def repoquery(self):
+        '''perform a repoquery '''
+
+        if isinstance(self.name, list):
+            return self.repoquery_packages()
+
+        if self.ignore_excluders:
+            self.write_yum_conf()
+
+        repoquery_cmd = self.build_cmd()
+
+        rval = self._repoquery_cmd(repoquery_cmd, True, 'raw')
+
+        rval.update(self.package_results(self.name, rval['results'].strip() if rval['results'] else None))
+        if rval['package_found'] and not self.verbose:
+            del rval['results']
+
         if self.ignore_excluders:
             self.tmp_file.close()
 
         return rval
 
+    def repoquery_packages(self):
+        ''' query a list of packages with a single repoquery, for those that are not cached '''
+
+        # everything but the package names that decides the output
+        query = [self.query_type, self.show_duplicates, self.ignore_excluders, self.packages_query_format]
+
+        outputs = {}
+        for name in self.name:
+            output = self.cache.get(query, name) if self.cache else None
+            if output is not None:
+                outputs[name] = output
+
+        rval = {'returncode': 0, 'cached_packages': sorted(outputs)}
+        uncached = [name for name in self.name if name not in outputs]
+        if uncached:
+            if self.ignore_excluders:
+                self.write_yum_conf()
+
+            rval.update(self._repoquery_cmd(self.build_cmd(uncached), True, 'raw'))
+
+            if self.ignore_excluders:
+                self.tmp_file.close()
+
+            if rval['returncode'] != 0:
+                return rval
+
+            for name, output in Repoquery.split_packages(rval['results'] or '', uncached).items():
+                outputs[name] = output
+                if self.cache:
+                    self.cache.put(query, name, output)
+
+            if not self.verbose:
+                del rval['results']
+
+        rval['packages'] = dict((name, self.package_results(name, outputs[name])) for name in self.name)
+        return rval
+
     @staticmethod
     def run_ansible(params, check_mode):
         '''run the ansible idempotent code'''
 
+        cache = None
+        if params.get('names') and params.get('cache_dir'):
+            cache = RepoqueryCache(params['cache_dir'], params['cache_max_age'])
+
         repoquery = Repoquery(
-            params['name'],
+            params.get('names') or params['name'],
             params['query_type'],
             params['show_duplicates'],
             params['match_version'],
             params['ignore_excluders'],
             params['verbose'],
+            cache,
         )
 
         state = params['state']
@@ -610,7 +892,8 @@ def main():
     module = AnsibleModule(
         argument_spec=dict(
             state=dict(default='list', type='str', choices=['list']),
-            name=dict(default=None, required=True, type='str'),
+            name=dict(default=None, required=False, type='str'),
+            names=dict(default=None, required=False, type='list'),
             query_type=dict(default='repos', required=False, type='str',
                             choices=[
                                 'installed', 'available', 'recent',
@@ -622,9 +905,12 @@ def main():
             ignore_excluders=dict(default=False, required=False, type='bool'),
             retries=dict(default=4, required=False, type='int'),
             retry_interval=dict(default=5, required=False, type='int'),
+            cache_dir=dict(default='/var/cache/openshift-ansible/repoquery', required=False, type='str'),
+            cache_max_age=dict(default=3600, required=False, type='int'),
         ),
         supports_check_mode=False,
-        required_if=[('show_duplicates', True, ['name'])],
+        required_one_of=[['name', 'names']],
+        mutually_exclusive=[['name', 'names']],
     )
 
     tries = 1
@@ -9,7 +9,8 @@ def main():
     module = AnsibleModule(
         argument_spec=dict(
             state=dict(default='list', type='str', choices=['list']),
-            name=dict(default=None, required=True, type='str'),
+            name=dict(default=None, required=False, type='str'),
+            names=dict(default=None, required=False, type='list'),
             query_type=dict(default='repos', required=False, type='str',
                             choices=[
                                 'installed', 'available', 'recent',
@@ -21,9 +22,12 @@ def main():
             ignore_excluders=dict(default=False, required=False, type='bool'),
             retries=dict(default=4, required=False, type='int'),
             retry_interval=dict(default=5, required=False, type='int'),
+            cache_dir=dict(default='/var/cache/openshift-ansible/repoquery', required=False, type='str'),
+            cache_max_age=dict(default=3600, required=False, type='int'),
         ),
         supports_check_mode=False,
-        required_if=[('show_duplicates', True, ['name'])],
+        required_one_of=[['name', 'names']],
+        mutually_exclusive=[['name', 'names']],
     )
 
     tries = 1
@@ -7,10 +7,15 @@ class Repoquery(RepoqueryCLI):
     '''
     # pylint: disable=too-many-arguments,too-many-instance-attributes
     def __init__(self, name, query_type, show_duplicates,
-                 match_version, ignore_excluders, verbose):
-        ''' Constructor for YumList '''
+                 match_version, ignore_excluders, verbose, cache=None):
+        ''' Constructor for YumList
+
+            name is a package name, or a list of them to query all at once.
+            cache is a RepoqueryCache, only used for lists of packages.
+        '''
         super(Repoquery, self).__init__(None)
         self.name = name
+        self.cache = cache
         self.query_type = query_type
         self.show_duplicates = show_duplicates
         self.match_version = match_version
@@ -21,16 +26,21 @@ class Repoquery(RepoqueryCLI):
             self.show_duplicates = True
 
         self.query_format = "%{version}|%{release}|%{arch}|%{repo}|%{version}-%{release}"
+        # a list of packages is queried at once, each line then says which package it is about
+        self.packages_query_format = "%{name}|%{epoch}|" + self.query_format
 
         self.tmp_file = None
 
-    def build_cmd(self):
-        ''' build the repoquery cmd options '''
+    def build_cmd(self, names=None):
+        ''' build the repoquery cmd options
+
+            names is a list of packages to query at once instead of self.name
+        '''
 
         repo_cmd = []
 
         repo_cmd.append("--pkgnarrow=" + self.query_type)
-        repo_cmd.append("--queryformat=" + self.query_format)
+        repo_cmd.append("--queryformat=" + (self.packages_query_format if names else self.query_format))
 
         if self.show_duplicates:
             repo_cmd.append('--show-duplicates')
@@ -38,7 +48,10 @@ class Repoquery(RepoqueryCLI):
         if self.ignore_excluders:
             repo_cmd.append('--config=' + self.tmp_file.name)
 
-        repo_cmd.append(self.name)
+        if names:
+            repo_cmd.extend(names)
+        else:
+            repo_cmd.append(self.name)
 
         return repo_cmd
 
@@ -46,9 +59,12 @@ class Repoquery(RepoqueryCLI):
     def process_versions(query_output):
         ''' format the package data into something that can be presented '''
 
+        if isinstance(query_output, bytes):
+            query_output = query_output.decode()
+
         version_dict = defaultdict(dict)
 
-        for version in query_output.decode().split('\n'):
+        for version in query_output.split('\n'):
             pkg_info = version.split("|")
 
             pkg_version = {}
@@ -65,102 +81,198 @@ class Repoquery(RepoqueryCLI):
     def format_versions(self, formatted_versions):
         ''' Gather and present the versions of each package '''
 
-        versions_dict = {}
-        versions_dict['available_versions_full'] = list(formatted_versions.keys())
-
-        # set the match version, if called
-        if self.match_version:
-            versions_dict['matched_versions_full'] = []
-            versions_dict['requested_match_version'] = self.match_version
-            versions_dict['matched_versions'] = []
+        # compute the sort key of each "full version (version - release)" once,
+        # versions first then releases, like rpm compares them. Builds share
+        # versions and releases, so the key of each of those is computed once too.
+        part_keys = {}
 
-        # get the "full version (version - release)
-        versions_dict['available_versions_full'].sort(key=LooseVersion)
-        versions_dict['latest_full'] = versions_dict['available_versions_full'][-1]
+        def part_key(part):
+            ''' memoized rpm_version_key '''
+            if part not in part_keys:
+                part_keys[part] = rpm_version_key(part)
+            return part_keys[part]
 
-        # get the "short version (version)
-        versions_dict['available_versions'] = []
-        for version in versions_dict['available_versions_full']:
-            versions_dict['available_versions'].append(formatted_versions[version]['version'])
+        keys = dict(
+            (version, (part_key(info['version']), part_key(info['release'])))
+            for version, info in formatted_versions.items()
+        )
 
-            if self.match_version:
-                if version.startswith(self.match_version):
-                    versions_dict['matched_versions_full'].append(version)
-                    versions_dict['matched_versions'].append(formatted_versions[version]['version'])
+        versions_dict = {}
+        versions_dict['available_versions_full'] = sorted(formatted_versions, key=keys.get)
+        versions_dict['latest_full'] = versions_dict['available_versions_full'][-1]
 
-        versions_dict['available_versions'].sort(key=LooseVersion)
+        # get the "short version (version), in the same order. Matched versions
+        # below are filtered from the sorted full versions, so they are ordered too
+        versions_dict['available_versions'] = [
+            formatted_versions[version]['version'] for version in versions_dict['available_versions_full']
+        ]
         versions_dict['latest'] = versions_dict['available_versions'][-1]
 
-        # finish up the matched version
+        # set the match version, if called
         if self.match_version:
+            versions_dict['requested_match_version'] = self.match_version
+            versions_dict['matched_versions_full'] = [
+                version for version in versions_dict['available_versions_full']
+                if version.startswith(self.match_version)
+            ]
+            versions_dict['matched_versions'] = [
+                formatted_versions[version]['version'] for version in versions_dict['matched_versions_full']
+            ]
+
             if versions_dict['matched_versions_full']:
                 versions_dict['matched_version_found'] = True
-                versions_dict['matched_versions'].sort(key=LooseVersion)
                 versions_dict['matched_version_latest'] = versions_dict['matched_versions'][-1]
                 versions_dict['matched_version_full_latest'] = versions_dict['matched_versions_full'][-1]
             else:
                 versions_dict['matched_version_found'] = False
-                versions_dict['matched_versions'] = []
                 versions_dict['matched_version_latest'] = ""
                 versions_dict['matched_version_full_latest'] = ""
 
         return versions_dict
 
-    def repoquery(self):
-        '''perform a repoquery '''
-
-        if self.ignore_excluders:
-            # Duplicate yum.conf and reset exclude= line to an empty string
-            # to clear a list of all excluded packages
-            self.tmp_file = tempfile.NamedTemporaryFile()
-
-            with open("/etc/yum.conf", "r") as file_handler:
-                yum_conf_lines = file_handler.readlines()
-
-            yum_conf_lines = [l for l in yum_conf_lines if not l.startswith("exclude=")]
-
-            with open(self.tmp_file.name, "w") as file_handler:
-                file_handler.writelines(yum_conf_lines)
-                file_handler.flush()
-
-        repoquery_cmd = self.build_cmd()
+    @staticmethod
+    def package_matches(spec, name, epoch, version, release, arch):
+        ''' whether a package matches a package spec, in any of the forms yum accepts '''
+        forms = [
+            name,
+            '%s.%s' % (name, arch),
+            '%s-%s' % (name, version),
+            '%s-%s-%s' % (name, version, release),
+            '%s-%s-%s.%s' % (name, version, release, arch),
+            '%s:%s-%s-%s.%s' % (epoch, name, version, release, arch),
+            '%s-%s:%s-%s.%s' % (name, epoch, version, release, arch),
+        ]
+        return any(fnmatch.fnmatchcase(form, spec) for form in forms)
 
-        rval = self._repoquery_cmd(repoquery_cmd, True, 'raw')
+    @staticmethod
+    def split_packages(query_output, names):
+        ''' split the output of a query for several packages into the output for each of them,
+            in the format of a query for a single package
+        '''
+        if isinstance(query_output, bytes):
+            query_output = query_output.decode()
+
+        outputs = dict((name, []) for name in names)
+        for line in query_output.strip().split('\n'):
+            pkg_info = line.split('|')
+            if len(pkg_info) < 7:
+                continue
+            name, epoch, version, release, arch = pkg_info[:5]
+            for spec in names:
+                if Repoquery.package_matches(spec, name, epoch or '0', version, release, arch):
+                    outputs[spec].append('|'.join(pkg_info[2:]))
+
+        return dict((name, '\n'.join(lines)) for name, lines in outputs.items())
+
+    def package_results(self, name, query_output):
+        ''' the results for a package, given the output of querying it '''
+        rval = {'package_name': name}
 
         # check to see if there are actual results
-        rval['package_name'] = self.name
-        if rval['results']:
-            processed_versions = Repoquery.process_versions(rval['results'].strip())
-            formatted_versions = self.format_versions(processed_versions)
-
+        if query_output:
+            processed_versions = Repoquery.process_versions(query_output)
             rval['package_found'] = True
-            rval['versions'] = formatted_versions
+            rval['versions'] = self.format_versions(processed_versions)
 
             if self.verbose:
                 rval['raw_versions'] = processed_versions
-            else:
-                del rval['results']
 
         # No packages found
         else:
             rval['package_found'] = False
 
+        return rval
+
+    def write_yum_conf(self):
+        ''' Duplicate yum.conf and reset exclude= line to an empty string
+            to clear a list of all excluded packages
+        '''
+        self.tmp_file = tempfile.NamedTemporaryFile()
+
+        with open("/etc/yum.conf", "r") as file_handler:
+            yum_conf_lines = file_handler.readlines()
+
+        yum_conf_lines = [l for l in yum_conf_lines if not l.startswith("exclude=")]
+
+        with open(self.tmp_file.name, "w") as file_handler:
+            file_handler.writelines(yum_conf_lines)
+            file_handler.flush()
+
+    def repoquery(self):
+        '''perform a repoquery '''
+
+        if isinstance(self.name, list):
+            return self.repoquery_packages()
+
+        if self.ignore_excluders:
+            self.write_yum_conf()
+
+        repoquery_cmd = self.build_cmd()
+
+        rval = self._repoquery_cmd(repoquery_cmd, True, 'raw')
+
+        rval.update(self.package_results(self.name, rval['results'].strip() if rval['results'] else None))
+        if rval['package_found'] and not self.verbose:
+            del rval['results']
+
         if self.ignore_excluders:
             self.tmp_file.close()
 
         return rval
 
+    def repoquery_packages(self):
+        ''' query a list of packages with a single repoquery, for those that are not cached '''
+
+        # everything but the package names that decides the output
+        query = [self.query_type, self.show_duplicates, self.ignore_excluders, self.packages_query_format]
+
+        outputs = {}
+        for name in self.name:
+            output = self.cache.get(query, name) if self.cache else None
+            if output is not None:
+                outputs[name] = output
+
+        rval = {'returncode': 0, 'cached_packages': sorted(outputs)}
+        uncached = [name for name in self.name if name not in outputs]
+        if uncached:
+            if self.ignore_excluders:
+                self.write_yum_conf()
+
+            rval.update(self._repoquery_cmd(self.build_cmd(uncached), True, 'raw'))
+
+            if self.ignore_excluders:
+                self.tmp_file.close()
+
+            if rval['returncode'] != 0:
+                return rval
+
+            for name, output in Repoquery.split_packages(rval['results'] or '', uncached).items():
+                outputs[name] = output
+                if self.cache:
+                    self.cache.put(query, name, output)
+
+            if not self.verbose:
+                del rval['results']
+
+        rval['packages'] = dict((name, self.package_results(name, outputs[name])) for name in self.name)
+        return rval
+
     @staticmethod
     def run_ansible(params, check_mode):
         '''run the ansible idempotent code'''
 
+        cache = None
+        if params.get('names') and params.get('cache_dir'):
+            cache = RepoqueryCache(params['cache_dir'], params['cache_max_age'])
+
         repoquery = Repoquery(
-            params['name'],
+            params.get('names') or params['name'],
             params['query_type'],
             params['show_duplicates'],
             params['match_version'],
             params['ignore_excluders'],
             params['verbose'],
+            cache,
         )
 
         state = params['state']
@@ -9,13 +9,42 @@
 
 from collections import defaultdict  # noqa: E402
 
+import fnmatch  # noqa: E402
+import glob  # noqa: E402
+import hashlib  # noqa: E402
+import subprocess  # noqa: E402
 
-# pylint: disable=no-name-in-module,import-error
-# Reason: pylint errors with "No name 'version' in module 'distutils'".
-#         This is a bug: https://github.com/PyCQA/pylint/issues/73
-from distutils.version import LooseVersion  # noqa: E402
 
-import subprocess  # noqa: E402
+# Sort keys for the parts of an RPM version string, see rpm_version_key
+RPM_TILDE = (0,)
+RPM_END = (1,)
+RPM_CARET = (2,)
+RPM_ALPHA = 3
+RPM_NUMERIC = 4
+RPM_SEGMENT_RE = re.compile(r'(~|\^|[0-9]+|[a-zA-Z]+)')
+
+
+def rpm_version_key(version):
+    ''' Return a key that sorts version (or release) strings the way rpmvercmp compares them.
+
+        Strings are split into numeric and alphabetic segments, anything else
+        only separating them. Numeric segments are compared as numbers and
+        are newer than alphabetic ones, which are compared as strings. A
+        version with segments left over is newer, unless what is left starts
+        with "~" (a pre-release, older) or the other one has a "^" there.
+    '''
+    key = []
+    for segment in RPM_SEGMENT_RE.findall(version):
+        if segment == '~':
+            key.append(RPM_TILDE)
+        elif segment == '^':
+            key.append(RPM_CARET)
+        elif segment.isdigit():
+            key.append((RPM_NUMERIC, int(segment)))
+        else:
+            key.append((RPM_ALPHA, segment))
+    key.append(RPM_END)
+    return tuple(key)
 
 
 class RepoqueryCLIError(Exception):
@@ -90,3 +119,102 @@ class RepoqueryCLI(object):
             })
 
         return rval
+
+
+class RepoqueryCache(object):
+    ''' Repoquery output for each package, kept on the host between runs.
+
+        Entries are keyed by the repo metadata currently on the host (the
+        repomd.xml of each repo in the yum cache, the repo definitions and
+        yum.conf) and the query options, so they are only used until yum
+        fetches new metadata or the repos change. They also expire after
+        max_age seconds, in case the metadata on the host is out of date.
+        Entries of other metadata states and expired ones are removed when
+        new ones are recorded, so the cache does not grow without bound.
+    '''
+    REPOMD_GLOB = '/var/cache/yum/*/*/*/repomd.xml'
+    CONFIG_GLOBS = ['/etc/yum.conf', '/etc/yum.repos.d/*.repo']
+
+    def __init__(self, cache_dir, max_age):
+        ''' Constructor for RepoqueryCache '''
+        self.cache_dir = cache_dir
+        self.max_age = max_age
+        self._metadata_state = False
+        self._pruned = False
+
+    def metadata_state(self):
+        ''' digest of the repo metadata and configuration, or None if there is no metadata to go by '''
+        if self._metadata_state is False:
+            repomds = sorted(glob.glob(self.REPOMD_GLOB))
+            if not repomds:
+                self._metadata_state = None
+                return None
+
+            digest = hashlib.sha256()
+            for path in repomds + sorted(sum([glob.glob(pattern) for pattern in self.CONFIG_GLOBS], [])):
+                try:
+                    with open(path, 'rb') as file_handler:
+                        digest.update(path.encode('utf-8') + b'\0' + file_handler.read() + b'\0')
+                except (IOError, OSError):
+                    pass
+            self._metadata_state = digest.hexdigest()
+        return self._metadata_state
+
+    def path(self, query, name):
+        ''' file holding the output of the query for the package, or None if not cacheable '''
+        state = self.metadata_state()
+        if state is None:
+            return None
+        key = hashlib.sha256(json.dumps([state, query, name]).encode('utf-8')).hexdigest()
+        # the file name starts with the metadata state, to tell the entries of other states apart
+        return os.path.join(self.cache_dir, '%s-%s.json' % (state[:16], key))
+
+    def prune(self):
+        ''' remove the entries of other metadata states, the expired ones and leftover temporary files '''
+        prefix = self.metadata_state()[:16] + '-'
+        try:
+            file_names = os.listdir(self.cache_dir)
+        except (IOError, OSError):
+            return
+        now = time.time()
+        for file_name in file_names:
+            path = os.path.join(self.cache_dir, file_name)
+            try:
+                if file_name.endswith('.json') and not file_name.startswith(prefix) or \
+                        now - os.path.getmtime(path) > self.max_age:
+                    os.remove(path)
+            except (IOError, OSError):
+                pass
+
+    def get(self, query, name):
+        ''' the cached output of the query for the package, or None '''
+        path = self.path(query, name)
+        if path is None:
+            return None
+        try:
+            with open(path) as file_handler:
+                entry = json.load(file_handler)
+        except (IOError, OSError, ValueError):
+            return None
+        if time.time() - entry.get('time', 0) > self.max_age:
+            return None
+        return entry.get('output')
+
+    def put(self, query, name, output):
+        ''' record the output of the query for the package; failing to do so only means querying again '''
+        path = self.path(query, name)
+        if path is None:
+            return
+        if not self._pruned:
+            self._pruned = True
+            self.prune()
+        try:
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            # write to a temporary file and rename it, so a concurrent reader never sees a partial entry
+            tmp_fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(tmp_fd, 'w') as file_handler:
+                json.dump({'time': time.time(), 'output': output}, file_handler)
+            os.rename(tmp_path, path)
+        except (IOError, OSError):
+            pass
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+'''
+ Benchmark of Repoquery.format_versions over a synthetic listing of many
+ builds, against the LooseVersion implementation it replaced.
+
+    $ python roles/lib_utils/src/test/unit/benchmark_repoquery.py [builds] [repeat]
+'''
+from __future__ import print_function
+
+import os
+import sys
+import timeit
+from distutils.version import LooseVersion  # pylint: disable=no-name-in-module,import-error
+
+# pylint: disable=import-error,wrong-import-position
+module_path = os.path.join('/'.join(os.path.realpath(__file__).split('/')[:-4]), 'library')  # noqa: E501
+sys.path.insert(0, module_path)
+from repoquery import Repoquery  # noqa: E402
+
+
+def loose_format_versions(formatted_versions, match_version):
+    '''Repoquery.format_versions before rpm version keys, the parts timed here'''
+    versions_dict = {}
+    versions_dict['available_versions_full'] = sorted(formatted_versions, key=LooseVersion)
+    versions_dict['available_versions'] = sorted(
+        (formatted_versions[version]['version'] for version in versions_dict['available_versions_full']),
+        key=LooseVersion)
+    versions_dict['matched_versions_full'] = [
+        version for version in versions_dict['available_versions_full'] if version.startswith(match_version)
+    ]
+    versions_dict['matched_versions'] = sorted(
+        (formatted_versions[version]['version'] for version in versions_dict['matched_versions_full']),
+        key=LooseVersion)
+    return versions_dict
+
+
+def synthetic_versions(count):
+    '''formatted versions of count builds, spread over minor versions, patches and releases'''
+    formatted_versions = {}
+    index = 0
+    while len(formatted_versions) < count:
+        version = '3.{}.{}'.format(index % 12, index // 12 % 100)
+        release = '{}.el7'.format(index // 1200 + 1)
+        formatted_versions['{}-{}'.format(version, release)] = {
+            'version': version,
+            'release': release,
+            'arch': 'x86_64',
+            'repo': 'rhel-7-server-ose-rpms',
+            'version_release': '{}-{}'.format(version, release),
+        }
+        index += 1
+    return formatted_versions
+
+
+def main():
+    '''Time sorting and matching the versions of one package'''
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    formatted_versions = synthetic_versions(count)
+    repoquery = Repoquery('atomic-openshift', 'repos', True, '3.1', False, False)
+
+    versions = repoquery.format_versions(formatted_versions)
+    expected = loose_format_versions(formatted_versions, '3.1')
+    # These versions have a single shape, LooseVersion orders them the way rpm does
+    for key in expected:
+        assert versions[key] == expected[key], key
+
+    before = timeit.timeit(lambda: loose_format_versions(formatted_versions, '3.1'), number=repeat)
+    after = timeit.timeit(lambda: repoquery.format_versions(formatted_versions), number=repeat)
+    print('{} builds, {} matching 3.1, {} times each'.format(
+        count, len(versions['matched_versions_full']), repeat))
+    print('LooseVersion {:.3f}s  rpm version keys {:.3f}s'.format(before, after))
+
+
+if __name__ == '__main__':
+    main()
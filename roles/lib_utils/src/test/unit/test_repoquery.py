@@ -3,7 +3,9 @@
 '''
 
 import os
+import shutil
 import sys
+import tempfile
 import unittest
 import mock
 
@@ -15,7 +17,7 @@ import mock
 # place class in our python path
 module_path = os.path.join('/'.join(os.path.realpath(__file__).split('/')[:-4]), 'library')  # noqa: E501
 sys.path.insert(0, module_path)
-from repoquery import Repoquery  # noqa: E402
+from repoquery import Repoquery, RepoqueryCache, rpm_version_key  # noqa: E402
 
 
 class RepoQueryTest(unittest.TestCase):
@@ -66,3 +68,179 @@ class RepoQueryTest(unittest.TestCase):
         mock_cmd.assert_has_calls([
             mock.call(['/usr/bin/repoquery', '--plugins', '--quiet', '--pkgnarrow=repos', '--queryformat=%{version}|%{release}|%{arch}|%{repo}|%{version}-%{release}', 'bash']),
         ])
+
+    @mock.patch('repoquery._run')
+    def test_querying_several_packages(self, mock_cmd):
+        ''' Testing querying a list of packages at once '''
+
+        # Arrange
+
+        # run_ansible input parameters
+        params = {
+            'state': 'list',
+            'name': None,
+            'names': ['atomic-openshift-3.9*', 'atomic-openshift-node', 'atomic-openshift-excluder'],
+            'query_type': 'repos',
+            'verbose': False,
+            'show_duplicates': False,
+            'match_version': None,
+            'ignore_excluders': False,
+            'cache_dir': '',
+        }
+
+        query_output = b'''atomic-openshift|0|3.9.41|1.git.0.67432b0.el7|x86_64|rhel-7-server-ose-3.9-rpms|3.9.41-1.git.0.67432b0.el7
+atomic-openshift|0|3.9.43|1.git.0.c2f4a4a.el7|x86_64|rhel-7-server-ose-3.9-rpms|3.9.43-1.git.0.c2f4a4a.el7
+atomic-openshift-node|0|3.9.43|1.git.0.c2f4a4a.el7|x86_64|rhel-7-server-ose-3.9-rpms|3.9.43-1.git.0.c2f4a4a.el7
+'''
+
+        # Return values of our mocked function call. These get returned once per call.
+        mock_cmd.side_effect = [
+            (0, query_output, ''),  # first call to the mock
+        ]
+
+        # Act
+        results = Repoquery.run_ansible(params, False)
+
+        # Assert
+        self.assertFalse(results['changed'])
+        packages = results['results']['packages']
+        self.assertEqual(sorted(packages), sorted(params['names']))
+        self.assertEqual(packages['atomic-openshift-3.9*']['versions']['available_versions_full'],
+                         ['3.9.41-1.git.0.67432b0.el7', '3.9.43-1.git.0.c2f4a4a.el7'])
+        self.assertEqual(packages['atomic-openshift-node']['versions']['latest'], '3.9.43')
+        self.assertFalse(packages['atomic-openshift-excluder']['package_found'])
+        self.assertNotIn('results', results['results'])
+
+        # Making sure our mock was called as we expected
+        mock_cmd.assert_has_calls([
+            mock.call(['/usr/bin/repoquery', '--plugins', '--quiet', '--pkgnarrow=repos',
+                       '--queryformat=%{name}|%{epoch}|%{version}|%{release}|%{arch}|%{repo}|%{version}-%{release}',
+                       'atomic-openshift-3.9*', 'atomic-openshift-node', 'atomic-openshift-excluder']),
+        ])
+
+    def test_package_matches(self):
+        ''' Testing matching packages to the package specs yum accepts '''
+        package = ('atomic-openshift', '0', '3.9.43', '1.el7', 'x86_64')
+        for spec in ['atomic-openshift', 'atomic-openshift*', 'atomic-openshift-3.9*', 'atomic-openshift.x86_64',
+                     'atomic-openshift-3.9.43-1.el7', '0:atomic-openshift-3.9.43-1.el7.x86_64']:
+            self.assertTrue(Repoquery.package_matches(spec, *package), spec)
+        for spec in ['atomic-openshift-node', 'atomic-openshift-3.10*', 'atomic-openshift.noarch']:
+            self.assertFalse(Repoquery.package_matches(spec, *package), spec)
+
+    @mock.patch('repoquery._run')
+    def test_querying_several_packages_cached(self, mock_cmd):
+        ''' Testing that packages queried before are not queried again while the repo metadata is unchanged '''
+
+        # Arrange
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        repomd = os.path.join(cache_dir, 'repomd.xml')
+        with open(repomd, 'w') as file_handler:
+            file_handler.write('<repomd>1</repomd>')
+
+        params = {
+            'state': 'list',
+            'name': None,
+            'names': ['atomic-openshift', 'atomic-openshift-node'],
+            'query_type': 'repos',
+            'verbose': False,
+            'show_duplicates': False,
+            'match_version': None,
+            'ignore_excluders': False,
+            'cache_dir': os.path.join(cache_dir, 'repoquery'),
+            'cache_max_age': 3600,
+        }
+
+        mock_cmd.side_effect = [
+            (0, b'atomic-openshift|0|3.9.43|1.el7|x86_64|ose|3.9.43-1.el7\n', ''),
+            (0, b'atomic-openshift-node|0|3.9.43|1.el7|x86_64|ose|3.9.43-1.el7\n'
+                b'atomic-openshift-excluder|0|3.9.43|1.el7|noarch|ose|3.9.43-1.el7\n', ''),
+            (0, b'atomic-openshift|0|3.9.45|1.el7|x86_64|ose|3.9.45-1.el7\n', ''),
+        ]
+
+        with mock.patch.object(RepoqueryCache, 'REPOMD_GLOB', repomd), \
+                mock.patch.object(RepoqueryCache, 'CONFIG_GLOBS', []):
+            Repoquery.run_ansible(dict(params, names=['atomic-openshift']), False)
+
+            # Act
+            results = Repoquery.run_ansible(dict(params, names=['atomic-openshift', 'atomic-openshift-excluder',
+                                                                'atomic-openshift-node']), False)
+
+            # Assert
+            self.assertEqual(results['results']['cached_packages'], ['atomic-openshift'])
+            self.assertEqual(results['results']['packages']['atomic-openshift']['versions']['latest'], '3.9.43')
+            self.assertTrue(results['results']['packages']['atomic-openshift-excluder']['package_found'])
+            self.assertEqual(mock_cmd.call_args[0][0][-2:], ['atomic-openshift-excluder', 'atomic-openshift-node'])
+
+            # new repo metadata, the package is queried again
+            with open(repomd, 'w') as file_handler:
+                file_handler.write('<repomd>2</repomd>')
+            results = Repoquery.run_ansible(dict(params, names=['atomic-openshift']), False)
+            self.assertEqual(results['results']['cached_packages'], [])
+            self.assertEqual(results['results']['packages']['atomic-openshift']['versions']['latest'], '3.9.45')
+            self.assertEqual(mock_cmd.call_count, 3)
+            # the entries of the previous metadata were removed
+            self.assertEqual(len(os.listdir(params['cache_dir'])), 1)
+
+    def test_cache_prunes_expired_entries(self):
+        ''' Testing that expired entries and temporary files are removed when an entry is recorded '''
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        repomd = os.path.join(cache_dir, 'repomd.xml')
+        with open(repomd, 'w') as file_handler:
+            file_handler.write('<repomd>1</repomd>')
+        entries = os.path.join(cache_dir, 'repoquery')
+
+        with mock.patch.object(RepoqueryCache, 'REPOMD_GLOB', repomd), \
+                mock.patch.object(RepoqueryCache, 'CONFIG_GLOBS', []):
+            RepoqueryCache(entries, 3600).put('query', 'old', 'output')
+            old_path = RepoqueryCache(entries, 3600).path('query', 'old')
+            leftover = os.path.join(entries, 'leftover.tmp')
+            open(leftover, 'w').close()
+            for path in [old_path, leftover]:
+                os.utime(path, (0, 0))
+
+            cache = RepoqueryCache(entries, 3600)
+            cache.put('query', 'new', 'output')
+
+            self.assertEqual(os.listdir(entries), [os.path.basename(cache.path('query', 'new'))])
+            self.assertEqual(cache.get('query', 'new'), 'output')
+
+    def test_rpm_version_key(self):
+        ''' Testing that versions sort the way rpmvercmp compares them '''
+        ordered = ['1.0~rc1', '1.0', '1.0^git1', '1.0a', '1.0.1', '1.1', '1.2', '1.10']
+        for older, newer in zip(ordered, ordered[1:]):
+            self.assertLess(rpm_version_key(older), rpm_version_key(newer), (older, newer))
+        self.assertLess(rpm_version_key('1.a'), rpm_version_key('1.0'))
+        self.assertEqual(rpm_version_key('1.01'), rpm_version_key('1.1'))
+        self.assertEqual(rpm_version_key('1_0'), rpm_version_key('1.0'))
+        self.assertLess(rpm_version_key('1.git.0.f0a1b2c.el7'), rpm_version_key('1.git.1.0a1b2c3.el7'))
+
+    def test_format_versions(self):
+        ''' Testing sorting and matching versions '''
+        versions_full = ['3.9.0-0.53.0.el7', '3.10.0-1.el7', '3.9.0-0.9.0.el7', '3.9.1-1.el7', '3.9.10-1.el7']
+        formatted_versions = dict(
+            (version, {'version': version.split('-')[0], 'release': version.split('-')[1]})
+            for version in versions_full
+        )
+
+        repoquery = Repoquery('atomic-openshift', 'repos', True, '3.9', False, False)
+        versions = repoquery.format_versions(formatted_versions)
+
+        self.assertEqual(versions['available_versions_full'], [
+            '3.9.0-0.9.0.el7', '3.9.0-0.53.0.el7', '3.9.1-1.el7', '3.9.10-1.el7', '3.10.0-1.el7',
+        ])
+        self.assertEqual(versions['available_versions'], ['3.9.0', '3.9.0', '3.9.1', '3.9.10', '3.10.0'])
+        self.assertEqual(versions['latest_full'], '3.10.0-1.el7')
+        self.assertEqual(versions['matched_versions_full'], [
+            '3.9.0-0.9.0.el7', '3.9.0-0.53.0.el7', '3.9.1-1.el7', '3.9.10-1.el7',
+        ])
+        self.assertEqual(versions['matched_version_latest'], '3.9.10')
+        self.assertEqual(versions['matched_version_full_latest'], '3.9.10-1.el7')
+        self.assertTrue(versions['matched_version_found'])
+
+        repoquery.match_version = '3.11'
+        versions = repoquery.format_versions(formatted_versions)
+        self.assertFalse(versions['matched_version_found'])
+        self.assertEqual(versions['matched_versions'], [])
+        self.assertEqual(versions['matched_version_latest'], '')
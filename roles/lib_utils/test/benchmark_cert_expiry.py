@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+'''
+ Benchmark of the in-process DER parser of openshift_cert_expiry, used
+ when pyOpenSSL is missing, against the 'openssl x509 -text' command it
+ replaced. A corpus of distinct certificates is generated with pyOpenSSL,
+ or the *.crt files of a directory are loaded instead.
+
+    $ python roles/lib_utils/test/benchmark_cert_expiry.py [count|directory] [repeat]
+'''
+from __future__ import print_function
+
+import datetime
+import glob
+import io
+import os
+import sys
+import timeit
+
+from OpenSSL import crypto
+
+sys.path.insert(1, os.path.realpath(os.path.join(__file__, os.pardir, os.pardir, 'library')))
+
+# pylint: disable=import-error,wrong-import-position
+import openshift_cert_expiry  # noqa: E402
+
+
+def generated_corpus(count):
+    '''count distinct PEM certificates signed by one CA, with SANs like the ones of masters and nodes'''
+    key = crypto.PKey()
+    key.generate_key(crypto.TYPE_RSA, 2048)
+    ca = crypto.X509()
+    ca.set_serial_number(1)
+    ca.get_subject().commonName = 'openshift-signer@1500000000'
+    ca.gmtime_adj_notBefore(0)
+    ca.gmtime_adj_notAfter(5 * 365 * 24 * 60 * 60)
+    ca.set_issuer(ca.get_subject())
+    ca.set_pubkey(key)
+    ca.sign(key, 'sha256')
+
+    corpus = []
+    for index in range(count):
+        name = 'node-{:05}.example.com'.format(index)
+        cert = crypto.X509()
+        cert.set_version(2)
+        cert.set_serial_number(1000 + index)
+        cert.get_subject().commonName = name
+        cert.gmtime_adj_notBefore(0)
+        cert.gmtime_adj_notAfter((30 + index % 700) * 24 * 60 * 60)
+        cert.set_issuer(ca.get_subject())
+        cert.set_pubkey(key)
+        cert.add_extensions([crypto.X509Extension(
+            b'subjectAltName', False,
+            'DNS:{}, DNS:kubernetes, IP:10.0.{}.{}'.format(name, index // 250, index % 250).encode('utf-8'))])
+        cert.sign(key, 'sha256')
+        corpus.append(crypto.dump_certificate(crypto.FILETYPE_PEM, cert).decode('utf-8'))
+    return corpus
+
+
+def loaded_corpus(directory):
+    '''the PEM certificates in the *.crt files of directory'''
+    corpus = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.crt'))):
+        with io.open(path, 'r', encoding='utf-8') as fp:
+            corpus.append(fp.read())
+    return corpus
+
+
+def load_all(corpus, now):
+    '''load_and_handle_cert results for each certificate of corpus'''
+    return [openshift_cert_expiry.load_and_handle_cert(cert, now) for cert in corpus]
+
+
+def main():
+    '''Time loading the corpus in-process and with the openssl command'''
+    source = sys.argv[1] if len(sys.argv) > 1 else '1000'
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    corpus = loaded_corpus(source) if os.path.isdir(source) else generated_corpus(int(source))
+    now = datetime.datetime.now()
+    openshift_cert_expiry.HAS_OPENSSL = False
+    pem_to_der = openshift_cert_expiry.pem_to_der
+
+    der = load_all(corpus, now)
+    # make the in-process parser give up, so the openssl command is used
+    openshift_cert_expiry.pem_to_der = lambda pem_string: []
+    assert load_all(corpus, now) == der
+    openssl = timeit.timeit(lambda: load_all(corpus, now), number=repeat)
+    openshift_cert_expiry.pem_to_der = pem_to_der
+    in_process = timeit.timeit(lambda: load_all(corpus, now), number=repeat)
+
+    print('{} certificates, {} times each'.format(len(corpus), repeat))
+    print('openssl x509 -text {:.3f}s  DERCertificate {:.3f}s'.format(openssl, in_process))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+'''
+ Benchmark of the certificate filters templated for many named certificates
+ on many masters, with and without the memo of parsed certificate names.
+
+    $ python roles/lib_utils/test/benchmark_certificate_names.py [certificates] [masters]
+'''
+from __future__ import print_function
+
+import copy
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+import OpenSSL.crypto
+
+sys.path.insert(1, os.path.realpath(os.path.join(__file__, os.pardir, os.pardir, 'filter_plugins')))
+
+# pylint: disable=import-error,wrong-import-position
+import oo_filters  # noqa: E402
+
+MEMOIZED_CERTIFICATE_NAMES = oo_filters._certificate_names  # pylint: disable=protected-access
+
+
+def parsed_certificate_names(pem):
+    '''_certificate_names parsing the certificate on every call, as the filters did before the memo'''
+    cert = OpenSSL.crypto.load_certificate(OpenSSL.crypto.FILETYPE_PEM, pem)
+    alt_names = []
+    for i in range(cert.get_extension_count()):
+        if cert.get_extension(i).get_short_name() in ('subjectAltName', b'subjectAltName'):
+            alt_names = str(cert.get_extension(i)).split(', ')
+    common_name = cert.get_subject().commonName
+    return common_name.decode() if isinstance(common_name, bytes) else common_name, alt_names
+
+
+def named_certificates(count, directory):
+    '''count named certificates with their keys written in directory, and the PEM of each'''
+    key = OpenSSL.crypto.PKey()
+    key.generate_key(OpenSSL.crypto.TYPE_RSA, 2048)
+    key_pem = OpenSSL.crypto.dump_privatekey(OpenSSL.crypto.FILETYPE_PEM, key)
+    certificates = []
+    pems = []
+    for index in range(count):
+        name = 'console-{:03}.apps.example.com'.format(index)
+        cert = OpenSSL.crypto.X509()
+        cert.set_serial_number(index + 1)
+        cert.get_subject().commonName = name
+        cert.gmtime_adj_notBefore(0)
+        cert.gmtime_adj_notAfter(365 * 24 * 60 * 60)
+        cert.set_issuer(cert.get_subject())
+        cert.set_pubkey(key)
+        cert.add_extensions([OpenSSL.crypto.X509Extension(
+            b'subjectAltName', False,
+            'DNS:{}, DNS:api-{:03}.example.com, IP:10.1.0.{}'.format(name, index, index % 250).encode('utf-8'))])
+        cert.sign(key, 'sha256')
+        pem = OpenSSL.crypto.dump_certificate(OpenSSL.crypto.FILETYPE_PEM, cert)
+        certificate = {
+            'certfile': os.path.join(directory, 'custom{}.crt'.format(index)),
+            'keyfile': os.path.join(directory, 'custom{}.key'.format(index)),
+        }
+        with open(certificate['certfile'], 'wb') as fp:
+            fp.write(pem)
+        with open(certificate['keyfile'], 'wb') as fp:
+            fp.write(key_pem)
+        certificates.append(certificate)
+        pems.append(pem.decode('utf-8'))
+    return certificates, pems
+
+
+def template_masters(certificates, pems, masters):
+    '''the filters as templated for each master: the names of each certificate, and its SANs'''
+    results = []
+    for _ in range(masters):
+        results.append(oo_filters.lib_utils_oo_parse_named_certificates(
+            copy.deepcopy(certificates), '/etc/origin/master/named_certificates', ['master.example.com']))
+        results.append([oo_filters.lib_utils_oo_parse_certificate_san(pem) for pem in pems])
+    return results
+
+
+def main():
+    '''Time templating the certificate filters with and without the memo'''
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    masters = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    directory = tempfile.mkdtemp()
+    try:
+        certificates, pems = named_certificates(count, directory)
+
+        oo_filters._certificate_names = parsed_certificate_names  # pylint: disable=protected-access
+        expected = template_masters(certificates, pems, 1)
+        before = timeit.timeit(lambda: template_masters(certificates, pems, masters), number=1)
+
+        oo_filters._certificate_names = MEMOIZED_CERTIFICATE_NAMES  # pylint: disable=protected-access
+        assert template_masters(certificates, pems, 1) == expected
+        after = timeit.timeit(lambda: template_masters(certificates, pems, masters), number=1)
+    finally:
+        shutil.rmtree(directory)
+
+    print('{} named certificates on {} masters, {} certificates parsed'.format(count, masters, 2 * count * masters))
+    print('parsed each time {:.3f}s  memoized {:.3f}s'.format(before, after))
+
+
+if __name__ == '__main__':
+    main()
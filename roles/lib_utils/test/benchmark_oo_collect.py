@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+'''
+ Benchmark of lib_utils_oo_collect over the hostvars of many synthetic hosts,
+ against the recursive implementation it replaced.
+
+    $ python roles/lib_utils/test/benchmark_oo_collect.py [hosts] [repeat]
+'''
+from __future__ import print_function
+
+import os
+import sys
+import timeit
+
+sys.path.insert(1, os.path.realpath(os.path.join(__file__, os.pardir, os.pardir, 'filter_plugins')))
+
+# pylint: disable=import-error,wrong-import-position
+import oo_filters  # noqa: E402
+
+
+def recursive_collect(data_list, attribute=None, filters=None):
+    '''lib_utils_oo_collect before it was compiled'''
+    data = []
+    retval = []
+    for item in data_list:
+        if isinstance(item, list):
+            retval.extend(recursive_collect(item, attribute, filters))
+        else:
+            data.append(item)
+    if filters is not None:
+        retval.extend([oo_filters.get_attr(d, attribute) for d in data if (
+            all([oo_filters.get_attr(d, key) == filters[key] for key in filters]))])
+    else:
+        retval.extend([oo_filters.get_attr(d, attribute) for d in data])
+    return [val for val in retval if val is not None]
+
+
+def synthetic_hostvars(count):
+    '''hostvars of count hosts, a tenth of them masters and a fifth of them infra nodes'''
+    hostvars = []
+    for index in range(count):
+        name = 'node-{:05}.example.com'.format(index)
+        hostvars.append({
+            'inventory_hostname': name,
+            'ansible_host': '10.0.{}.{}'.format(index // 250, index % 250),
+            'openshift': {
+                'common': {'hostname': name, 'ip': '10.0.{}.{}'.format(index // 250, index % 250)},
+                'node': {'labels': {'region': 'infra' if index % 5 == 0 else 'primary', 'zone': 'z%d' % (index % 3)}},
+            },
+            'openshift_is_master': index % 10 == 0,
+            'openshift_schedulable': index % 7 != 0,
+        })
+    return hostvars
+
+
+def main():
+    '''Time collecting node names by label, as playbooks do'''
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    hostvars = synthetic_hostvars(count)
+    nested = [hostvars[:count // 2], [hostvars[count // 2:]]]
+    cases = [
+        ('names', hostvars, 'openshift.common.hostname', None),
+        ('infra names', hostvars, 'openshift.common.hostname',
+         {'openshift.node.labels.region': 'infra', 'openshift_schedulable': True}),
+        ('master IPs, nested', nested, 'openshift.common.ip', {'openshift_is_master': True}),
+    ]
+
+    print('{} hosts, {} times each'.format(count, repeat))
+    for label, data, attribute, filters in cases:
+        expected = recursive_collect(data, attribute, filters)
+        assert oo_filters.lib_utils_oo_collect(data, attribute, filters) == expected
+        before = timeit.timeit(lambda: recursive_collect(data, attribute, filters), number=repeat)
+        after = timeit.timeit(lambda: oo_filters.lib_utils_oo_collect(data, attribute, filters), number=repeat)
+        memoized = timeit.timeit(
+            lambda: oo_filters.lib_utils_oo_collect(data, attribute, filters, memoize=True), number=repeat)
+        print('{:20} recursive {:.3f}s  compiled {:.3f}s  memoized {:.3f}s'.format(label, before, after, memoized))
+
+
+if __name__ == '__main__':
+    main()
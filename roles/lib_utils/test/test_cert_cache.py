@@ -0,0 +1,151 @@
+'''
+ Unit tests for the CertCache class
+'''
+import datetime
+import json
+import os
+import sys
+
+import pytest
+from ansible.module_utils import basic
+from OpenSSL import crypto
+
+MODULE_PATH = os.path.realpath(os.path.join(__file__, os.pardir, os.pardir, 'library'))
+sys.path.insert(1, MODULE_PATH)
+
+# pylint: disable=import-error,wrong-import-position,missing-docstring
+# pylint: disable=invalid-name,redefined-outer-name
+import openshift_cert_expiry  # noqa: E402
+from openshift_cert_expiry import CertCache, load_cert_cached, load_cert_file  # noqa: E402
+
+
+@pytest.fixture()
+def parsed(monkeypatch):
+    """Record the certificates actually parsed by load_and_handle_cert"""
+    parsed_certs = []
+    load_and_handle_cert = openshift_cert_expiry.load_and_handle_cert
+
+    def load(cert_string, *args, **kwargs):
+        parsed_certs.append(cert_string)
+        return load_and_handle_cert(cert_string, *args, **kwargs)
+
+    monkeypatch.setattr(openshift_cert_expiry, 'load_and_handle_cert', load)
+    return parsed_certs
+
+
+@pytest.fixture()
+def cert_path(valid_cert, tmpdir):
+    path = tmpdir.join('cert.crt')
+    valid_cert['cert_file'].copy(path)
+    return str(path)
+
+
+def test_unchanged_file_is_not_parsed_again(cert_path, tmpdir, parsed):
+    cache_path = str(tmpdir.join('cache', 'cache.json'))
+    now = datetime.datetime.now()
+
+    cache = CertCache(cache_path)
+    first = load_cert_file(cert_path, now, cache)
+    cache.save()
+    assert (cache.hits, cache.misses) == (0, 1)
+    assert len(parsed) == 1
+
+    later = now + datetime.timedelta(hours=1)
+    cache = CertCache(cache_path)
+    second = load_cert_file(cert_path, later, cache)
+    assert (cache.hits, cache.misses) == (1, 0)
+    assert len(parsed) == 1
+
+    # Subject, expiry and serial are the same, time remaining is recalculated
+    assert second[0] == first[0]
+    assert second[1] == first[1].replace(microsecond=0)
+    assert second[2] == second[1] - later
+    assert second[3] == first[3]
+
+
+def test_touched_file_matches_digest(cert_path, tmpdir, parsed):
+    cache_path = str(tmpdir.join('cache.json'))
+    now = datetime.datetime.now()
+
+    cache = CertCache(cache_path)
+    load_cert_file(cert_path, now, cache)
+    cache.save()
+
+    stat = os.stat(cert_path)
+    os.utime(cert_path, (stat.st_atime, stat.st_mtime + 10))
+
+    cache = CertCache(cache_path)
+    load_cert_file(cert_path, now, cache)
+    assert (cache.hits, cache.misses) == (1, 0)
+    assert len(parsed) == 1
+    assert cache.used[cert_path]['stat'][1] == os.stat(cert_path).st_mtime
+
+
+def test_changed_file_is_parsed(cert_path, ca, tmpdir, parsed):
+    cache_path = str(tmpdir.join('cache.json'))
+    now = datetime.datetime.now()
+
+    cache = CertCache(cache_path)
+    load_cert_file(cert_path, now, cache)
+    cache.save()
+
+    with open(cert_path, 'wb') as fp:
+        fp.write(crypto.dump_certificate(crypto.FILETYPE_PEM, ca['cert']))
+
+    cache = CertCache(cache_path)
+    result = load_cert_file(cert_path, now, cache)
+    assert (cache.hits, cache.misses) == (0, 1)
+    assert len(parsed) == 2
+    assert result[3] == ca['cert'].get_serial_number()
+
+
+def test_cert_data_by_key(valid_cert, tmpdir, parsed):
+    cache = CertCache(str(tmpdir.join('cache.json')))
+    cert_string = valid_cert['cert_file'].read_text('utf8')
+    now = datetime.datetime.now()
+
+    load_cert_cached(cert_string, now, cache, '/api/v1/namespaces/default/secrets/router-certs')
+    load_cert_cached(cert_string, now, cache, '/api/v1/namespaces/default/secrets/router-certs')
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert len(parsed) == 1
+
+
+def test_only_used_entries_are_saved(cert_path, tmpdir):
+    cache_path = str(tmpdir.join('cache.json'))
+    with open(cache_path, 'w') as fp:
+        json.dump({'version': openshift_cert_expiry.CERT_CACHE_VERSION, 'certs': {'/gone.crt': {}}}, fp)
+
+    cache = CertCache(cache_path)
+    load_cert_file(cert_path, datetime.datetime.now(), cache)
+    cache.save()
+
+    with open(cache_path) as fp:
+        assert list(json.load(fp)['certs']) == [cert_path]
+
+
+@pytest.mark.parametrize('contents', ['', 'not json', '[]', '{"version": 0, "certs": {"/a.crt": {}}}'])
+def test_unusable_cache_is_ignored(contents, tmpdir):
+    cache_path = tmpdir.join('cache.json')
+    cache_path.write(contents)
+    assert CertCache(str(cache_path)).entries == {}
+
+
+def test_no_cache(cert_path, parsed):
+    load_cert_file(cert_path, datetime.datetime.now())
+    load_cert_file(cert_path, datetime.datetime.now())
+    assert len(parsed) == 2
+
+
+def test_check_mode_writes_no_cache(tmpdir, monkeypatch):
+    cache_path = tmpdir.join('cache', 'cert-cache.json')
+    monkeypatch.setattr(basic, '_ANSIBLE_ARGS', json.dumps({'ANSIBLE_MODULE_ARGS': {
+        'config_base': str(tmpdir),
+        'cache_path': str(cache_path),
+        '_ansible_check_mode': True,
+    }}).encode('utf-8'), raising=False)
+
+    with pytest.raises(SystemExit):
+        openshift_cert_expiry.main()
+
+    assert not cache_path.check()
+    assert not cache_path.dirpath().check()
@@ -0,0 +1,170 @@
+'''
+ Unit tests for the cert_expiry_report action plugin
+'''
+import io
+import json
+import os
+import sys
+
+import pytest
+from ansible import errors
+from ansible.playbook.play_context import PlayContext
+
+MODULE_PATH = os.path.realpath(os.path.join(__file__, os.pardir, os.pardir, 'action_plugins'))
+sys.path.insert(1, MODULE_PATH)
+
+# pylint: disable=import-error,wrong-import-position,missing-docstring
+# pylint: disable=invalid-name,redefined-outer-name
+from cert_expiry_report import ActionModule, write_report  # noqa: E402
+
+
+def cert(path, expiry, health='warning'):
+    return {'cert_cn': 'CN:' + path, 'path': path, 'expiry': expiry, 'days_remaining': 1, 'health': health}
+
+
+@pytest.fixture()
+def outfile():
+    # json.dumps gives str, which is bytes on Python 2
+    return io.StringIO() if sys.version_info[0] > 2 else io.BytesIO()
+
+
+@pytest.fixture()
+def host_results():
+    return [
+        ('master1', {
+            'check_results': {
+                'meta': {'warning_days': 30},
+                'ocp_certs': [cert('/etc/origin/master/master.server.crt', '2019-03-01 10:00:00')],
+                'etcd': [cert('/etc/etcd/server.crt', '2019-01-01 10:00:00', 'expired')],
+                'router': [],
+            },
+            'summary': {'warning': 1, 'expired': 1, 'ok': 10, 'total': 12},
+        }),
+        ('node1', {
+            'check_results': {
+                'meta': {'warning_days': 30},
+                'kubeconfigs': [cert('/etc/origin/node/system:node:node1.kubeconfig', '2019-02-01 10:00:00')],
+            },
+            'summary': {'warning': 1, 'expired': 0, 'ok': 3, 'total': 4},
+        }),
+    ]
+
+
+def test_json_report(outfile, host_results):
+    summary = write_report(outfile, iter(host_results))
+
+    report = json.loads(outfile.getvalue())
+    assert report['data'] == dict((host, result['check_results']) for host, result in host_results)
+    assert report['summary'] == summary == {'warning': 2, 'expired': 1, 'ok': 13, 'total': 16, 'hosts': 2}
+    assert 'expiring_soonest' not in report
+
+
+def test_jsonl_report(outfile, host_results):
+    write_report(outfile, iter(host_results), 'jsonl', expiring_soonest=2)
+
+    lines = [json.loads(line) for line in outfile.getvalue().splitlines()]
+    assert [line.get('host') for line in lines[:2]] == ['master1', 'node1']
+    assert lines[1]['check_results'] == host_results[1][1]['check_results']
+    assert lines[2]['summary']['total'] == 16
+    assert [(c['host'], c['kind'], c['expiry']) for c in lines[3]['expiring_soonest']] == [
+        ('master1', 'etcd', '2019-01-01 10:00:00'),
+        ('node1', 'kubeconfigs', '2019-02-01 10:00:00'),
+    ]
+
+
+def test_expiring_soonest(outfile, host_results):
+    write_report(outfile, iter(host_results), expiring_soonest=10)
+
+    soonest = json.loads(outfile.getvalue())['expiring_soonest']
+    assert [c['path'] for c in soonest] == [
+        '/etc/etcd/server.crt',
+        '/etc/origin/node/system:node:node1.kubeconfig',
+        '/etc/origin/master/master.server.crt',
+    ]
+
+
+def test_no_hosts(outfile):
+    write_report(outfile, iter([]), expiring_soonest=5)
+    assert json.loads(outfile.getvalue()) == {
+        'data': {},
+        'summary': {'warning': 0, 'expired': 0, 'ok': 0, 'total': 0, 'hosts': 0},
+        'expiring_soonest': [],
+    }
+
+
+class FakeShell(object):
+    def __init__(self):
+        self.tmpdir = None
+
+
+class FakeConnection(object):
+    def __init__(self):
+        self._shell = FakeShell()
+
+
+class FakeTask(object):
+    def __init__(self, args):
+        self.action = 'cert_expiry_report'
+        self.args = args
+        self.async_val = 0
+
+
+def run_plugin(args, host_results):
+    task_vars = {
+        'ansible_play_hosts': ['master1', 'node1', 'node2'],
+        'hostvars': {
+            'master1': {'check_results': host_results[0][1]},
+            'node1': {'check_results': host_results[1][1]},
+            'node2': {'check_results': {'failed': True, 'msg': 'unreachable'}},
+        },
+    }
+    plugin = ActionModule(FakeTask(args), FakeConnection(), PlayContext(), None, None, None)
+    return plugin.run(task_vars=task_vars)
+
+
+def test_run(tmpdir, host_results):
+    dest = tmpdir.join('report.json')
+
+    result = run_plugin({'dest': str(dest), 'expiring_soonest': '1'}, host_results)
+
+    assert result['changed']
+    assert result['dest'] == str(dest)
+    assert result['summary']['hosts'] == 2
+    assert result['hosts_without_results'] == ['node2']
+    report = json.loads(dest.read())
+    assert sorted(report['data']) == ['master1', 'node1']
+    assert [c['path'] for c in report['expiring_soonest']] == ['/etc/etcd/server.crt']
+    assert tmpdir.listdir() == [dest]
+
+
+def test_run_given_hosts(tmpdir, host_results):
+    dest = tmpdir.join('report.jsonl')
+
+    result = run_plugin({'dest': str(dest), 'format': 'jsonl', 'hosts': ['node1']}, host_results)
+
+    assert 'hosts_without_results' not in result
+    assert [json.loads(line).get('host') for line in dest.read().splitlines()] == ['node1', None]
+
+
+@pytest.mark.parametrize('args, message', [
+    ({}, "'dest' is required"),
+    ({'format': 'yaml'}, "'format' must be one of json, jsonl, not 'yaml'"),
+    ({'expiring_soonest': 'many'}, "'expiring_soonest' must be a number"),
+])
+def test_run_invalid_args(tmpdir, host_results, args, message):
+    if args:
+        args['dest'] = str(tmpdir.join('report.json'))
+    with pytest.raises(errors.AnsibleModuleError) as excinfo:
+        run_plugin(args, host_results)
+    assert message in str(excinfo.value)
+    assert tmpdir.listdir() == []
+
+
+def test_run_cleans_up_on_error(tmpdir, host_results):
+    dest = tmpdir.join('report.json')
+
+    # a host missing from hostvars
+    with pytest.raises(KeyError):
+        run_plugin({'dest': str(dest), 'hosts': ['master1', 'unknown']}, host_results)
+
+    assert tmpdir.listdir() == []
@@ -0,0 +1,86 @@
+'''
+ Unit tests for the DERCertificate class
+'''
+import os
+import sys
+
+import pytest
+from OpenSSL import crypto
+
+MODULE_PATH = os.path.realpath(os.path.join(__file__, os.pardir, os.pardir, 'library'))
+sys.path.insert(1, MODULE_PATH)
+
+# pylint: disable=import-error,wrong-import-position,missing-docstring
+# pylint: disable=invalid-name,redefined-outer-name
+from openshift_cert_expiry import DERCertificate, pem_to_der  # noqa: E402
+
+
+@pytest.fixture()
+def der_cert(valid_cert):
+    pem_string = valid_cert['cert_file'].read_text('utf8')
+    return DERCertificate(pem_to_der(pem_string)[0])
+
+
+def test_serial(der_cert, valid_cert):
+    assert der_cert.get_serial_number() == valid_cert['serial']
+
+
+def test_not_after(der_cert, valid_cert):
+    assert der_cert.get_notAfter() == valid_cert['cert'].get_notAfter().decode('utf-8')
+
+
+def test_subject(der_cert, valid_cert):
+    assert der_cert.get_subject().get_components() == [('CN', valid_cert['common_name'])]
+
+
+def test_subject_alt_names(der_cert, valid_cert):
+    # Compare with the extension as PyOpenSSL formats it
+    cert = valid_cert['cert']
+    expected = [str(cert.get_extension(i)) for i in range(cert.get_extension_count())
+                if cert.get_extension(i).get_short_name() == b'subjectAltName']
+    actual = [str(der_cert.get_extension(i)) for i in range(der_cert.get_extension_count())]
+    assert actual == expected
+
+
+def test_bundle(ca, valid_cert):
+    # Only the first certificate of a bundle is read, like `openssl x509` does
+    bundle = valid_cert['cert_file'].read_text('utf8') + \
+        crypto.dump_certificate(crypto.FILETYPE_PEM, ca['cert']).decode('utf-8')
+    ders = pem_to_der(bundle)
+    assert len(ders) == 2
+    assert DERCertificate(ders[0]).get_serial_number() == valid_cert['serial']
+    assert DERCertificate(ders[1]).get_subject().get_components() == [('CN', 'test-signer')]
+
+
+def test_full_subject_and_ipv6():
+    key = crypto.PKey()
+    key.generate_key(crypto.TYPE_RSA, 1024)
+    cert = crypto.X509()
+    cert.set_serial_number(7)
+    cert.gmtime_adj_notBefore(0)
+    cert.gmtime_adj_notAfter(60)
+    subject = cert.get_subject()
+    subject.C = 'US'
+    subject.O = 'Example, Inc.'
+    subject.OU = 'ops'
+    subject.CN = 'host.example.com'
+    subject.emailAddress = 'admin@example.com'
+    cert.set_issuer(subject)
+    cert.set_pubkey(key)
+    cert.add_extensions([
+        crypto.X509Extension(b'subjectAltName', False, b'DNS:host, IP:fd00::1, email:a@example.com'),
+    ])
+    cert.sign(key, 'sha256')
+
+    der_cert = DERCertificate(crypto.dump_certificate(crypto.FILETYPE_ASN1, cert))
+    assert der_cert.get_subject().get_components() == [
+        (name.decode('utf-8'), value.decode('utf-8')) for name, value in subject.get_components()
+    ]
+    # some openssl versions print a newline after IPv6 addresses
+    assert str(der_cert.get_extension(0)) == str(cert.get_extension(0)).replace('\n', '')
+
+
+@pytest.mark.parametrize('der_bytes', [b'', b'\x30\x03\x02\x01', b'\x30\x00', b'\x04\x02ab'])
+def test_invalid(der_bytes):
+    with pytest.raises(ValueError):
+        DERCertificate(der_bytes)
@@ -6,6 +6,7 @@ import os
 import sys
 
 import pytest
+from OpenSSL import crypto
 
 MODULE_PATH = os.path.realpath(os.path.join(__file__, os.pardir, os.pardir, 'library'))
 sys.path.insert(1, MODULE_PATH)
@@ -19,14 +20,17 @@ import openshift_cert_expiry  # noqa: E402
 # match up.
 
 
-@pytest.fixture(params=['OpenSSLCertificate', 'FakeOpenSSLCertificate'])
-def loaded_cert(request, valid_cert):
+@pytest.fixture(params=['OpenSSLCertificate', 'DERCertificate', 'FakeOpenSSLCertificate'])
+def loaded_cert(request, valid_cert, monkeypatch):
     """ parameterized fixture to provide load_and_handle_cert results
-        for both OpenSSL and FakeOpenSSL parsed certificates
+        for OpenSSL, DER and FakeOpenSSL parsed certificates
     """
     now = datetime.datetime.now()
 
     openshift_cert_expiry.HAS_OPENSSL = request.param == 'OpenSSLCertificate'
+    if request.param == 'FakeOpenSSLCertificate':
+        # make the in-process parser give up, so the openssl command is used
+        monkeypatch.setattr(openshift_cert_expiry, 'pem_to_der', lambda pem_string: [])
 
     # valid_cert['cert_file'] is a `py.path.LocalPath` object and
     # provides a read_text() method for reading the file contents.
@@ -65,3 +69,30 @@ def test_expiry(loaded_cert):
     time_remaining = loaded_cert['time_remaining']
     now = loaded_cert['now']
     assert expiry_date == now + time_remaining
+
+
+def test_subject(loaded_cert, valid_cert):
+    """Params:
+
+    * `loaded_cert` comes from the `loaded_cert` fixture in this file
+    * `valid_cert` comes from the 'valid_cert' fixture in conftest.py
+    """
+    subjects = loaded_cert['subject'].split(', ')
+    assert 'CN:{}'.format(valid_cert['common_name']) in subjects
+
+
+@pytest.mark.parametrize('parser', ['OpenSSLCertificate', 'DERCertificate', 'FakeOpenSSLCertificate'])
+def test_bundle_uses_first_cert(parser, ca, valid_cert, monkeypatch):
+    """Only the first certificate of a PEM bundle is reported, whichever
+    way it is parsed. The CA after it is ignored."""
+    monkeypatch.setattr(openshift_cert_expiry, 'HAS_OPENSSL', parser == 'OpenSSLCertificate')
+    if parser == 'FakeOpenSSLCertificate':
+        monkeypatch.setattr(openshift_cert_expiry, 'pem_to_der', lambda pem_string: [])
+    bundle = valid_cert['cert_file'].read_text('utf8') + \
+        crypto.dump_certificate(crypto.FILETYPE_PEM, ca['cert']).decode('utf-8')
+
+    (subject, _, _, serial) = openshift_cert_expiry.load_and_handle_cert(bundle, datetime.datetime.now())
+
+    assert serial == valid_cert['serial']
+    assert 'CN:{}'.format(valid_cert['common_name']) in subject.split(', ')
+    assert 'CN:test-signer' not in subject.split(', ')
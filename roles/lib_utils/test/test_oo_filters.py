@@ -0,0 +1,131 @@
+'''
+ Unit tests for oo_filters
+'''
+import os
+import sys
+
+import pytest
+from OpenSSL import crypto
+
+MODULE_PATH = os.path.realpath(os.path.join(__file__, os.pardir, os.pardir, 'filter_plugins'))
+sys.path.insert(1, MODULE_PATH)
+
+# pylint: disable=import-error,wrong-import-position,missing-docstring
+# pylint: disable=invalid-name,redefined-outer-name
+import oo_filters  # noqa: E402
+
+
+@pytest.fixture()
+def memo(monkeypatch):
+    """An empty certificate names memo, counting certificates actually parsed"""
+    monkeypatch.setattr(oo_filters, '_CERTIFICATE_NAMES_MEMO', oo_filters.OrderedDict())
+    parsed = []
+    load_certificate = crypto.load_certificate
+
+    def load(filetype, pem):
+        parsed.append(pem)
+        return load_certificate(filetype, pem)
+
+    monkeypatch.setattr(oo_filters.OpenSSL.crypto, 'load_certificate', load)
+    return parsed
+
+
+@pytest.fixture()
+def named_cert(valid_cert, tmpdir):
+    key_file = tmpdir.join('named.key')
+    key_file.write('')
+    return {'certfile': str(valid_cert['cert_file']), 'keyfile': str(key_file), 'cafile': 'ca.crt'}
+
+
+def test_parse_certificate_san(valid_cert, memo):
+    pem = valid_cert['cert_file'].read_text('utf8')
+    expected = ([valid_cert['common_name']] + valid_cert['dns'] + valid_cert['ip']
+                if valid_cert['dns'] or valid_cert['ip'] else [])
+
+    for _ in range(3):
+        assert oo_filters.lib_utils_oo_parse_certificate_san(pem) == expected
+    assert len(memo) == 1
+
+
+def test_parse_named_certificates(valid_cert, named_cert, memo):
+    expected = sorted(set([valid_cert['common_name']] + valid_cert['dns']))
+
+    for _ in range(3):
+        certificates = oo_filters.lib_utils_oo_parse_named_certificates(
+            [dict(named_cert)], '/etc/origin/master/named_certificates', [])
+        assert sorted(certificates[0]['names']) == expected
+        assert certificates[0]['certfile'] == os.path.join('/etc/origin/master/named_certificates',
+                                                           os.path.basename(named_cert['certfile']))
+    assert len(memo) == 1
+
+
+def test_certificate_names_memo_is_bounded(valid_cert, monkeypatch, memo):
+    monkeypatch.setattr(oo_filters, 'CERTIFICATE_NAMES_MEMO_SIZE', 2)
+    pem = valid_cert['cert_file'].read_text('utf8')
+    # the same certificate, with different text around it
+    pems = [pem, pem + '\n', pem + '\n\n']
+
+    for cert in pems + pems[-1:]:
+        oo_filters._certificate_names(cert)  # pylint: disable=protected-access
+    assert len(memo) == 3
+    assert len(oo_filters._CERTIFICATE_NAMES_MEMO) == 2  # pylint: disable=protected-access
+
+    # the least recently used was dropped
+    oo_filters._certificate_names(pems[0])  # pylint: disable=protected-access
+    assert len(memo) == 4
+
+
+def test_certificate_parse_failure_is_not_remembered(memo):
+    for _ in range(2):
+        with pytest.raises(Exception):
+            oo_filters.lib_utils_oo_parse_certificate_san('not a certificate')
+    assert len(memo) == 2
+    assert not oo_filters._CERTIFICATE_NAMES_MEMO  # pylint: disable=protected-access
+
+
+@pytest.mark.parametrize('data_list,attribute,filters,expected', [
+    ([{'a': 1, 'b': 5, 'z': 'z'}, {'a': 2, 'z': 'z'}, {'a': 3, 'z': 'z'}, {'a': 4, 'z': 'b'}], 'a', {'z': 'z'},
+     [1, 2, 3]),
+    ([[{'a': 1, 'b': 5, 'z': 'z'}, {'a': 2, 'b': 6, 'z': 'z'}], [{'a': 3, 'z': 'z'}, {'a': 4, 'z': 'b'}],
+      {'a': 5, 'z': 'z'}], 'a', {'z': 'z'}, [1, 2, 3, 5]),
+    # items of nested lists come before those of the list itself
+    ([{'a': 1}, [{'a': 2}, [{'a': 3}], {'a': 4}], {'a': 5}], 'a', None, [3, 2, 4, 1, 5]),
+    ([{'a': {'b': 1}, 'l': {'r': 'node'}}, {'a': {'b': 2}, 'l': {}}, {'a': None}], 'a.b', {'l.r': 'node'}, [1]),
+    ([{'a': 1}, {'b': 2}, {'a': None}], 'a', {}, [1]),
+    ([[], [[]]], 'a', None, []),
+])
+def test_oo_collect(data_list, attribute, filters, expected):
+    assert oo_filters.lib_utils_oo_collect(data_list, attribute, filters) == expected
+
+
+@pytest.mark.parametrize('data_list,attribute,filters', [
+    ({'a': 1}, 'a', None),
+    ([{'a': 1}], None, None),
+    ([{'a': 1}], 'a', ['z']),
+])
+def test_oo_collect_errors(data_list, attribute, filters):
+    with pytest.raises(oo_filters.errors.AnsibleFilterError):
+        oo_filters.lib_utils_oo_collect(data_list, attribute, filters)
+
+
+def test_oo_collect_memoize(monkeypatch):
+    monkeypatch.setattr(oo_filters, '_COLLECT_MEMO', oo_filters.OrderedDict())
+    monkeypatch.setattr(oo_filters, 'COLLECT_MEMO_SIZE', 2)
+    hosts = [{'name': 'node1', 'labels': {'region': 'infra'}}, {'name': 'node2', 'labels': {'region': 'primary'}}]
+
+    result = oo_filters.lib_utils_oo_collect(hosts, 'name', {'labels.region': 'infra'}, memoize=True)
+    assert result == ['node1']
+    result.append('changed by the caller')
+
+    # the same list is not walked again, and an equal list is not mistaken for it
+    hosts.append({'name': 'node3', 'labels': {'region': 'infra'}})
+    assert oo_filters.lib_utils_oo_collect(hosts, 'name', {'labels.region': 'infra'}, memoize=True) == ['node1']
+    assert oo_filters.lib_utils_oo_collect(list(hosts), 'name', {'labels.region': 'infra'},
+                                           memoize=True) == ['node1', 'node3']
+    assert oo_filters.lib_utils_oo_collect(hosts, 'name', {'labels.region': 'infra'}) == ['node1', 'node3']
+
+    # unhashable filter values are not remembered, and the memo is bounded
+    assert oo_filters.lib_utils_oo_collect(hosts, 'name', {'labels': {'region': 'primary'}},
+                                           memoize=True) == ['node2']
+    oo_filters.lib_utils_oo_collect(hosts, 'name', None, memoize=True)
+    assert len(oo_filters._COLLECT_MEMO) == 2
@@ -0,0 +1,135 @@
+'''
+ Unit tests for the discovery of secrets holding certificates
+'''
+import json
+import os
+import sys
+
+import pytest
+
+MODULE_PATH = os.path.realpath(os.path.join(__file__, os.pardir, os.pardir, 'library'))
+sys.path.insert(1, MODULE_PATH)
+
+# pylint: disable=import-error,wrong-import-position,missing-docstring
+# pylint: disable=invalid-name,redefined-outer-name
+import openshift_cert_expiry  # noqa: E402
+from openshift_cert_expiry import list_tls_secrets, secret_kind, secret_owner, tls_secret_key  # noqa: E402
+
+
+def secret(name, namespace='default', data=None, annotations=None, owners=None):
+    return {
+        'metadata': {
+            'name': name,
+            'namespace': namespace,
+            'selfLink': '/api/v1/namespaces/{}/secrets/{}'.format(namespace, name),
+            'annotations': annotations,
+            'ownerReferences': owners,
+        },
+        'data': {'tls.crt': 'Y2VydA==', 'tls.key': 'a2V5'} if data is None else data,
+    }
+
+
+class FakePopen(object):
+    commands = []
+
+    def __init__(self, cmd, stdout=None):
+        self.commands.append(cmd)
+        self.output = self.outputs.pop(0)
+
+    def communicate(self):
+        return (self.output, None)
+
+
+@pytest.fixture()
+def oc(monkeypatch):
+    FakePopen.commands = []
+    FakePopen.outputs = []
+    monkeypatch.setattr(openshift_cert_expiry.subprocess, 'Popen', FakePopen)
+    return FakePopen
+
+
+def test_list_tls_secrets(oc):
+    secrets = [
+        secret('router-certs'),
+        secret('registry-certificates', data={'registry.crt': 'Y2VydA==', 'registry.key': 'a2V5'}),
+        secret('builder-token', data={'token': 'dG9rZW4='}),
+        secret('no-data', data={}),
+    ]
+    oc.outputs.append(json.dumps({'items': secrets}).encode('utf-8'))
+
+    found = list_tls_secrets(['default'])
+
+    assert oc.commands == [['oc', 'get', 'secrets', '-n', 'default', '-o', 'json']]
+    assert [s['metadata']['name'] for s in found] == ['router-certs', 'registry-certificates']
+
+
+def test_list_tls_secrets_several_namespaces(oc):
+    oc.outputs.append(json.dumps({'items': [secret('a', 'default')]}).encode('utf-8'))
+    oc.outputs.append(json.dumps({'items': [secret('c', 'myproject')]}).encode('utf-8'))
+
+    found = list_tls_secrets(['default', 'myproject'])
+
+    assert oc.commands == [
+        ['oc', 'get', 'secrets', '-n', 'default', '-o', 'json'],
+        ['oc', 'get', 'secrets', '-n', 'myproject', '-o', 'json'],
+    ]
+    assert not any('--all-namespaces' in cmd for cmd in oc.commands)
+    assert [s['metadata']['name'] for s in found] == ['a', 'c']
+
+
+def test_list_tls_secrets_skips_unlisted_namespace(oc):
+    oc.outputs.append(b'Error from server (Forbidden): secrets is forbidden')
+    oc.outputs.append(json.dumps({'items': [secret('c', 'myproject')]}).encode('utf-8'))
+
+    found = list_tls_secrets(['forbidden', 'myproject'])
+
+    assert len(oc.commands) == 2
+    assert [s['metadata']['name'] for s in found] == ['c']
+
+
+@pytest.mark.parametrize('output', [b'', b'error: You must be logged in to the server'])
+def test_list_tls_secrets_not_a_master(oc, output):
+    oc.outputs.append(output)
+    assert list_tls_secrets(['default']) == []
+
+
+def test_list_tls_secrets_no_oc(monkeypatch):
+    def popen(*_, **__):
+        raise OSError('No such file or directory')
+    monkeypatch.setattr(openshift_cert_expiry.subprocess, 'Popen', popen)
+    assert list_tls_secrets(['default']) == []
+
+
+@pytest.mark.parametrize('data, expected', [
+    ({'tls.crt': 'x', 'registry.crt': 'y'}, 'tls.crt'),
+    ({'registry.crt': 'y'}, 'registry.crt'),
+    ({'tls.crt': ''}, None),
+    (None, None),
+])
+def test_tls_secret_key(data, expected):
+    assert tls_secret_key({'data': data}) == expected
+
+
+@pytest.mark.parametrize('tls_secret, expected', [
+    (secret('router-certs', annotations={openshift_cert_expiry.ORIGINATING_SERVICE_ANNOTATION: 'router'}),
+     'service/router'),
+    (secret('etcd-client', owners=[{'kind': 'Deployment', 'name': 'prometheus'}]), 'deployment/prometheus'),
+    (secret('my-route-tls'), None),
+])
+def test_secret_owner(tls_secret, expected):
+    assert secret_owner(tls_secret) == expected
+
+
+@pytest.mark.parametrize('tls_secret, expected', [
+    (secret('router-certs'), 'router'),
+    (secret('router-shard-1-certs'), 'router'),
+    (secret('shard-certs', annotations={openshift_cert_expiry.ORIGINATING_SERVICE_ANNOTATION: 'router-east'}),
+     'router'),
+    (secret('registry-certificates'), 'registry'),
+    (secret('registry-tls', annotations={openshift_cert_expiry.ORIGINATING_SERVICE_ANNOTATION: 'docker-registry'}),
+     'registry'),
+    (secret('router-metrics-tls'), 'secrets'),
+    (secret('my-route-tls'), 'secrets'),
+])
+def test_secret_kind(tls_secret, expected):
+    assert secret_kind(tls_secret) == expected
@@ -7,7 +7,10 @@ import base64
 import traceback
 import errno
 import json
+import time
+import heapq
 from collections import defaultdict
+from functools import partial
 
 from ansible.plugins.action import ActionBase
 from ansible.module_utils.six import string_types
@@ -27,6 +30,13 @@ sys.path.insert(1, os.path.dirname(os.path.dirname(__file__)))
 # pylint: disable=wrong-import-position; the import statement must come after
 # the manipulation of sys.path.
 from openshift_checks import OpenShiftCheck, OpenShiftCheckException, load_checks  # noqa: E402
+from openshift_checks.resource_snapshot import ResourceSnapshot  # noqa: E402
+
+
+# keep the start and end of remote files larger than this many bytes
+DEFAULT_MAX_FILE_SIZE = 50 * 1024 * 1024
+# module executions listed in the timing of each check result, slowest first
+SLOWEST_MODULE_CALLS = 5
 
 
 class ActionModule(ActionBase):
@@ -57,6 +67,8 @@ class ActionModule(ActionBase):
                 return result
 
             resolved_checks = resolve_checks(requested_checks, known_checks.values())
+            cache_ttl = cache_ttl_from_vars(task_vars)
+            max_file_size = max_file_size_from_vars(task_vars)
         except OpenShiftCheckException as exc:
             result["failed"] = True
             result["msg"] = str(exc)
@@ -74,9 +86,12 @@ class ActionModule(ActionBase):
         if task_vars.get('openshift_use_crio_only'):
             user_disabled_checks.append('docker_storage')
 
+        fetch_files = partial(self.fetch_remote_files, tmp=tmp, task_vars=task_vars, max_size=max_file_size)
         for name in resolved_checks:
             display.banner("CHECK [{} : {}]".format(name, task_vars["ansible_host"]))
-            check_results[name] = run_check(name, known_checks[name], user_disabled_checks, output_dir)
+            check_results[name] = run_check(
+                name, known_checks[name], user_disabled_checks, output_dir, cache_ttl, fetch_files,
+            )
 
         result["changed"] = any(r.get("changed") for r in check_results.values())
         if any(r.get("failed") for r in check_results.values()):
@@ -90,6 +105,8 @@ class ActionModule(ActionBase):
         """Find all existing checks and return a mapping of names to instances."""
         load_checks()
         want_full_results = bool(output_dir)
+        # all checks on this host share the cluster resources they fetch
+        snapshot = ResourceSnapshot()
 
         known_checks = {}
         for cls in OpenShiftCheck.subclasses():
@@ -105,10 +122,70 @@ class ActionModule(ActionBase):
                 tmp=tmp,
                 task_vars=task_vars,
                 want_full_results=want_full_results,
-                templar=self._templar
+                templar=self._templar,
+                snapshot=snapshot,
             )
         return known_checks
 
+    # pylint: disable=too-many-arguments
+    def fetch_remote_files(self, output_dir, files, tmp=None, task_vars=None, max_size=0):
+        """Copy remote files into output_dir, gzipped and cut down to max_size bytes if larger.
+
+        files is a list of (remote path, local file name). The files are compressed on
+        the host with one module execution, then each is transferred to disk by the
+        connection, so that large files never have to be held in memory.
+        """
+        if not files or not prepare_output_dir(output_dir):
+            return
+
+        args = dict(files=[dict(src=src, name=fname) for src, fname in files], max_size=max_size)
+        # pylint: disable=broad-except; do not need to do anything about failure to write dir/file
+        # and do not want exceptions to break anything.
+        try:
+            result = self._execute_module("collect_files", args, tmp, task_vars)
+            if result.get("failed"):
+                display.warning("Could not collect remote files: {}".format(result.get("msg")))
+                return
+        except Exception as exc:
+            display.warning("Failed collecting remote files into {}: {}".format(output_dir, exc))
+            return
+
+        try:
+            for collected in result.get("files", []):
+                if collected.get("error"):
+                    display.warning("Could not retrieve file {}: {}".format(collected["src"], collected["error"]))
+                    continue
+                local_file = os.path.join(output_dir, collected["name"] + ".gz")
+                self.transfer_remote_file(collected["dest"], local_file, tmp, task_vars)
+                if collected.get("truncated"):
+                    display.vv("Kept only the start and end of {}, which has {} bytes".format(
+                        collected["src"], collected["size"]))
+        except Exception as exc:
+            display.warning("Failed writing remote files to {}: {}".format(output_dir, exc))
+        finally:
+            try:
+                self._execute_module("file", dict(path=result["dest"], state="absent"), tmp, task_vars)
+            except Exception as exc:
+                display.warning("Failed removing collected files {} from the host: {}".format(
+                    result.get("dest"), exc))
+
+    def transfer_remote_file(self, remote_file, local_file, tmp=None, task_vars=None):
+        """Stream a remote file to a local one through the connection, or slurp it if that is not possible."""
+        # pylint: disable=broad-except; e.g. become to a user other than root leaves the
+        # file unreadable to the connection, which is what slurp is for.
+        try:
+            self._connection.fetch_file(remote_file, local_file)
+            return
+        except Exception as exc:
+            display.vvv("Could not fetch {} through the connection, slurping: {}".format(remote_file, exc))
+
+        result = self._execute_module("slurp", dict(src=remote_file), tmp, task_vars)
+        if result.get("failed"):
+            display.warning("Could not retrieve file {}: {}".format(remote_file, result.get("msg")))
+            return
+        with open(local_file, "wb") as outfile:
+            outfile.write(base64.b64decode(result["content"]))
+
 
 def list_known_checks(known_checks):
     """Return text listing the existing checks and tags."""
@@ -201,8 +278,43 @@ def normalize(checks):
     return [name.strip() for name in checks if name.strip()]
 
 
-def run_check(name, check, user_disabled_checks, output_dir=None):
-    """Run a single check if enabled and return a result dict."""
+def cache_ttl_from_vars(task_vars):
+    """Return the number of seconds a cached check result stays valid; 0 disables the cache."""
+    ttl = task_vars.get("openshift_checks_cache_ttl") or 0
+    try:
+        ttl = int(ttl)
+    except (TypeError, ValueError):
+        raise OpenShiftCheckException(
+            "The openshift_checks_cache_ttl variable must be a number of seconds, not '{}'".format(ttl)
+        )
+    return max(ttl, 0)
+
+
+def max_file_size_from_vars(task_vars):
+    """Return the number of bytes of a remote file to keep in the output directory; 0 keeps all."""
+    max_size = task_vars.get("openshift_checks_output_max_file_size")
+    if max_size is None:
+        return DEFAULT_MAX_FILE_SIZE
+    try:
+        max_size = int(max_size)
+    except (TypeError, ValueError):
+        raise OpenShiftCheckException(
+            "The openshift_checks_output_max_file_size variable must be a number of bytes, not '{}'".format(max_size)
+        )
+    return max(max_size, 0)
+
+
+# pylint: disable=too-many-branches,too-many-arguments
+def run_check(name, check, user_disabled_checks, output_dir=None, cache_ttl=0, fetch_files=None):
+    """Run a single check if enabled and return a result dict.
+
+    When an output_dir and a cache_ttl are given, checks that declare their inputs
+    (see OpenShiftCheck.fingerprint) reuse a passing result from a previous run as long
+    as their fingerprint is unchanged and the result is younger than cache_ttl seconds.
+
+    fetch_files is used to copy the remote files a check registers into the output_dir
+    (see ActionModule.fetch_remote_files); without it, they are slurped one at a time.
+    """
 
     # determine if we're going to run the check (not inactive or disabled)
     if name in user_disabled_checks or '*' in user_disabled_checks:
@@ -219,14 +331,26 @@ def run_check(name, check, user_disabled_checks, output_dir=None):
     if not is_active:
         return dict(skipped=True, skipped_reason="Not active for this host")
 
+    fingerprint = None
+    if output_dir and cache_ttl:
+        try:
+            fingerprint = check.fingerprint()
+        except Exception as exc:
+            display.warning("Could not determine inputs for check {}, not using cache: {}".format(name, exc))
+        cached = read_cached_result(output_dir, name, fingerprint, cache_ttl)
+        if cached is not None:
+            return cached
+
     # run the check
     result = {}
+    start = time.time()
     try:
         result = check.run()
     except OpenShiftCheckException as exc:
         check.register_failure(exc)
     except Exception as exc:
         check.register_failure("\n".join([str(exc), traceback.format_exc()]))
+    result["timing"] = timing_summary(time.time() - start, check.module_calls)
 
     # process the check state; compose the result hash, write files as needed
     if check.changed:
@@ -241,11 +365,66 @@ def run_check(name, check, user_disabled_checks, output_dir=None):
     if check.logs:
         write_to_output_file(output_dir, name + ".log.json", check.logs)
     if check.files_to_save:
-        write_files_to_save(output_dir, check)
+        write_files_to_save(output_dir, check, fetch_files)
+    # failures may be transient (e.g. a registry outage) so only passing results are reused
+    if fingerprint and not result.get("failed") and not result.get("changed"):
+        write_cached_result(output_dir, name, fingerprint, result)
 
     return result
 
 
+def timing_summary(duration, module_calls):
+    """Return a summary of the time a check took and the modules it executed, for its result.
+
+    Only the SLOWEST_MODULE_CALLS slowest module executions are listed, so that the
+    summary stays small however many modules a check runs.
+    """
+    return dict(
+        duration=round(duration, 3),
+        module_executions=len(module_calls),
+        module_seconds=round(sum(call["seconds"] for call in module_calls), 3),
+        module_output_bytes=sum(call["output_bytes"] for call in module_calls),
+        slowest_module_calls=heapq.nlargest(SLOWEST_MODULE_CALLS, module_calls, key=lambda call: call["seconds"]),
+    )
+
+
+def cached_result_path(output_dir, name):
+    """Return the path of the file caching results of the named check."""
+    return os.path.join(output_dir, "cache", name + ".json")
+
+
+def read_cached_result(output_dir, name, fingerprint, ttl):
+    """Return a copy of the cached result for the check if it is still valid, else None.
+
+    Valid means it was recorded for the same fingerprint less than ttl seconds ago.
+    The returned result is marked with "cached" and "cached_at" so it is clear it did not run.
+    """
+    if not fingerprint:
+        return None
+    # pylint: disable=broad-except; a broken cache file just means the check runs again
+    try:
+        with open(cached_result_path(output_dir, name)) as infile:
+            entry = json.load(infile)
+        if entry["fingerprint"] != fingerprint or time.time() - entry["timestamp"] >= ttl:
+            return None
+        result = dict(entry["result"])
+    except Exception:
+        return None
+
+    # the check did not run now, so it took no time
+    result.pop("timing", None)
+
+    result["cached"] = True
+    result["cached_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(entry["timestamp"]))
+    return result
+
+
+def write_cached_result(output_dir, name, fingerprint, result):
+    """Record the check result under its fingerprint for later runs to reuse."""
+    entry = dict(fingerprint=fingerprint, timestamp=time.time(), result=result)
+    write_to_output_file(os.path.join(output_dir, "cache"), name + ".json", entry)
+
+
 def prepare_output_dir(dirname):
     """Create the directory, including parents. Return bool for success/failure."""
     try:
@@ -331,22 +510,27 @@ def write_result_to_output_dir(output_dir, result):
         result["output_files"] = "Error writing check results to {}:\n{}".format(filename, exc)
 
 
-def write_files_to_save(output_dir, check):
+def write_files_to_save(output_dir, check, fetch_files=None):
     """Write files to check subdir in output dir."""
     if not output_dir:
         return
     output_dir = os.path.join(output_dir, check.name)
     seen_file = defaultdict(lambda: 0)
+    remote_files = []
     for file_to_save in check.files_to_save:
         fname = file_to_save.filename
         while seen_file[fname]:  # just to be sure we never re-write a file, append numbers as needed
             seen_file[fname] += 1
             fname = "{}.{}".format(fname, seen_file[fname])
         seen_file[fname] += 1
-        if file_to_save.remote_filename:
+        if file_to_save.remote_filename and fetch_files:
+            remote_files.append((file_to_save.remote_filename, fname))
+        elif file_to_save.remote_filename:
             copy_remote_file_to_dir(check, file_to_save.remote_filename, output_dir, fname)
         else:
             write_to_output_file(output_dir, fname, file_to_save.contents)
+    if remote_files:
+        fetch_files(output_dir, remote_files)
 
 
 def full_class_name(cls):
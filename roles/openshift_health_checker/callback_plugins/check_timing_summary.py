@@ -0,0 +1,129 @@
+"""Ansible callback plugin to print a table of the slowest health checks across all hosts.
+
+The openshift_health_check action plugin records in each check result how long
+the check took and the remote modules it executed. This plugin adds those up by
+check over the whole run, so it is easy to see which checks dominate.
+"""
+
+from collections import defaultdict
+import traceback
+
+from ansible.plugins.callback import CallbackBase
+from ansible import constants as C
+from ansible.utils.color import stringc
+
+
+class CallbackModule(CallbackBase):
+    """This callback plugin collects health check timings and summarizes the slowest checks."""
+
+    CALLBACK_VERSION = 2.0
+    CALLBACK_TYPE = 'aggregate'
+    CALLBACK_NAME = 'check_timing_summary'
+    CALLBACK_NEEDS_WHITELIST = False
+
+    def __init__(self):
+        super(CallbackModule, self).__init__()
+        self.__timings = []
+
+    def v2_runner_on_ok(self, result):
+        super(CallbackModule, self).v2_runner_on_ok(result)
+        self.__record(result)
+
+    def v2_runner_on_failed(self, result, ignore_errors=False):
+        super(CallbackModule, self).v2_runner_on_failed(result, ignore_errors)
+        self.__record(result)
+
+    def __record(self, result):
+        # pylint: disable=protected-access; Ansible gives us no sufficient public
+        # API on TaskResult objects.
+        checks = result._result.get('checks')
+        if checks:
+            self.__timings.extend(check_timings(result._host.get_name(), checks))
+
+    def v2_playbook_on_stats(self, stats):
+        super(CallbackModule, self).v2_playbook_on_stats(stats)
+        # pylint: disable=broad-except; capturing exceptions broadly is
+        # intentional, to isolate arbitrary failures in this callback plugin.
+        try:
+            if self.__timings:
+                self._display.display(slowest_checks_table(self.__timings))
+        except Exception:
+            msg = stringc(
+                u'An error happened while summarizing health check timings:\n'
+                u'{}'.format(traceback.format_exc()), C.COLOR_WARN)
+            self._display.v(msg)
+
+
+def check_timings(host, checks):
+    """Return a list of dicts with the timing of each check that ran on the host."""
+    timings = []
+    for name, result in sorted(checks.items()):
+        timing = result.get('timing')
+        if not timing:  # skipped or reused from a previous run
+            continue
+        timings.append({
+            'host': host,
+            'check': name,
+            'duration': timing.get('duration', 0),
+            'module_executions': timing.get('module_executions', 0),
+            'module_output_bytes': timing.get('module_output_bytes', 0),
+        })
+    return timings
+
+
+def slowest_checks(timings, limit=10):
+    """Add up the timings of each check over all hosts.
+
+    Returns a list of dicts, one per check, ordered by total time spent in the check.
+    """
+    by_check = defaultdict(list)
+    for timing in timings:
+        by_check[timing['check']].append(timing)
+
+    summaries = []
+    for name, check_timings_ in by_check.items():
+        slowest = max(check_timings_, key=lambda timing: timing['duration'])
+        summaries.append({
+            'check': name,
+            'hosts': len(check_timings_),
+            'total': sum(timing['duration'] for timing in check_timings_),
+            'max': slowest['duration'],
+            'max_host': slowest['host'],
+            'module_executions': sum(timing['module_executions'] for timing in check_timings_),
+            'module_output_bytes': sum(timing['module_output_bytes'] for timing in check_timings_),
+        })
+    summaries.sort(key=lambda summary: (-summary['total'], summary['check']))
+    return summaries[:limit]
+
+
+def slowest_checks_table(timings, limit=10):
+    """Return a pretty-formatted table of the slowest checks."""
+    header = (u'Check', u'Hosts', u'Total', u'Slowest host', u'Modules', u'Output')
+    rows = [
+        (
+            summary['check'],
+            str(summary['hosts']),
+            u'{:.1f}s'.format(summary['total']),
+            u'{:.1f}s {}'.format(summary['max'], summary['max_host']),
+            str(summary['module_executions']),
+            format_size(summary['module_output_bytes']),
+        )
+        for summary in slowest_checks(timings, limit)
+    ]
+    widths = [max(len(row[i]) for row in [header] + rows) for i in range(len(header))]
+    row_format = u'  ' + u'  '.join(u'{{:<{}}}'.format(width) for width in widths)
+
+    table = [u'', u'Slowest health checks:', u'', row_format.format(*header).rstrip()]
+    table.extend(row_format.format(*row).rstrip() for row in rows)
+    return u'\n'.join(table)
+
+
+def format_size(num_bytes):
+    """Return a short human-readable size."""
+    if num_bytes < 1024:
+        return u'{}B'.format(num_bytes)
+    for unit in (u'KiB', u'MiB'):
+        num_bytes /= 1024.0
+        if num_bytes < 1024:
+            return u'{:.1f}{}'.format(num_bytes, unit)
+    return u'{:.1f}GiB'.format(num_bytes / 1024.0)
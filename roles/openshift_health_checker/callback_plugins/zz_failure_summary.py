@@ -2,9 +2,15 @@
 
 The file / module name is prefixed with `zz_` to make this plugin be loaded last
 by Ansible, thus making its output the last thing that users see.
+
+Failures are grouped as they happen by a fingerprint of their play, task and
+messages, in which host names, IP addresses, UUIDs and timestamps are masked.
+Only the first failure of each group and a sample of the failing hosts are
+kept, so a failure hitting a whole fleet is stored and shown only once.
 """
 
-from collections import defaultdict
+from collections import OrderedDict
+import re
 import traceback
 
 from ansible.plugins.callback import CallbackBase
@@ -14,6 +20,18 @@ from ansible.module_utils.six import string_types, PY2
 
 
 FAILED_NO_MSG = u'Failed without returning a message.'
+# Number of hosts listed for each group of identical failures
+HOST_SAMPLE_SIZE = 10
+# Variable parts of messages, replaced by a placeholder in fingerprints. Timestamps go
+# first, as their times would otherwise look like IPv6 addresses.
+MASKS = (
+    (re.compile(r'\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b'), u'<uuid>'),
+    (re.compile(r'\b\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:?\d{2})?'), u'<timestamp>'),
+    (re.compile(r'\b\d{14}Z\b'), u'<timestamp>'),
+    (re.compile(r'\b\d{2}:\d{2}:\d{2}(?:\.\d+)?\b'), u'<timestamp>'),
+    (re.compile(r'\b(?:\d{1,3}\.){3}\d{1,3}\b'), u'<ip>'),
+    (re.compile(r'(?<![\w:])(?:[0-9a-fA-F]{0,4}:){2,7}[0-9a-fA-F]{0,4}(?![\w:])'), u'<ip>'),
+)
 
 
 class CallbackModule(CallbackBase):
@@ -26,7 +44,8 @@ class CallbackModule(CallbackBase):
 
     def __init__(self):
         super(CallbackModule, self).__init__()
-        self.__failures = []
+        self.__failures = FailureGroups()
+        self.__context = None
         self.__playbook_file = ''
 
     def v2_playbook_on_start(self, playbook):
@@ -38,15 +57,19 @@ class CallbackModule(CallbackBase):
     def v2_runner_on_failed(self, result, ignore_errors=False):
         super(CallbackModule, self).v2_runner_on_failed(result, ignore_errors)
         if not ignore_errors:
-            self.__failures.append(result)
+            # pylint: disable=protected-access; Ansible gives us no sufficient public
+            # API on TaskResult objects. See failure_summary about the context.
+            self.__context = self.__context or result._result.get('playbook_context')
+            self.__failures.add(failure_to_dict(result))
 
     def v2_playbook_on_stats(self, stats):
         super(CallbackModule, self).v2_playbook_on_stats(stats)
         # pylint: disable=broad-except; capturing exceptions broadly is
         # intentional, to isolate arbitrary failures in this callback plugin.
         try:
-            if self.__failures:
-                self._display.display(failure_summary(self.__failures, self.__playbook_file))
+            if self.__failures.count:
+                self._display.display(
+                    format_failure_summary(self.__failures.failures(), self.__context, self.__playbook_file))
         except Exception:
             msg = stringc(
                 u'An error happened while generating a summary of failures:\n'
@@ -74,6 +97,11 @@ def failure_summary(failures, playbook):
     failures = [failure_to_dict(failure) for failure in failures]
     failures = deduplicate_failures(failures)
 
+    return format_failure_summary(failures, context, playbook)
+
+
+def format_failure_summary(failures, context, playbook):
+    """Return a summary of grouped failures, including details on health checks."""
     summary = [u'', u'', u'Failure summary:', u'']
 
     width = len(str(len(failures)))
@@ -137,33 +165,72 @@ def play_name(obj):
     return play_name(getattr(obj, '_parent'))
 
 
-def deduplicate_failures(failures):
-    """Group together similar failures from different hosts.
+def mask_message(message, host=None):
+    """Return message with the host's name, IP addresses, UUIDs and timestamps replaced by placeholders."""
+    if not isinstance(message, string_types):
+        message = str(message)
+    if host:
+        # the host may also be referred to by its short name
+        for name in sorted(set([host, host.split('.')[0]]), key=len, reverse=True):
+            message = re.sub(r'(?<![\w-]){}(?![\w-])'.format(re.escape(name)), u'<host>', message)
+    for pattern, placeholder in MASKS:
+        message = pattern.sub(placeholder, message)
+    return message
+
+
+def failure_fingerprint(failure):
+    """Return what identifies a failure regardless of the host it happened on."""
+    host = failure.get('host')
+    return (
+        failure.get('play'),
+        failure.get('task'),
+        mask_message(failure.get('msg', FAILED_NO_MSG), host),
+        tuple((name, mask_message(message, host)) for name, message in failure.get('checks', ())),
+    )
 
-    Returns a new list of failures such that identical failures from different
-    hosts are grouped together in a single entry. The relative order of failures
-    is preserved.
 
-    If failures is unhashable, the original list of failures is returned.
-    """
-    groups = defaultdict(list)
-    for failure in failures:
-        group_key = tuple(sorted((key, value) for key, value in failure.items() if key != 'host'))
-        try:
-            groups[group_key].append(failure)
-        except TypeError:
-            # abort and return original list of failures when failures has an
-            # unhashable type.
-            return failures
+class FailureGroups(object):
+    """Failures grouped by fingerprint, keeping the first failure of each group and a sample of its hosts."""
+
+    def __init__(self, sample_size=HOST_SAMPLE_SIZE):
+        self.sample_size = sample_size
+        self.count = 0
+        self.groups = OrderedDict()
+
+    def add(self, failure):
+        """Add a failure dict to its group."""
+        self.count += 1
+        fingerprint = failure_fingerprint(failure)
+        group = self.groups.get(fingerprint)
+        if group is None:
+            group = self.groups[fingerprint] = {'failure': failure, 'hosts': [], 'host_count': 0}
+        group['host_count'] += 1
+        if len(group['hosts']) < self.sample_size:
+            group['hosts'].append(failure['host'])
+
+    def failures(self):
+        """Return a failure per group, in the order the groups were seen, with the sampled
+        hosts as a tuple in 'host' and the number of hosts in 'host_count'."""
+        failures = []
+        for group in self.groups.values():
+            failure = dict(group['failure'])
+            failure['host'] = tuple(sorted(group['hosts']))
+            failure['host_count'] = group['host_count']
+            failures.append(failure)
+        return failures
+
+
+def deduplicate_failures(failures, sample_size=HOST_SAMPLE_SIZE):
+    """Group together similar failures from different hosts.
 
-    result = []
+    Returns a new list of failures such that failures with the same fingerprint
+    from different hosts are grouped together in a single entry, listing up to
+    sample_size of the hosts. The relative order of failures is preserved.
+    """
+    groups = FailureGroups(sample_size)
     for failure in failures:
-        group_key = tuple(sorted((key, value) for key, value in failure.items() if key != 'host'))
-        if group_key not in groups:
-            continue
-        failure['host'] = tuple(sorted(g_failure['host'] for g_failure in groups.pop(group_key)))
-        result.append(failure)
-    return result
+        groups.add(failure)
+    return groups.failures()
 
 
 def format_failure(failure):
@@ -174,12 +241,15 @@ def format_failure(failure):
         host = failure['host']
     else:
         host = u', '.join(failure['host'])
+        more_hosts = failure.get('host_count', 0) - len(failure['host'])
+        if more_hosts > 0:
+            host += u' and {} more ({} hosts in total)'.format(more_hosts, failure['host_count'])
     play = failure['play']
     task = failure['task']
     msg = failure['msg']
     if not isinstance(msg, string_types):
         msg = str(msg)
-    checks = failure['checks']
+    checks = failure.get('checks')
     fields = (
         (u'Hosts', host),
         (u'Play', play),
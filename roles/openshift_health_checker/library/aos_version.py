@@ -16,8 +16,22 @@ of release availability already. Without duplicating all that, we would
 like the user to have a helpful error message if we detect things will
 not work out right. Note that if openshift_release is not specified in
 the inventory, the version comparison checks just pass.
+
+Loading the metadata of large repos takes a long time, so the name and EVRAs
+of the packages each repo provides are kept in an index under index_dir, one
+file per repo, keyed by the checksum of the repo's repomd.xml. Only repos whose
+metadata changed since their index was written are loaded.
 """
 
+import glob
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from collections import defaultdict, namedtuple
+
 from ansible.module_utils.basic import AnsibleModule
 # NOTE: because of the dependency on yum (Python 2-only), this module does not
 # work under Python 3. But since we run unit tests against both Python 2 and
@@ -37,6 +51,11 @@ except ImportError as err:
     DNF_IMPORT_EXCEPTION = err
 
 
+DEFAULT_INDEX_DIR = "/var/cache/openshift_checks/repo_index"
+
+IndexedPackage = namedtuple("IndexedPackage", "name epoch version release arch repoid")
+
+
 class AosVersionException(Exception):
     """Base exception class for package version problems"""
     def __init__(self, message, problem_pkgs=None):
@@ -50,6 +69,7 @@ def main():
         argument_spec=dict(
             package_list=dict(type="list", required=True),
             package_mgr=dict(type="str", required=True),
+            index_dir=dict(type="str", default=DEFAULT_INDEX_DIR),
         ),
         supports_check_mode=True
     )
@@ -81,7 +101,10 @@ def main():
 
     # get the list of packages available and complain if anything is wrong
     try:
-        pkgs = _retrieve_available_packages(package_mgr, expected_pkg_names)
+        if module.params['index_dir']:
+            pkgs = _retrieve_indexed_packages(package_mgr, expected_pkg_names, RepoIndex(module.params['index_dir']))
+        else:
+            pkgs = _retrieve_available_packages(package_mgr, expected_pkg_names)
         if versioned_pkgs:
             _check_precise_version_found(pkgs, _to_dict(versioned_pkgs))
             _check_higher_version_found(pkgs, _to_dict(versioned_pkgs))
@@ -147,6 +170,192 @@ def _retrieve_available_packages(pkg_mgr, expected_pkgs):
     return pkgs
 
 
+class RepoIndex(object):
+    """Index of name -> available EVRAs for each repo, stored as one JSON file per repo.
+
+    Each file records the checksum of the repomd.xml it was built from, and is
+    only used while the repo's metadata still has that checksum.
+    """
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+
+    def path(self, repoid):
+        """Return the path of the index file for the repo."""
+        return os.path.join(self.index_dir, repoid.replace(os.sep, "_") + ".json")
+
+    def load(self, repoid, checksum):
+        """Return dict(name: [[epoch, version, release, arch]]) for the repo, or None if not current."""
+        if not checksum:
+            return None
+        try:
+            with open(self.path(repoid)) as infile:
+                entry = json.load(infile)
+        except (IOError, OSError, ValueError):
+            return None
+        if entry.get("checksum") != checksum:
+            return None
+        return entry.get("packages")
+
+    def save(self, repoid, checksum, packages):
+        """Record the packages of the repo. Failure to do so only means the repo is loaded again next time."""
+        if not checksum:
+            return
+        try:
+            if not os.path.isdir(self.index_dir):
+                os.makedirs(self.index_dir)
+            # write to a temporary file and rename it, so a concurrent reader never sees a partial index
+            tmp_fd, tmp_path = tempfile.mkstemp(dir=self.index_dir, suffix=".tmp")
+            with os.fdopen(tmp_fd, "w") as outfile:
+                json.dump(dict(checksum=checksum, packages=packages), outfile)
+            os.rename(tmp_path, self.path(repoid))
+        except (IOError, OSError):
+            pass
+
+
+def _file_checksum(path):
+    """Return the sha256 of the file, or None if it cannot be read."""
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as infile:
+            for chunk in iter(lambda: infile.read(65536), b""):
+                digest.update(chunk)
+    except (IOError, OSError):
+        return None
+    return digest.hexdigest()
+
+
+def _index_packages(pkgs, repoid_attr):
+    """Group package objects by repo into dict(repoid: dict(name: [[epoch, version, release, arch]]))."""
+    by_repo = defaultdict(lambda: defaultdict(list))
+    for pkg in pkgs:
+        by_repo[getattr(pkg, repoid_attr)][pkg.name].append([pkg.epoch, pkg.version, pkg.release, pkg.arch])
+    return by_repo
+
+
+def _lookup_packages(indexes, expected_pkgs):
+    """Return IndexedPackages for the expected package names found in the repo indexes."""
+    return [
+        IndexedPackage(name, epoch, version, release, arch, repoid)
+        for repoid, packages in sorted(indexes.items())
+        for name in expected_pkgs
+        for epoch, version, release, arch in packages.get(name, [])
+    ]
+
+
+def _retrieve_indexed_packages(pkg_mgr, expected_pkgs, repo_index):
+    """Like _retrieve_available_packages, but serve repos whose metadata is unchanged from repo_index."""
+    if pkg_mgr == "yum":
+        pkgs = _yum_indexed_packages(expected_pkgs, repo_index)
+    else:
+        pkgs = _dnf_indexed_packages(expected_pkgs, repo_index)
+
+    if not pkgs:
+        # pkgs list is empty, raise because no expected packages found
+        raise AosVersionException('\n'.join([
+            'Unable to find any OpenShift packages.',
+            'Check your subscription and repo settings.',
+        ]))
+    return pkgs
+
+
+def _yum_indexed_packages(expected_pkgs, repo_index):
+    yb = yum.YumBase()  # pylint: disable=invalid-name
+    # see _retrieve_available_packages about excludes
+    yb.conf.disable_excludes = ['all']
+
+    indexes = {}
+    stale = []
+    for repo in yb.repos.listEnabled():
+        try:
+            repo.getRepoXML()  # downloads repomd.xml again if it has expired
+            checksum = _file_checksum(os.path.join(repo.cachedir, "repomd.xml"))
+        except yum.Errors.RepoError:
+            checksum = None
+        packages = repo_index.load(repo.id, checksum)
+        if packages is None:
+            stale.append((repo.id, checksum))
+        else:
+            indexes[repo.id] = packages
+
+    if stale:
+        # load only the repos that have changed
+        for repoid in indexes:
+            yb.repos.disableRepo(repoid)
+        try:
+            loaded = _index_packages(yb.pkgSack.returnPackages(), "repoid")
+        except yum.Errors.PackageSackError:
+            loaded = {}
+        for repoid, checksum in stale:
+            indexes[repoid] = loaded.get(repoid, {})
+            repo_index.save(repoid, checksum, indexes[repoid])
+
+    return yb.rpmdb.returnPackages(patterns=expected_pkgs) + _lookup_packages(indexes, expected_pkgs)
+
+
+def _dnf_repomd_path(dbase, repo):
+    """Return the path of the repo's cached repomd.xml, or None.
+
+    dnf caches a repo's metadata in <cachedir>/<repoid>-<16 hex digits>, so the pattern
+    must not match the directories of other repos whose ids start the same. When the
+    repo's URLs change, the directory of the old ones is left behind: the most recently
+    updated repomd.xml is the current one.
+    """
+    dirname = re.compile(re.escape(repo.id) + "-[0-9a-f]{16}$")
+    paths = [
+        path for path in glob.glob(os.path.join(dbase.conf.cachedir, repo.id + "-*", "repodata", "repomd.xml"))
+        if dirname.match(os.path.basename(os.path.dirname(os.path.dirname(path))))
+    ]
+    return max(paths, key=os.path.getmtime) if paths else None
+
+
+def _dnf_metadata_current(path, metadata_expire):
+    """Return whether the repomd.xml at path has not expired yet.
+
+    A negative metadata_expire means that the metadata never expires, as in dnf.
+    """
+    if not path:
+        return False
+    if metadata_expire < 0:
+        return True
+    return time.time() - os.path.getmtime(path) < metadata_expire
+
+
+def _dnf_indexed_packages(expected_pkgs, repo_index):
+    dbase = dnf.Base()
+
+    # see _retrieve_available_packages about excludes
+    dbase.conf.disable_excludes = ['all']
+    dbase.read_all_repos()
+
+    indexes = {}
+    stale = []
+    for repo in dbase.repos.iter_enabled():
+        path = _dnf_repomd_path(dbase, repo)
+        checksum = None
+        # dnf only refreshes metadata when loading it, so expired metadata is treated as changed
+        if _dnf_metadata_current(path, getattr(repo, "metadata_expire", 0)):
+            checksum = _file_checksum(path)
+        packages = repo_index.load(repo.id, checksum)
+        if packages is None:
+            stale.append(repo)
+        else:
+            indexes[repo.id] = packages
+
+    if stale:
+        # load only the repos that have changed
+        for repoid in indexes:
+            dbase.repos[repoid].disable()
+        dbase.fill_sack(load_system_repo=False, load_available_repos=True)
+        loaded = _index_packages(dbase.sack.query().available(), "reponame")
+        for repo in stale:
+            indexes[repo.id] = loaded.get(repo.id, {})
+            path = _dnf_repomd_path(dbase, repo)
+            repo_index.save(repo.id, _file_checksum(path) if path else None, indexes[repo.id])
+
+    return _lookup_packages(indexes, expected_pkgs)
+
+
 class PreciseVersionNotFound(AosVersionException):
     """Exception for reporting packages not available at given version"""
     def __init__(self, not_found):
@@ -0,0 +1,114 @@
+#!/usr/bin/python
+"""
+Ansible module that prepares files on a host to be copied into a health check output directory.
+
+Each file is read in chunks and gzipped into a temporary directory, keeping only
+the head and the tail of files larger than a given size, a few files at a time.
+The compressed copies can then be transferred by the connection without the
+whole file going through a module result, and removed afterwards.
+"""
+
+import gzip
+import os
+import tempfile
+from multiprocessing.pool import ThreadPool
+
+from ansible.module_utils.basic import AnsibleModule
+
+
+CHUNK_SIZE = 64 * 1024
+TRUNCATION_MARKER = b"\n[... %d bytes truncated ...]\n"
+
+
+def copy_chunks(infile, outfile, length=None):
+    """Copy up to length bytes (or everything, if None) from infile to outfile, a chunk at a time."""
+    remaining = length
+    while remaining is None or remaining > 0:
+        chunk = infile.read(CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining))
+        if not chunk:
+            break
+        outfile.write(chunk)
+        if remaining is not None:
+            remaining -= len(chunk)
+
+
+def collect_file(src, dest, max_size=0):
+    """Compress src into dest. If src is larger than max_size (when given), keep only its first
+    and last max_size/2 bytes, with a marker in between. Returns a dict describing the outcome."""
+    result = dict(src=src, dest=dest, truncated=False)
+    try:
+        with open(src, "rb") as infile:
+            size = os.fstat(infile.fileno()).st_size
+            outfile = gzip.open(dest, "wb")
+            try:
+                if max_size and size > max_size:
+                    head = max_size // 2
+                    copy_chunks(infile, outfile, head)
+                    outfile.write(TRUNCATION_MARKER % (size - max_size))
+                    infile.seek(size - (max_size - head))
+                    copy_chunks(infile, outfile, max_size - head)
+                    result["truncated"] = True
+                else:
+                    # files may grow (or report no size, as in /proc) so read until the end, within the cap
+                    copy_chunks(infile, outfile, max_size or None)
+            finally:
+                outfile.close()
+        result["size"] = size
+        result["compressed_size"] = os.path.getsize(dest)
+    except (IOError, OSError) as exc:
+        result["error"] = str(exc)
+    return result
+
+
+def give_to_connecting_user(path):
+    """When running through sudo, let the user who connected read path, so the connection can transfer it."""
+    uid, gid = os.environ.get("SUDO_UID"), os.environ.get("SUDO_GID")
+    if os.geteuid() == 0 and uid and gid:
+        os.chown(path, int(uid), int(gid))
+
+
+def collect_files(files, dest_dir, max_size, concurrency):
+    """Compress all files into dest_dir, up to concurrency at a time. Returns results in file order."""
+    if not files:
+        return []
+
+    def collect(indexed_file):
+        """Compress one (index, file) pair, as run in the pool."""
+        index, file_to_collect = indexed_file
+        result = collect_file(file_to_collect["src"], os.path.join(dest_dir, "%d.gz" % index), max_size)
+        result["name"] = file_to_collect["name"]
+        if "error" not in result:
+            give_to_connecting_user(result["dest"])
+        return result
+
+    pool = ThreadPool(max(1, min(concurrency, len(files))))
+    try:
+        return pool.map(collect, list(enumerate(files)))
+    finally:
+        pool.close()
+
+
+def main():
+    """Entrypoint for this Ansible module"""
+    module = AnsibleModule(
+        argument_spec=dict(
+            files=dict(type="list", required=True),
+            max_size=dict(type="int", default=0),
+            concurrency=dict(type="int", default=4),
+        ),
+    )
+
+    dest_dir = tempfile.mkdtemp(prefix="openshift_checks-")
+    give_to_connecting_user(dest_dir)
+    results = collect_files(
+        module.params["files"],
+        dest_dir,
+        module.params["max_size"],
+        module.params["concurrency"],
+    )
+
+    module.exit_json(changed=False, dest=dest_dir, files=results)
+
+
+if __name__ == '__main__':
+    main()
@@ -15,6 +15,13 @@ except ImportError as err:
     EtcdMock = namedtuple("etcd", ["EtcdKeyNotFound"])
     etcd = EtcdMock(KeyError)
 
+try:
+    import etcd3
+
+    IMPORT_EXCEPTION_MSG_V3 = None
+except ImportError as err:
+    IMPORT_EXCEPTION_MSG_V3 = str(err)
+
 
 # pylint: disable=too-many-arguments
 def check_etcd_key_size(client, key, size_limit, total_size=0, depth=0, depth_limit=1000, visited=None):
@@ -57,7 +64,96 @@ def check_etcd_key_size(client, key, size_limit, total_size=0, depth=0, depth_li
     return size, max_limit_exceeded
 
 
-def main():  # pylint: disable=missing-docstring,too-many-branches
+def check_etcd_key_size_recursive(client, key, size_limit):
+    """Check size of an etcd v2 path with a single recursive read. Returns tuple (int, bool)
+
+    The v2 API cannot page a read, so the whole subtree comes in one response and is
+    held in memory; only the summing stops early once size_limit is exceeded. Use the
+    walk mode (check_etcd_key_size) to read one directory at a time instead.
+    """
+    try:
+        result = client.read(key, recursive=True)
+    except etcd.EtcdKeyNotFound:
+        return 0, False
+
+    size = 0
+    for node in result.leaves:
+        if node.dir or node.value is None:
+            continue
+        size += len(node.value)
+        if size_limit and size > size_limit:
+            return size, True
+
+    return size, False
+
+
+def prefix_range_end(prefix):
+    """Return the end of the etcd v3 key range holding every key that starts with prefix."""
+    prefix = bytearray(prefix)
+    for i in reversed(range(len(prefix))):
+        if prefix[i] < 0xff:
+            prefix[i] += 1
+            return bytes(prefix[:i + 1])
+    return b"\0"  # no upper bound
+
+
+def check_etcd3_key_size(client, prefix, size_limit, page_size=1000):
+    """Check size of the keys under an etcd v3 prefix with paged range reads. Returns tuple (int, bool)
+
+    The prefix is treated like a v2 directory path. Keys are read page_size at a time,
+    in key order and all at the revision of the first page, so a page is one round trip
+    no matter how the keys are nested. Reading stops as soon as size_limit is exceeded.
+    """
+    if not isinstance(prefix, bytes):
+        prefix = prefix.encode("utf-8")
+    # only count keys below prefix as a directory, e.g. not /images* siblings of /images
+    start = prefix.rstrip(b"/") + b"/"
+    range_end = prefix_range_end(start)
+    revision = None
+    size = 0
+
+    while True:
+        kwargs = dict(limit=page_size, sort_order="ascend")
+        if revision is not None:
+            kwargs["revision"] = revision
+
+        count = 0
+        last_key = None
+        for value, metadata in client.get_range(start, range_end, **kwargs):
+            count += 1
+            last_key = metadata.key
+            if revision is None:
+                revision = metadata.response_header.revision
+            size += len(value or b"")
+            if size_limit and size > size_limit:
+                return size, True
+
+        if count < page_size:
+            return size, False
+        start = last_key + b"\0"  # the smallest key after last_key
+
+
+def etcd3_client(params):
+    """Return an etcd v3 client built from the module params, cert being a dict with cert and key."""
+    https = params["protocol"] == "https"
+    # pylint: disable=no-member
+    return etcd3.client(
+        host=params["host"],
+        port=params["port"],
+        ca_cert=params["ca_cert"] if https else None,
+        cert_cert=params["cert"]["cert"] if https else None,
+        cert_key=params["cert"]["key"] if https else None,
+    )
+
+
+def etcd_client(params):
+    """Return an etcd v2 client built from the module params, cert being a dict with cert and key."""
+    params = dict(params, cert=(params["cert"]["cert"], params["cert"]["key"]))
+    # pylint: disable=no-member
+    return etcd.Client(**params)
+
+
+def main():  # pylint: disable=missing-docstring,too-many-branches,too-many-locals
     module = AnsibleModule(
         argument_spec=dict(
             size_limit_bytes=dict(type="int", default=0),
@@ -69,26 +165,34 @@ def main():  # pylint: disable=missing-docstring,too-many-branches
             allow_redirect=dict(type="bool", default=False),
             cert=dict(type="dict", default=""),
             ca_cert=dict(type="str", default=None),
+            api_version=dict(type="str", default="v2", choices=["v2", "v3"]),
+            # v2 only: walk the tree one directory at a time instead of one recursive read per path
+            walk=dict(type="bool", default=False),
+            # v3 only: number of keys fetched per range request
+            page_size=dict(type="int", default=1000),
         ),
         supports_check_mode=True
     )
 
-    module.params["cert"] = (
-        module.params["cert"]["cert"],
-        module.params["cert"]["key"],
-    )
-
     size_limit = module.params.pop("size_limit_bytes")
     paths = module.params.pop("paths")
+    api_version = module.params.pop("api_version")
+    walk = module.params.pop("walk")
+    page_size = module.params.pop("page_size")
 
     limit_exceeded = False
 
     try:
-        # pylint: disable=no-member
-        client = etcd.Client(**module.params)
-    except AttributeError as attrerr:
+        if api_version == "v3":
+            client = etcd3_client(module.params)
+        else:
+            client = etcd_client(module.params)
+    except (AttributeError, NameError) as attrerr:
         msg = str(attrerr)
-        if IMPORT_EXCEPTION_MSG:
+        if api_version == "v3" and IMPORT_EXCEPTION_MSG_V3:
+            msg = ('Unable to import the python "etcd3" dependency. '
+                   'Make sure python-etcd3 is installed on the host.')
+        elif IMPORT_EXCEPTION_MSG:
             msg = IMPORT_EXCEPTION_MSG
             if "No module named etcd" in IMPORT_EXCEPTION_MSG:
                 # pylint: disable=redefined-variable-type
@@ -106,7 +210,13 @@ def main():  # pylint: disable=missing-docstring,too-many-branches
 
     size = 0
     for path in paths:
-        path_size, limit_exceeded = check_etcd_key_size(client, path, size_limit - size)
+        remaining = size_limit - size if size_limit else 0
+        if api_version == "v3":
+            path_size, limit_exceeded = check_etcd3_key_size(client, path, remaining, page_size)
+        elif walk:
+            path_size, limit_exceeded = check_etcd_key_size(client, path, remaining)
+        else:
+            path_size, limit_exceeded = check_etcd_key_size_recursive(client, path, remaining)
         size += path_size
 
         if limit_exceeded:
@@ -0,0 +1,105 @@
+#!/usr/bin/python
+"""
+Ansible module that checks from a master that the kubelets of many nodes are reachable.
+
+For each node, the preferred address is resolved (each distinct name only once)
+and a TCP connection, followed by a TLS handshake, is made to the kubelet port,
+up to a given number of nodes at a time. The time taken to connect is recorded
+so that slow kubelets can be spotted.
+"""
+
+import socket
+import ssl
+import time
+from multiprocessing.pool import ThreadPool
+
+from ansible.module_utils.basic import AnsibleModule
+
+
+def resolve_address(address, cache):
+    """Return the first IPv4 address for a stream connection to address, like `getent ahostsv4`."""
+    if address not in cache:
+        try:
+            infos = socket.getaddrinfo(address, None, socket.AF_INET, socket.SOCK_STREAM)
+            cache[address] = infos[0][4][0] if infos else None
+        except socket.error:
+            cache[address] = None
+    return cache[address]
+
+
+def tls_handshake(sock):
+    """Perform a TLS handshake without verifying the kubelet's certificate."""
+    try:
+        context = ssl.SSLContext(ssl.PROTOCOL_SSLv23)
+        context.verify_mode = ssl.CERT_NONE
+        tls_sock = context.wrap_socket(sock)
+    except AttributeError:  # python without SSLContext
+        tls_sock = ssl.wrap_socket(sock, cert_reqs=ssl.CERT_NONE)
+    tls_sock.close()
+
+
+# pylint: disable=too-many-arguments
+def probe_kubelet(node, port, timeout, use_tls, cache, connect=socket.create_connection):
+    """Resolve the node's address and connect to its kubelet. Returns a dict describing the outcome."""
+    result = dict(name=node["name"], address=node["address"])
+
+    resolved = resolve_address(node["address"], cache)
+    result["resolved"] = resolved
+    if resolved is None:
+        result["error"] = "Cannot resolve node %s" % node["address"]
+        return result
+
+    start = time.time()
+    try:
+        sock = connect((resolved, port), timeout)
+        try:
+            if use_tls:
+                tls_handshake(sock)
+        finally:
+            sock.close()
+    except (socket.error, ssl.SSLError) as exc:
+        result["error"] = str(exc) or exc.__class__.__name__
+    result["latency_ms"] = int((time.time() - start) * 1000)
+
+    return result
+
+
+def sweep_kubelets(nodes, port, timeout, use_tls, concurrency):
+    """Probe the kubelets of all nodes, up to concurrency at a time. Returns results in node order."""
+    if not nodes:
+        return []
+
+    cache = {}
+    pool = ThreadPool(max(1, min(concurrency, len(nodes))))
+    try:
+        return pool.map(lambda node: probe_kubelet(node, port, timeout, use_tls, cache), nodes)
+    finally:
+        pool.close()
+
+
+def main():
+    """Entrypoint for this Ansible module"""
+    module = AnsibleModule(
+        argument_spec=dict(
+            nodes=dict(type="list", required=True),
+            port=dict(type="int", default=10250),
+            timeout=dict(type="float", default=3),
+            tls=dict(type="bool", default=True),
+            concurrency=dict(type="int", default=50),
+        ),
+        supports_check_mode=True
+    )
+
+    results = sweep_kubelets(
+        module.params["nodes"],
+        module.params["port"],
+        module.params["timeout"],
+        module.params["tls"],
+        module.params["concurrency"],
+    )
+
+    module.exit_json(changed=False, results=results)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,6 +5,7 @@ import os
 import shlex
 import shutil
 import subprocess
+from multiprocessing.pool import ThreadPool
 
 from ansible.module_utils.basic import AnsibleModule
 
@@ -35,32 +36,62 @@ def locate_oc_binary():
     return oc_binary
 
 
+def run_oc(cmd):
+    """Run an oc command given as a list. Returns tuple (bool failed, str output)."""
+    try:
+        return False, subprocess.check_output(list(cmd), stderr=subprocess.STDOUT)
+    except subprocess.CalledProcessError as exc:
+        return True, '[rc {}] {}\n{}'.format(exc.returncode, ' '.join(exc.cmd), exc.output)
+    except OSError as exc:
+        # we get this when 'oc' is not there
+        return True, str(exc)
+
+
 def main():
-    """Module that executes commands on a remote OpenShift cluster"""
+    """Module that executes commands on a remote OpenShift cluster
+
+    Either a single "cmd" is run, or each of a list of "cmds" is run with up to
+    "concurrency" of them at a time and their outcomes are returned in "results".
+    """
 
     module = AnsibleModule(
         argument_spec=dict(
             namespace=dict(type="str", required=False),
             config_file=dict(type="str", required=True),
-            cmd=dict(type="str", required=True),
+            cmd=dict(type="str", required=False),
+            cmds=dict(type="list", required=False),
+            concurrency=dict(type="int", default=4),
             extra_args=dict(type="list", default=[]),
         ),
+        required_one_of=[["cmd", "cmds"]],
+        mutually_exclusive=[["cmd", "cmds"]],
     )
 
-    cmd = [locate_oc_binary(), '--config', module.params["config_file"]]
+    base_cmd = [locate_oc_binary(), '--config', module.params["config_file"]]
     if module.params["namespace"]:
-        cmd += ['-n', module.params["namespace"]]
-    cmd += shlex.split(module.params["cmd"]) + module.params["extra_args"]
-
-    failed = True
-    try:
-        cmd_result = subprocess.check_output(list(cmd), stderr=subprocess.STDOUT)
-        failed = False
-    except subprocess.CalledProcessError as exc:
-        cmd_result = '[rc {}] {}\n{}'.format(exc.returncode, ' '.join(exc.cmd), exc.output)
-    except OSError as exc:
-        # we get this when 'oc' is not there
-        cmd_result = str(exc)
+        base_cmd += ['-n', module.params["namespace"]]
+
+    def oc_cmd(cmd_str):
+        """Return the full oc invocation for cmd_str."""
+        return base_cmd + shlex.split(cmd_str) + module.params["extra_args"]
+
+    if module.params["cmds"] is not None:
+        pool = ThreadPool(max(1, min(module.params["concurrency"], len(module.params["cmds"]) or 1)))
+        try:
+            outcomes = pool.map(run_oc, [oc_cmd(cmd_str) for cmd_str in module.params["cmds"]])
+        finally:
+            pool.close()
+        module.exit_json(
+            changed=False,
+            failed=False,
+            results=[
+                dict(cmd=cmd_str, failed=failed, result=result)
+                for cmd_str, (failed, result) in zip(module.params["cmds"], outcomes)
+            ],
+        )
+        return
+
+    failed, cmd_result = run_oc(oc_cmd(module.params["cmd"]))
 
     module.exit_json(
         changed=False,
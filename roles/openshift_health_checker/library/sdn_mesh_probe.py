@@ -0,0 +1,107 @@
+#!/usr/bin/python
+"""
+Ansible module that probes SDN connectivity from a node to its peer nodes.
+
+Rather than the controller running a command module for each flow trace and
+ping to each peer, this runs all of them locally on the node, up to a given
+number at a time, and returns a compact result per peer.
+"""
+
+import subprocess
+from multiprocessing.pool import ThreadPool
+
+from ansible.module_utils.basic import AnsibleModule
+
+
+def run_command(command):
+    """Run a command given as a list. Returns tuple (returncode, output)."""
+    try:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    except OSError as exc:
+        return 127, str(exc)
+    raw_output = process.communicate()[0]
+    output = raw_output if isinstance(raw_output, str) else raw_output.decode("utf-8", "replace")
+    return process.returncode, output
+
+
+def trace_summary(output):
+    """Return the line of ofproto/trace output describing what happens to the packet."""
+    for line in reversed(output.splitlines()):
+        if line.startswith("Datapath actions:"):
+            return line
+    return ""
+
+
+# pylint: disable=too-many-arguments
+def probe_peer(peer, source_address, exec_prefix, ping_timeout, trace, full_output, run=None):
+    """Trace the flow from source_address to the peer's address through OVS and ping it.
+
+    Returns a dict describing the outcome for the peer.
+    """
+    run = run or run_command
+    result = dict(name=peer["name"], address=peer["address"])
+
+    if trace:
+        returncode, output = run(list(exec_prefix) + [
+            "/bin/ovs-appctl", "ofproto/trace", "br0",
+            "in_port=2,reg0=0,ip,nw_src=%s,nw_dst=%s" % (source_address, peer["address"]),
+        ])
+        result["trace_rc"] = returncode
+        result["trace_summary"] = trace_summary(output)
+        if full_output or returncode != 0:
+            result["trace"] = output
+
+    returncode, output = run(["/bin/ping", "-c", "1", "-W", str(ping_timeout), peer["address"]])
+    result["ping"] = returncode == 0
+    if full_output or returncode != 0:
+        result["ping_output"] = output
+
+    return result
+
+
+# pylint: disable=too-many-arguments
+def probe_peers(peers, source_address, exec_prefix, concurrency, ping_timeout, trace, full_output):
+    """Probe all peers, up to concurrency at a time. Returns a list of results in peer order."""
+    if not peers:
+        return []
+
+    pool = ThreadPool(max(1, min(concurrency, len(peers))))
+    try:
+        return pool.map(
+            lambda peer: probe_peer(peer, source_address, exec_prefix, ping_timeout, trace, full_output),
+            peers,
+        )
+    finally:
+        pool.close()
+
+
+def main():
+    """Entrypoint for this Ansible module"""
+    module = AnsibleModule(
+        argument_spec=dict(
+            source_address=dict(type="str", required=True),
+            peers=dict(type="list", required=True),
+            exec_prefix=dict(type="list", default=[]),
+            concurrency=dict(type="int", default=20),
+            ping_timeout=dict(type="int", default=2),
+            trace=dict(type="bool", default=True),
+            full_output=dict(type="bool", default=False),
+        ),
+        supports_check_mode=True
+    )
+
+    results = probe_peers(
+        module.params["peers"],
+        module.params["source_address"],
+        module.params["exec_prefix"],
+        module.params["concurrency"],
+        module.params["ping_timeout"],
+        module.params["trace"],
+        module.params["full_output"],
+    )
+
+    module.exit_json(changed=False, results=results)
+
+
+if __name__ == '__main__':
+    main()
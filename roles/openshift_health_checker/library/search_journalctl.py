@@ -1,7 +1,8 @@
 #!/usr/bin/python
 """Interface to journalctl."""
 
-from time import time
+from collections import OrderedDict
+from time import localtime, strftime, time
 import json
 import re
 import subprocess
@@ -65,60 +66,102 @@ def get_log_matches(matchers, log_count_limit, timestamp_limit_seconds):
     """Return a list of up to log_count_limit matches for each matcher.
 
     Log entries are only considered if newer than timestamp_limit_seconds.
+    Matchers are grouped by unit so that the journal of each unit is read only
+    once, evaluating all of its matchers in a single pass.
     """
-    matched_regexp = []
+    matched = [False] * len(matchers)
     errors = []
 
-    for matcher in matchers:
+    units = OrderedDict()
+    for index, matcher in enumerate(matchers):
         try:
-            log_output = get_log_output(matcher)
-        except LogInputSubprocessError as err:
+            compiled = compile_matcher(matcher)
+        except InvalidMatcherRegexp as err:
             errors.append(str(err))
             continue
+        units.setdefault(matcher.get("unit", ""), []).append((index, compiled))
 
+    for unit, unit_matchers in units.items():
         try:
-            matched = find_matches(log_output, matcher, log_count_limit, timestamp_limit_seconds)
-            if matched:
-                matched_regexp.append(matcher.get("regexp", ""))
-        except InvalidMatcherRegexp as err:
-            errors.append(str(err))
-        except InvalidLogEntry as err:
+            log_output = get_log_output(unit, timestamp_limit_seconds)
+        except LogInputSubprocessError as err:
             errors.append(str(err))
+            continue
 
+        try:
+            lines, error = scan_log(
+                log_output, [compiled for _, compiled in unit_matchers],
+                log_count_limit, timestamp_limit_seconds,
+            )
+        finally:
+            # stop journalctl if the scan ended before reading all of its output
+            close = getattr(log_output, "close", None)
+            if close is not None:
+                close()
+
+        for (index, _), line in zip(unit_matchers, lines):
+            matched[index] = line is not None
+        if error:
+            errors.append(error)
+
+    matched_regexp = [matcher.get("regexp", "") for matcher, found in zip(matchers, matched) if found]
     return matched_regexp, errors
 
 
-def get_log_output(matcher):
-    """Return an iterator on the logs of a given matcher."""
+def get_log_output(unit, since_seconds):
+    """Return an iterator on the logs of a given unit, newest first, since a given time."""
+    since = strftime("%Y-%m-%d %H:%M:%S", localtime(since_seconds))
     try:
         cmd_output = subprocess.Popen(list([
             '/bin/journalctl',
-            '-ru', matcher.get("unit", ""),
+            '-ru', unit,
+            '--since', since,
             '--output', 'json',
         ]), stdout=subprocess.PIPE)
 
-        return iter(cmd_output.stdout.readline, '')
-
     except subprocess.CalledProcessError as exc:
         msg = "Could not obtain journalctl logs for the specified systemd unit: {}: {}"
-        raise LogInputSubprocessError(msg.format(matcher.get("unit", "<missing>"), str(exc)))
+        raise LogInputSubprocessError(msg.format(unit or "<missing>", str(exc)))
     except OSError as exc:
         raise LogInputSubprocessError(str(exc))
 
+    return read_lines(cmd_output)
 
-def find_matches(log_output, matcher, log_count_limit, timestamp_limit_seconds):
-    """Return log messages matched in iterable log_output by a given matcher.
 
-    Ignore any log_output items older than timestamp_limit_seconds.
-    """
+def read_lines(process):
+    """Yield the lines of output of process, terminating it if no longer wanted."""
     try:
-        regexp = re.compile(matcher.get("regexp", ""))
-        start_regexp = re.compile(matcher.get("start_regexp", ""))
+        for line in iter(process.stdout.readline, b''):
+            yield line
+    finally:
+        if process.poll() is None:
+            process.terminate()
+        process.wait()
+
+
+def compile_matcher(matcher):
+    """Return a matcher with its regular expressions compiled."""
+    try:
+        return dict(
+            matcher,
+            regexp=re.compile(matcher.get("regexp", "")),
+            start_regexp=re.compile(matcher.get("start_regexp", "")),
+        )
     except re.error as err:
         msg = "A log matcher object was provided with an invalid regular expression: {}"
         raise InvalidMatcherRegexp(msg.format(str(err)))
 
-    matched = None
+
+def scan_log(log_output, matchers, log_count_limit, timestamp_limit_seconds):
+    """Return the log line matched by each of the compiled matchers in one pass over log_output.
+
+    Matchers that did not match get None. Stop reading when every matcher is resolved, i.e.
+    it has matched or reached the most recent service restart by its start_regexp, or when
+    log_count_limit entries are read or an entry is older than timestamp_limit_seconds.
+    Returns a tuple (list of lines, error message or None for invalid log entries).
+    """
+    matched = [None] * len(matchers)
+    pending = list(range(len(matchers)))
 
     for log_count, line in enumerate(log_output):
         if log_count >= log_count_limit:
@@ -126,24 +169,39 @@ def find_matches(log_output, matcher, log_count_limit, timestamp_limit_seconds):
 
         try:
             obj = json.loads(line)
+            message = obj["MESSAGE"]
+            log_timestamp_seconds = float(obj["__REALTIME_TIMESTAMP"]) / 1000000
+        except ValueError:
+            msg = "Log entry for systemd unit {} contained invalid json syntax: {}"
+            return matched, msg.format(matchers[pending[0]].get("unit"), line)
+
+        if log_timestamp_seconds < timestamp_limit_seconds:
+            break
 
+        for index in list(pending):
+            matcher = matchers[index]
             # don't need to look past the most recent service restart
-            if start_regexp.match(obj["MESSAGE"]):
-                break
+            if matcher["start_regexp"].match(message):
+                pending.remove(index)
+            elif matcher["regexp"].match(message):
+                matched[index] = line
+                pending.remove(index)
 
-            log_timestamp_seconds = float(obj["__REALTIME_TIMESTAMP"]) / 1000000
-            if log_timestamp_seconds < timestamp_limit_seconds:
-                break
+        if not pending:
+            break
 
-            if regexp.match(obj["MESSAGE"]):
-                matched = line
-                break
+    return matched, None
 
-        except ValueError:
-            msg = "Log entry for systemd unit {} contained invalid json syntax: {}"
-            raise InvalidLogEntry(msg.format(matcher.get("unit"), line))
 
-    return matched
+def find_matches(log_output, matcher, log_count_limit, timestamp_limit_seconds):
+    """Return log messages matched in iterable log_output by a given matcher.
+
+    Ignore any log_output items older than timestamp_limit_seconds.
+    """
+    matched, error = scan_log(log_output, [compile_matcher(matcher)], log_count_limit, timestamp_limit_seconds)
+    if error:
+        raise InvalidLogEntry(error)
+    return matched[0]
 
 
 if __name__ == '__main__':
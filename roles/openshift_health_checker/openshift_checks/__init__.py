@@ -2,6 +2,7 @@
 Health checks for OpenShift clusters.
 """
 
+import hashlib
 import json
 import operator
 import os
@@ -17,6 +18,8 @@ from ansible.module_utils.six.moves import reduce  # pylint: disable=import-erro
 from ansible.module_utils.six import string_types
 from ansible.plugins.filter.core import to_bool as ansible_to_bool
 
+from openshift_checks.resource_snapshot import ResourceSnapshot
+
 
 class OpenShiftCheckException(Exception):
     """Raised when a check encounters a failure condition."""
@@ -65,10 +68,14 @@ class OpenShiftCheck(object):
     Optional init param: want_full_results
     If the check can gather logs, tarballs, etc., do so when True; but no need to spend
     the time if they're not wanted (won't be written to output directory).
+
+    Optional init param: snapshot
+    A ResourceSnapshot shared with the other checks on the same host, so that cluster
+    resources are only fetched once per run. Each check gets its own if none is given.
     """
     # pylint: disable=too-many-arguments
     def __init__(self, execute_module=None, task_vars=None, tmp=None, want_full_results=False,
-                 templar=None):
+                 templar=None, snapshot=None):
         # store a method for executing ansible modules from the check
         self._execute_module = execute_module
         # the task variables and tmpdir passed into the health checker task
@@ -79,6 +86,8 @@ class OpenShiftCheck(object):
         # a boolean for disabling the gathering of results (files, computations) that won't
         # actually be recorded/used
         self.want_full_results = want_full_results
+        # cluster resources already fetched during this run
+        self.snapshot = snapshot if snapshot is not None else ResourceSnapshot()
 
         # mainly for testing purposes; see execute_module_with_retries
         self._module_retries = 3
@@ -95,6 +104,8 @@ class OpenShiftCheck(object):
         # log messages for the check - tuples of (description, msg) where msg is serializable.
         # These are intended to be a sequential record of what the check observed and determined.
         self.logs = []
+        # one dict(module, seconds, output_bytes) per module execution, to account for where time goes
+        self.module_calls = []
 
     def template_var(self, var_to_template):
         """Return a templated variable if self._templar is not None, else
@@ -117,6 +128,11 @@ class OpenShiftCheck(object):
         """
         return []
 
+    # Names of task_vars that, together with fingerprint_probe, fully determine the outcome
+    # of this check. Checks that declare them may have a passing result reused across runs
+    # (see fingerprint and the openshift_checks_cache_ttl variable). Empty means never cached.
+    fingerprint_vars = ()
+
     @staticmethod
     def is_active():
         """Returns true if this check applies to the ansible-playbook run."""
@@ -138,6 +154,32 @@ class OpenShiftCheck(object):
         """
         return {}
 
+    def fingerprint_probe(self):
+        """Return serializable data gathered from the host that the check outcome depends on.
+
+        This should be much cheaper than running the check itself, e.g. a checksum of repo
+        metadata rather than resolving packages. The default is to probe nothing.
+        """
+        return None
+
+    def fingerprint(self):
+        """Return a digest of the inputs that determine the check outcome, or None.
+
+        None means the check does not declare its inputs and its result cannot be cached.
+        """
+        if not self.fingerprint_vars:
+            return None
+        inputs = dict(
+            check=self.name,
+            vars=dict(
+                (var, self.template_var(self.get_var(var, default=None)))
+                for var in self.fingerprint_vars
+            ),
+            probe=self.fingerprint_probe(),
+        )
+        serialized = json.dumps(inputs, sort_keys=True, default=str)
+        return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
     @classmethod
     def subclasses(cls):
         """Returns a generator of subclasses of this class and its subclasses."""
@@ -176,8 +218,8 @@ class OpenShiftCheck(object):
         Either file contents should be passed in, or a file to be copied from the remote host
         should be specified. Contents that are not a string are to be serialized as JSON.
 
-        NOTE: When copying a file from remote host, it is slurped into memory as base64, meaning
-        you should avoid using this on huge files (more than say 10M).
+        Remote files are saved gzipped, keeping only the start and end of files larger than
+        openshift_checks_output_max_file_size bytes.
         """
         if contents is None and not remote_filename:
             raise OpenShiftCheckException("File data/source not specified; this is a bug in the check.")
@@ -208,7 +250,13 @@ class OpenShiftCheck(object):
                 self.__class__.__name__ +
                 " invoked execute_module without providing the method at initialization."
             )
+        start = time.time()
         result = self._execute_module(module_name, module_args, self.tmp, self.task_vars)
+        self.module_calls.append(dict(
+            module=module_name,
+            seconds=round(time.time() - start, 3),
+            output_bytes=output_size(result),
+        ))
         if result.get("changed"):
             self.changed = True
         for output in ["result", "stdout"]:
@@ -371,10 +419,31 @@ class OpenShiftCheck(object):
             )
 
 
+def output_size(result):
+    """Return the approximate size of a module result: the total length of its strings.
+
+    Strings nested in lists and dicts are counted too, as batched modules return their
+    output in those. Walking the result this way does not serialize every result once
+    more just to account for it.
+    """
+    size = 0
+    pending = [result]
+    while pending:
+        value = pending.pop()
+        if isinstance(value, six.string_types):
+            size += len(value)
+        elif isinstance(value, dict):
+            pending.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            pending.extend(value)
+    return size
+
+
 LOADER_EXCLUDES = (
     "__init__.py",
     "mixins.py",
     "logging.py",
+    "resource_snapshot.py",
 )
 
 
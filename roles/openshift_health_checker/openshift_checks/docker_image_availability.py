@@ -1,6 +1,10 @@
 """Check that required Docker images are available."""
 
+import hashlib
+import os
 import re
+import tempfile
+import time
 from pipes import quote
 from ansible.module_utils import six
 from openshift_checks import OpenShiftCheck
@@ -42,6 +46,29 @@ class DockerImageAvailability(DockerHostMixin, OpenShiftCheck):
     # command for checking if remote registries have an image, without docker pull
     skopeo_command = "{proxyvars} timeout 10 skopeo inspect --tls-verify={tls} {creds} docker://{registry}/{image}"
     skopeo_example_command = "skopeo inspect [--tls-verify=false] [--creds=<user>:<pass>] docker://<registry>/<image>"
+    # default number of skopeo probes to run at once on the host
+    default_skopeo_concurrency = 4
+    # the required images and where to look for them are determined entirely by these
+    fingerprint_vars = (
+        "openshift_deployment_type",
+        "group_names",
+        "openshift_image_tag",
+        "openshift_is_atomic",
+        "oreg_url",
+        "oreg_auth_user",
+        "oreg_auth_password",
+        "osn_image",
+        "osm_use_cockpit",
+        "openshift_cockpit_deployer_prefix",
+        "openshift_cockpit_deployer_basename",
+        "openshift_cockpit_deployer_version",
+        "openshift_docker_additional_registries",
+        "openshift_docker_insecure_registries",
+        "openshift_docker_blocked_registries",
+        "openshift_http_proxy",
+        "openshift_https_proxy",
+        "openshift_no_proxy",
+    )
 
     def __init__(self, *args, **kwargs):
         super(DockerImageAvailability, self).__init__(*args, **kwargs)
@@ -90,6 +117,14 @@ class DockerImageAvailability(DockerHostMixin, OpenShiftCheck):
                 proxies.append(var.upper() + "=" + quote(self.template_var(value)))
         self.skopeo_proxy_vars = " ".join(proxies)
 
+        self.skopeo_concurrency = max(1, self.get_var(
+            "openshift_check_skopeo_concurrency",
+            default=self.default_skopeo_concurrency,
+            convert=int,
+        ))
+        # images already found in a registry by checks on other hosts in this run
+        self.found_images = SharedProbeCache()
+
     def is_active(self):
         """Skip hosts with unsupported deployment types."""
         deployment_type = self.get_var("openshift_deployment_type")
@@ -229,14 +264,40 @@ class DockerImageAvailability(DockerHostMixin, OpenShiftCheck):
         return self.normalize(registry)
 
     def available_images(self, images):
-        """Search remotely for images. Returns: list of images found."""
-        return [
-            image for image in images
-            if self.is_available_skopeo_image(image)
-        ]
+        """Search remotely for images. Returns: list of images found.
 
-    def is_available_skopeo_image(self, image):
-        """Use Skopeo to determine if required image exists in known registry(s)."""
+        Every (image, registry) pair still in question is probed with skopeo in a single
+        remote command that runs up to skopeo_concurrency probes at a time. Each registry
+        is tested for reachability only once, and images that checks on other hosts have
+        already found in a registry are not probed again.
+        """
+        found = set()
+        probes = []  # (image, registry, unqualified image name)
+        for image in images:
+            registries, name = self.image_registries(image)
+            for registry in registries:
+                if not self.is_registry_reachable(registry):
+                    continue
+                if self.found_images.get(self.probe_key(registry, name)):
+                    found.add(image)
+                    break
+                probes.append((image, registry, name))
+
+        probes = [probe for probe in probes if probe[0] not in found]
+        if not probes:
+            return list(found)
+
+        for (image, registry, name), rc in zip(probes, self.run_skopeo_probes(probes)):
+            if rc == 0:
+                found.add(image)
+                self.found_images.set(self.probe_key(registry, name))
+            elif rc == 124:  # RC 124 == timed out; mark unreachable
+                self.reachable_registries[registry] = False
+
+        return list(found)
+
+    def image_registries(self, image):
+        """Return the registries to search for image, and the image name without registry."""
         registries = self.registries["configured"]
         # If image already includes a registry, only use that.
         # NOTE: This logic would incorrectly identify images that do not use a namespace, e.g.
@@ -246,37 +307,65 @@ class DockerImageAvailability(DockerHostMixin, OpenShiftCheck):
         if image.count("/") > 1:
             registry, image = image.split("/", 1)
             registries = [registry]
+        # blocked will never be consulted
+        return [reg for reg in registries if reg not in self.registries["blocked"]], image
+
+    def is_registry_reachable(self, registry):
+        """Test connectivity to registry once, remembering the result. Returns bool."""
+        if registry not in self.reachable_registries:
+            self.reachable_registries[registry] = self.connect_to_registry(registry)
+        return self.reachable_registries[registry]
+
+    def probe_key(self, registry, image):
+        """Return the key identifying the result of looking for image in registry."""
+        creds = self.skopeo_command_creds if registry == self.registries["oreg"] else ""
+        return u"{}/{} {}".format(registry, image, creds)
+
+    def skopeo_probe_command(self, registry, image):
+        """Return the shell command that looks for image in registry."""
+        if six.PY2:
+            registry = registry.encode('utf8')
+            image = image.encode('utf8')
+
+        return self.skopeo_command.format(
+            proxyvars=self.skopeo_proxy_vars,
+            tls="false" if registry in self.registries["insecure"] else "true",
+            creds=self.skopeo_command_creds if registry == self.registries["oreg"] else "",
+            registry=quote(registry),
+            image=quote(image),
+        )
 
-        for registry in registries:
-            if registry in self.registries["blocked"]:
-                continue  # blocked will never be consulted
-            if registry not in self.reachable_registries:
-                self.reachable_registries[registry] = self.connect_to_registry(registry)
-            if not self.reachable_registries[registry]:
-                continue  # do not keep trying unreachable registries
-
-            if six.PY2:
-                registry = registry.encode('utf8')
-                image = image.encode('utf8')
-
-            args = dict(
-                proxyvars=self.skopeo_proxy_vars,
-                tls="false" if registry in self.registries["insecure"] else "true",
-                creds=self.skopeo_command_creds if registry == self.registries["oreg"] else "",
-                registry=quote(registry),
-                image=quote(image),
-            )
+    def run_skopeo_probes(self, probes):
+        """Run skopeo for each (image, registry, name) in one command. Returns: list of RCs.
 
-            result = self.execute_module_with_retries("command", {
-                "_uses_shell": True,
-                "_raw_params": self.skopeo_command.format(**args),
-            })
-            if result.get("rc", 0) == 0 and not result.get("failed"):
-                return True
-            if result.get("rc") == 124:  # RC 124 == timed out; mark unreachable
-                self.reachable_registries[registry] = False
+        Probes run in the background in batches of skopeo_concurrency; each reports its RC
+        on a line of output prefixed by its index. A probe that reports nothing gets RC None.
+        """
+        script = []
+        for start in range(0, len(probes), self.skopeo_concurrency):
+            for index in range(start, min(start + self.skopeo_concurrency, len(probes))):
+                _, registry, name = probes[index]
+                script.append("( {} >/dev/null 2>&1; echo {} $? ) &".format(
+                    self.skopeo_probe_command(registry, name), index))
+            script.append("wait")
+
+        result = self.execute_module_with_retries("command", {
+            "_uses_shell": True,
+            "_raw_params": "\n".join(script),
+        })
+
+        rcs = [None] * len(probes)
+        for line in result.get("stdout", "").splitlines():
+            try:
+                index, rc = (int(field) for field in line.split())
+                rcs[index] = rc
+            except (ValueError, IndexError):
+                continue
+        return rcs
 
-        return False
+    def is_available_skopeo_image(self, image):
+        """Use Skopeo to determine if required image exists in known registry(s)."""
+        return image in self.available_images([image])
 
     def connect_to_registry(self, registry):
         """Use ansible wait_for module to test connectivity from host to registry. Returns bool."""
@@ -290,3 +379,58 @@ class DockerImageAvailability(DockerHostMixin, OpenShiftCheck):
         args = dict(host=host, port=port, state="started", timeout=30)
         result = self.execute_module("wait_for", args)
         return result.get("rc", 0) == 0 and not result.get("failed")
+
+
+class SharedProbeCache(object):
+    """Remember successful probes on the control host for the length of a playbook run.
+
+    Checks for each host run in separate worker processes forked from the same
+    ansible-playbook process, so results are shared through files in a directory
+    named after that parent process. Entries older than ttl seconds are ignored in
+    case the parent PID is reused. Only positive results are recorded; a negative
+    result on one host may be due to networking particular to that host.
+    """
+
+    ttl = 3600
+
+    def __init__(self, directory=None):
+        self.directory = directory or self.default_directory()
+
+    @staticmethod
+    def default_directory():
+        """Return the directory shared by all workers of this ansible-playbook process."""
+        return os.path.join(
+            tempfile.gettempdir(),
+            "openshift_checks-{}-{}".format(os.getuid(), os.getppid()),
+        )
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha256(key.encode("utf-8")).hexdigest())
+
+    def _usable(self):
+        """Ensure the directory exists and belongs to us so results cannot be forged."""
+        try:
+            os.makedirs(self.directory, 0o700)
+        except OSError:
+            pass
+        try:
+            return os.stat(self.directory).st_uid == os.getuid()
+        except OSError:
+            return False
+
+    def get(self, key):
+        """Return whether a probe for key succeeded recently."""
+        try:
+            return self._usable() and time.time() - os.path.getmtime(self._path(key)) < self.ttl
+        except OSError:
+            return False
+
+    def set(self, key):
+        """Record that a probe for key succeeded."""
+        if not self._usable():
+            return
+        try:
+            with open(self._path(key), "w"):
+                pass
+        except (IOError, OSError):
+            pass
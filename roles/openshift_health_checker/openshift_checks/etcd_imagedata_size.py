@@ -2,7 +2,7 @@
 Ansible module for determining if the size of OpenShift image data exceeds a specified limit in an etcd cluster.
 """
 
-from openshift_checks import OpenShiftCheck
+from openshift_checks import OpenShiftCheck, OpenShiftCheckException
 
 
 class EtcdImageDataSize(OpenShiftCheck):
@@ -31,6 +31,13 @@ class EtcdImageDataSize(OpenShiftCheck):
         key = self.get_var("etcd_client_key", default=config_base + "/master/master.etcd-client.key")
         ca_cert = self.get_var("etcd_client_ca_cert", default=config_base + "/master/master.etcd-ca.crt")
 
+        # etcd v3 stores data separately from v2; current clusters keep their data in v3
+        api_version = self.get_var("openshift_check_etcd_api_version", default="v2")
+        if api_version not in ("v2", "v3"):
+            raise OpenShiftCheckException(
+                'openshift_check_etcd_api_version must be "v2" or "v3", not "{}"'.format(api_version)
+            )
+
         for etcd_host in list(etcd_hosts):
             args = {
                 "size_limit_bytes": etcd_imagedata_size_limit,
@@ -39,6 +46,7 @@ class EtcdImageDataSize(OpenShiftCheck):
                 "port": etcd_port,
                 "protocol": "https" if etcd_is_ssl else "http",
                 "version_prefix": "/v2",
+                "api_version": api_version,
                 "allow_redirect": True,
                 "ca_cert": ca_cert,
                 "cert": {
@@ -2,6 +2,7 @@
 
 import json
 import re
+from pipes import quote
 
 from openshift_checks import OpenShiftCheckException, OpenShiftCheckExceptionList
 from openshift_checks.logging.logging import LoggingCheck
@@ -13,6 +14,20 @@ class Elasticsearch(LoggingCheck):
     name = "elasticsearch"
     tags = ["health", "logging"]
 
+    # marks the start of each section of output from the batched diagnostics command
+    diagnostics_marker = "### openshift_checks: "
+    es_query_urls = {
+        "master": "https://localhost:9200/_cat/master",
+        "nodes": "https://localhost:9200/_nodes",
+        "health": "https://localhost:9200/_cluster/health?pretty=true",
+    }
+    df_cmd = "df --output=ipcent,pcent /elasticsearch/persistent"
+
+    def __init__(self, *args, **kwargs):
+        super(Elasticsearch, self).__init__(*args, **kwargs)
+        # pod name => output of each diagnostic query, when collected in a batch
+        self.diagnostics = {}
+
     def run(self):
         """Check various things and gather errors. Returns: result as hash"""
 
@@ -38,6 +53,8 @@ class Elasticsearch(LoggingCheck):
             ))
             raise OpenShiftCheckExceptionList(errors)
 
+        if self.get_var("openshift_check_efk_es_batch", default=True, convert=bool):
+            self.collect_diagnostics(pods_by_name)
         errors += self.check_elasticsearch_masters(pods_by_name)
         errors += self.check_elasticsearch_node_list(pods_by_name)
         errors += self.check_es_cluster_health(pods_by_name)
@@ -65,14 +82,60 @@ class Elasticsearch(LoggingCheck):
         base = "exec {name} -- curl -s --cert {base}cert --key {base}key --cacert {base}ca -XGET '{url}'"
         return base.format(base="/etc/elasticsearch/secret/admin-", name=pod_name, url=url)
 
+    def collect_diagnostics(self, pods_by_name):
+        """Gather the output of all diagnostic queries with one exec per pod, querying pods concurrently."""
+        pod_names = list(pods_by_name.keys())
+        cmds = [
+            # the node list is only needed from one pod
+            self._build_diagnostics_cmd(pod_name, ["master", "health", "df"] + (["nodes"] if i == 0 else []))
+            for i, pod_name in enumerate(pod_names)
+        ]
+        concurrency = self.get_var("openshift_check_efk_es_concurrency", default=8, convert=int)
+        outputs = self.exec_oc_batch(cmds, concurrency, save_as_name="get_es_diagnostics.json")
+        for pod_name, output in zip(pod_names, outputs):
+            self.diagnostics[pod_name] = self._parse_diagnostics(output)
+
+    def _build_diagnostics_cmd(self, pod_name, queries):
+        """Return an oc command running all the given queries in the pod, each output in its own section."""
+        secret = "/etc/elasticsearch/secret/admin-"
+        script = []
+        for query in queries:
+            script.append("echo " + quote(self.diagnostics_marker + query))
+            if query == "df":
+                script.append(self.df_cmd)
+            else:
+                script.append("curl -s --cert {base}cert --key {base}key --cacert {base}ca -XGET {url}; echo".format(
+                    base=secret, url=quote(self.es_query_urls[query])))
+        return "-c elasticsearch exec {} -- sh -c {}".format(pod_name, quote("; ".join(script)))
+
+    def _parse_diagnostics(self, output):
+        """Split output of a diagnostics command into a dict of query => output."""
+        sections = {}
+        lines = None
+        for line in output.splitlines():
+            if line.startswith(self.diagnostics_marker):
+                lines = sections[line[len(self.diagnostics_marker):].strip()] = []
+            elif lines is not None:
+                lines.append(line)
+        return {query: "\n".join(lines).strip("\n") for query, lines in sections.items()}
+
+    def es_query(self, pod_name, query, save_as_name=None):
+        """Return the output of a diagnostic query in the pod, from the batch if it was collected."""
+        if pod_name in self.diagnostics:
+            return self.diagnostics[pod_name].get(query, "")
+        if query == "df":
+            return self.exec_oc("-c elasticsearch exec {} -- {}".format(pod_name, self.df_cmd), [],
+                                save_as_name=save_as_name)
+        cmd = self._build_es_curl_cmd(pod_name, self.es_query_urls[query])
+        return self.exec_oc(cmd, [], save_as_name=save_as_name)
+
     def check_elasticsearch_masters(self, pods_by_name):
         """Check that Elasticsearch masters are sane. Returns: list of errors"""
         es_master_names = set()
         errors = []
         for pod_name in pods_by_name.keys():
             # Compare what each ES node reports as master and compare for split brain
-            get_master_cmd = self._build_es_curl_cmd(pod_name, "https://localhost:9200/_cat/master")
-            master_name_str = self.exec_oc(get_master_cmd, [], save_as_name="get_master_names.json")
+            master_name_str = self.es_query(pod_name, "master", save_as_name="get_master_names.json")
             master_names = (master_name_str or '').split(' ')
             if len(master_names) > 1:
                 es_master_names.add(master_names[1])
@@ -112,8 +175,7 @@ class Elasticsearch(LoggingCheck):
             )]
 
         # get ES cluster nodes
-        node_cmd = self._build_es_curl_cmd(list(pods_by_name.keys())[0], 'https://localhost:9200/_nodes')
-        cluster_node_data = self.exec_oc(node_cmd, [], save_as_name="get_es_nodes.json")
+        cluster_node_data = self.es_query(list(pods_by_name.keys())[0], "nodes", save_as_name="get_es_nodes.json")
         try:
             cluster_nodes = json.loads(cluster_node_data)['nodes']
         except (ValueError, KeyError):
@@ -141,8 +203,7 @@ class Elasticsearch(LoggingCheck):
         """Exec into the elasticsearch pods and check the cluster health. Returns: list of errors"""
         errors = []
         for pod_name in pods_by_name.keys():
-            cluster_health_cmd = self._build_es_curl_cmd(pod_name, 'https://localhost:9200/_cluster/health?pretty=true')
-            cluster_health_data = self.exec_oc(cluster_health_cmd, [], save_as_name='get_es_health.json')
+            cluster_health_data = self.es_query(pod_name, "health", save_as_name='get_es_health.json')
             try:
                 health_res = json.loads(cluster_health_data)
                 if not health_res or not health_res.get('status'):
@@ -165,13 +226,12 @@ class Elasticsearch(LoggingCheck):
 
     def check_elasticsearch_diskspace(self, pods_by_name):
         """
-        Exec into an ES pod and query the diskspace on the persistent volume.
+        Exec into the ES pods and query the diskspace on the persistent volume.
         Returns: list of errors
         """
         errors = []
         for pod_name in pods_by_name.keys():
-            df_cmd = '-c elasticsearch exec {} -- df --output=ipcent,pcent /elasticsearch/persistent'.format(pod_name)
-            disk_output = self.exec_oc(df_cmd, [], save_as_name='get_pv_diskspace.json')
+            disk_output = self.es_query(pod_name, "df", save_as_name='get_pv_diskspace.json')
             lines = disk_output.splitlines()
             # expecting one header looking like 'IUse% Use%' and one body line
             body_re = r'\s*(\d+)%?\s+(\d+)%?\s*$'
@@ -49,24 +49,26 @@ class Fluentd(LoggingCheck):
 
     def get_nodes_by_name(self):
         """Retrieve all the node definitions. Returns: dict(name: node)"""
-        nodes_json = self.exec_oc("get nodes -o json", [])
-        try:
-            nodes = json.loads(nodes_json)
-        except ValueError:  # no valid json - should not happen
-            raise OpenShiftCheckException(
-                "BadOcNodeList",
-                "Could not obtain a list of nodes to validate fluentd.\n"
-                "Output from oc get:\n" + nodes_json
-            )
-        if not nodes or not nodes.get('items'):  # also should not happen
+        def fetch_nodes():
+            """List the nodes with oc, for the snapshot."""
+            nodes_json = self.exec_oc("get nodes -o json", [])
+            try:
+                nodes = json.loads(nodes_json)
+            except ValueError:  # no valid json - should not happen
+                raise OpenShiftCheckException(
+                    "BadOcNodeList",
+                    "Could not obtain a list of nodes to validate fluentd.\n"
+                    "Output from oc get:\n" + nodes_json
+                )
+            return (nodes or {}).get('items') or []
+
+        nodes_by_name = self.snapshot.by_name('nodes', fetch=fetch_nodes)
+        if not nodes_by_name:  # also should not happen
             raise OpenShiftCheckException(
                 "NoNodesDefined",
                 "No nodes appear to be defined according to the API."
             )
-        return {
-            node['metadata']['name']: node
-            for node in nodes['items']
-        }
+        return nodes_by_name
 
     @staticmethod
     def filter_fluentd_labeled_nodes(nodes_by_name, node_selector):
@@ -35,22 +35,29 @@ class LoggingCheck(OpenShiftCheck):
 
     def get_pods_for_component(self, logging_component):
         """Get all pods for a given component. Returns: list of pods."""
-        pod_output = self.exec_oc(
-            "get pods -l component={} -o json".format(logging_component),
-            [],
-        )
         try:
-            pods = json.loads(pod_output)  # raises ValueError if deserialize fails
-            if not pods or not pods.get('items'):  # also a broken response, treat the same
-                raise ValueError()
+            # raises ValueError if deserialize fails
+            pods = self.snapshot.by_label(
+                "pods", "component", logging_component,
+                self.logging_namespace(), lambda: self.oc_get_items("pods"),
+            )
         except ValueError:
-            # successful run but non-parsing data generally means there were no pods to be found
+            pods = []  # successful run but non-parsing data generally means there were no pods to be found
+        if not pods:
             raise MissingComponentPods(
                 'There are no "{}" component pods in the "{}" namespace.\n'
                 'Is logging deployed?'.format(logging_component, self.logging_namespace())
             )
 
-        return pods['items']
+        return pods
+
+    def oc_get_items(self, kind):
+        """
+        Get all resources of a kind in the logging namespace.
+        Returns: list of resources, or raises ValueError if the output is not valid json
+        """
+        output = self.exec_oc("get {} -o json".format(kind), [])
+        return (json.loads(output) or {}).get("items") or []
 
     @staticmethod
     def not_running_pods(pods):
@@ -99,3 +106,42 @@ class LoggingCheck(OpenShiftCheck):
             )
 
         return result.get("result", "")
+
+    def exec_oc_batch(self, cmd_strs, concurrency=4, save_as_name=None):
+        """
+        Execute several 'oc' commands concurrently in one module execution on the remote host.
+        Returns: list of outputs in the order of cmd_strs,
+        or raises CouldNotUseOc if any of them failed
+        """
+        config_base = self.get_var("openshift", "common", "config_base")
+        args = {
+            "namespace": self.logging_namespace(),
+            "config_file": os.path.join(config_base, "master", "admin.kubeconfig"),
+            "cmds": list(cmd_strs),
+            "concurrency": concurrency,
+        }
+
+        result = self.execute_module("ocutil", args, save_as_name=save_as_name)
+        if result.get("failed"):
+            raise CouldNotUseOc(
+                'Unexpected error using `oc` to validate the logging stack components:\n'
+                '{error}'.format(error=result.get("msg", result.get("result")))
+            )
+
+        outputs = []
+        for cmd_result in result.get("results", []):
+            if cmd_result.get("failed"):
+                if cmd_result["result"] == '[Errno 2] No such file or directory':
+                    raise CouldNotUseOc(
+                        "This host is supposed to be a master but does not have the `oc` command where expected.\n"
+                        "Has an installation been run on this host yet?"
+                    )
+
+                raise CouldNotUseOc(
+                    'Unexpected error using `oc` to validate the logging stack components.\n'
+                    'Error executing `oc {cmd}`:\n'
+                    '{error}'.format(cmd=cmd_result["cmd"], error=cmd_result["result"])
+                )
+            outputs.append(cmd_result.get("result", ""))
+
+        return outputs
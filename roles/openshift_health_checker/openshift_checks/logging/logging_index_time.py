@@ -3,8 +3,11 @@ Check for ensuring logs from pods can be queried in a reasonable amount of time.
 """
 
 import json
+import math
+import re
 import time
 
+from pipes import quote
 from uuid import uuid4
 
 from openshift_checks import OpenShiftCheckException
@@ -12,6 +15,11 @@ from openshift_checks.logging.logging import LoggingCheck
 
 
 ES_CMD_TIMEOUT_SECONDS = 30
+ES_SECRET_ARGS = (
+    "--cacert /etc/elasticsearch/secret/admin-ca "
+    "--cert /etc/elasticsearch/secret/admin-cert "
+    "--key /etc/elasticsearch/secret/admin-key"
+)
 
 
 class LoggingIndexTime(LoggingCheck):
@@ -19,6 +27,11 @@ class LoggingIndexTime(LoggingCheck):
     name = "logging_index_time"
     tags = ["health", "logging"]
 
+    # benchmark mode: bounds for polling Elasticsearch, and how many markers to look up per query
+    benchmark_min_poll_interval = 0.25  # seconds
+    benchmark_max_poll_interval = 8  # seconds
+    benchmark_terms_batch = 500
+
     def run(self):
         """Add log entry by making unique request to Kibana. Check for unique entry in the ElasticSearch pod logs."""
         try:
@@ -48,6 +61,15 @@ class LoggingIndexTime(LoggingCheck):
 
             running_component_pods[component] = running_pods
 
+        benchmark_markers = self.get_var("openshift_check_logging_index_benchmark_markers", default=0, convert=int)
+        if benchmark_markers > 0:
+            return self.run_benchmark(
+                running_component_pods["kibana"][0],
+                running_component_pods["es"][0],
+                benchmark_markers,
+                log_index_timeout,
+            )
+
         uuid = self.curl_kibana_with_uuid(running_component_pods["kibana"][0])
         self.wait_until_cmd_or_err(running_component_pods["es"][0], uuid, log_index_timeout)
         return {}
@@ -118,6 +140,146 @@ class LoggingIndexTime(LoggingCheck):
 
         return count
 
+    # pylint: disable=too-many-locals
+    def run_benchmark(self, kibana_pod, es_pod, count, timeout_secs):
+        """Send count markers through Kibana at a steady rate, and poll Elasticsearch with an
+        exponential backoff until each shows up or timeout_secs have passed since the last was sent.
+        Records the distribution of end-to-end index latency and the loss rate."""
+        rate = self.get_var("openshift_check_logging_index_benchmark_rate", default=1.0, convert=float)
+        max_loss = self.get_var("openshift_check_logging_index_benchmark_max_loss", default=0.0, convert=float)
+        if rate <= 0:
+            raise OpenShiftCheckException(
+                'InvalidRate',
+                'Invalid value provided for "openshift_check_logging_index_benchmark_rate". '
+                'Value must be a positive number of markers per second.'
+            )
+
+        markers = [self.generate_marker() for _ in range(count)]
+        sent_at = {}
+        latencies = {}
+        pending = []
+        sent = 0
+        interval = self.benchmark_min_poll_interval
+        start = time.time()
+        deadline = start + (count - 1) / rate + timeout_secs
+
+        while (sent < count or pending) and time.time() < deadline:
+            # send all markers that are due in one go
+            now = time.time()
+            due = min(count, int((now - start) * rate) + 1)
+            if due > sent:
+                batch = markers[sent:due]
+                self.inject_markers(kibana_pod, batch)
+                sent_at.update((marker, now) for marker in batch)
+                pending.extend(batch)
+                sent = due
+                interval = self.benchmark_min_poll_interval
+
+            # Both timestamps are taken before the oc exec is issued, so its overhead
+            # is mostly the same on each side and cancels out of the latency.
+            if pending:
+                queried_at = time.time()
+                found = self.query_es_for_markers(es_pod, pending)
+                for marker in found:
+                    latencies[marker] = queried_at - sent_at[marker]
+                pending = [marker for marker in pending if marker not in found]
+                if found:
+                    interval = self.benchmark_min_poll_interval
+                else:
+                    interval = min(interval * 2, self.benchmark_max_poll_interval)
+
+            waits = [deadline - time.time()]
+            if pending:
+                waits.append(interval)
+            if sent < count:
+                waits.append(start + sent / rate - time.time())
+            if min(waits) > 0:
+                time.sleep(min(waits))
+
+        report = self.benchmark_report(count, rate, [latencies.get(marker) for marker in markers])
+        self.register_file("logging_index_time_benchmark.json", report)
+        summary = dict((key, value) for key, value in report.items() if key != "latencies")
+        self.register_log("index latency benchmark", summary)
+
+        if report["loss_rate"] > max_loss:
+            self.register_failure(OpenShiftCheckException(
+                "MarkersLost",
+                "{lost} of {markers} markers sent through Kibana were not found in Elasticsearch "
+                "within {timeout}s ({loss:.1%} lost).".format(
+                    lost=report["lost"], markers=count, timeout=timeout_secs, loss=report["loss_rate"])
+            ))
+
+        return {"benchmark": summary}
+
+    def inject_markers(self, kibana_pod, markers):
+        """curl Kibana once for each marker, with a single exec into the pod."""
+        pod_name = kibana_pod["metadata"]["name"]
+        script = "for m in {}; do curl --max-time 30 -s -o /dev/null http://localhost:5601/$m; done".format(
+            " ".join(markers))
+        self.exec_oc("exec {} -c kibana -- sh -c {}".format(pod_name, quote(script)), [])
+
+    def query_es_for_markers(self, es_pod, markers):
+        """Look up markers in the Elasticsearch project indices with batched terms queries.
+        Returns: set of the markers that were found."""
+        pod_name = es_pod["metadata"]["name"]
+        wanted = set(markers)
+        found = set()
+        for i in range(0, len(markers), self.benchmark_terms_batch):
+            batch = markers[i:i + self.benchmark_terms_batch]
+            body = json.dumps({
+                "size": len(batch),
+                "_source": ["message"],
+                "query": {"terms": {"message": batch}},
+            })
+            exec_cmd = (
+                "exec {pod_name} -- curl --max-time 30 -s -f {secret} -H Content-Type:application/json "
+                "-XPOST https://logging-es:9200/project.{namespace}*/_search -d {body}"
+            ).format(pod_name=pod_name, secret=ES_SECRET_ARGS, namespace=self.logging_namespace(), body=quote(body))
+            result = self.exec_oc(exec_cmd, [])
+
+            try:
+                hits = json.loads(result)["hits"]["hits"]
+            except (KeyError, TypeError, ValueError):
+                raise OpenShiftCheckException(
+                    'esInvalidResponse',
+                    'Invalid response from Elasticsearch query:\n'
+                    '  {}\n'
+                    'Response was:\n{}'.format(exec_cmd, result)
+                )
+            for hit in hits:
+                message = hit.get("_source", {}).get("message", "")
+                found.update(wanted.intersection(re.findall(r"[0-9a-f]{32}", message)))
+
+        return found
+
+    @staticmethod
+    def benchmark_report(count, rate, latencies):
+        """Summarize the latencies (None for markers never found) of a benchmark run."""
+        values = sorted(latency for latency in latencies if latency is not None)
+        report = {
+            "markers": count,
+            "rate": rate,
+            "indexed": len(values),
+            "lost": count - len(values),
+            "loss_rate": float(count - len(values)) / count,
+            "latency_seconds": None,
+            "latencies": latencies,
+        }
+        if values:
+            report["latency_seconds"] = {
+                "p50": LoggingIndexTime.percentile(values, 50),
+                "p90": LoggingIndexTime.percentile(values, 90),
+                "p99": LoggingIndexTime.percentile(values, 99),
+                "max": values[-1],
+            }
+        return report
+
+    @staticmethod
+    def percentile(sorted_values, pct):
+        """Nearest-rank percentile of a sorted, non-empty list."""
+        rank = int(math.ceil(pct / 100.0 * len(sorted_values)))
+        return sorted_values[max(rank, 1) - 1]
+
     @staticmethod
     def running_pods(pods):
         """Filter pods that are running."""
@@ -127,3 +289,8 @@ class LoggingIndexTime(LoggingCheck):
     def generate_uuid():
         """Wrap uuid generator. Allows for testing with expected values."""
         return str(uuid4())
+
+    @staticmethod
+    def generate_marker():
+        """A unique marker that Elasticsearch indexes as a single term, unlike a hyphenated uuid."""
+        return uuid4().hex
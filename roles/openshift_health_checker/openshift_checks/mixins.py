@@ -2,6 +2,8 @@
 Mixin classes meant to be used with subclasses of OpenShiftCheck.
 """
 
+from openshift_checks import OpenShiftCheckException
+
 
 class NotContainerizedMixin(object):
     """Mixin for checks that are only active when not in containerized mode."""
@@ -14,6 +16,31 @@ class NotContainerizedMixin(object):
         return super(NotContainerizedMixin, self).is_active() and not openshift_is_atomic
 
 
+class PackageRepoFingerprintMixin(object):
+    """Mixin for checks whose outcome depends on the package repositories configured on the host."""
+    # permanent # pylint: disable=too-few-public-methods
+    # Reason: The mixin is not intended to stand on its own as a class.
+
+    # checksum repo definitions and the repomd.xml of every cached repo; when a repo
+    # publishes new packages, its repomd.xml changes on the next metadata refresh.
+    repo_probe_command = (
+        "find /etc/yum.repos.d /var/cache/yum /var/cache/dnf -type f "
+        "\\( -name '*.repo' -o -name repomd.xml \\) 2>/dev/null | sort | xargs -r sha256sum"
+    )
+
+    def fingerprint_probe(self):
+        """Return checksums of the repo definitions and cached repo metadata on the host."""
+        result = self.execute_module("command", {
+            "_uses_shell": True,
+            "_raw_params": self.repo_probe_command,
+        }, register=False)
+        if result.get("failed") or result.get("rc", 0) != 0:
+            raise OpenShiftCheckException(
+                "Unable to checksum package repository metadata: " + result.get("msg", "")
+            )
+        return result.get("stdout", "")
+
+
 class DockerHostMixin(object):
     """Mixin for checks that are only active on hosts that require Docker."""
 
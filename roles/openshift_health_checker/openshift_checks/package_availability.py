@@ -1,14 +1,15 @@
 """Check that required RPM packages are available."""
 
 from openshift_checks import OpenShiftCheck
-from openshift_checks.mixins import NotContainerizedMixin
+from openshift_checks.mixins import NotContainerizedMixin, PackageRepoFingerprintMixin
 
 
-class PackageAvailability(NotContainerizedMixin, OpenShiftCheck):
+class PackageAvailability(PackageRepoFingerprintMixin, NotContainerizedMixin, OpenShiftCheck):
     """Check that required RPM packages are available."""
 
     name = "package_availability"
     tags = ["preflight"]
+    fingerprint_vars = ("openshift_service_type", "group_names")
 
     def is_active(self):
         """Run only when yum is the package manager as the code is specific to it."""
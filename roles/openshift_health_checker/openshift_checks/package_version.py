@@ -1,14 +1,20 @@
 """Check that available RPM packages match the required versions."""
 
 from openshift_checks import OpenShiftCheck
-from openshift_checks.mixins import NotContainerizedMixin
+from openshift_checks.mixins import NotContainerizedMixin, PackageRepoFingerprintMixin
 
 
-class PackageVersion(NotContainerizedMixin, OpenShiftCheck):
+class PackageVersion(PackageRepoFingerprintMixin, NotContainerizedMixin, OpenShiftCheck):
     """Check that available RPM packages match the required versions."""
 
     name = "package_version"
     tags = ["preflight"]
+    fingerprint_vars = (
+        "openshift_service_type",
+        "openshift_release",
+        "openshift_deployment_type",
+        "ansible_pkg_mgr",
+    )
 
     def is_active(self):
         """Skip hosts that do not have package requirements."""
@@ -45,4 +51,9 @@ class PackageVersion(NotContainerizedMixin, OpenShiftCheck):
             ],
         }
 
+        # where the module keeps its index of the packages in each repo; empty to not use one
+        index_dir = self.get_var("openshift_check_package_index_dir", default=None)
+        if index_dir is not None:
+            args["index_dir"] = index_dir
+
         return self.execute_module_with_retries("aos_version", args)
@@ -0,0 +1,84 @@
+"""
+A snapshot of cluster resources shared by the checks running on a host.
+"""
+
+from collections import defaultdict
+
+
+class ResourceSnapshot(object):
+    """Lists of cluster resources, fetched at most once per run and indexed for lookups.
+
+    The action plugin gives all checks on a host the same snapshot, so a list
+    that several checks need (e.g. nodes, or the pods in the logging namespace)
+    is only downloaded and parsed once. Lists are keyed by kind and namespace,
+    with namespace None meaning the whole cluster. They are fetched lazily
+    through a function supplied by whichever check asks first; if that
+    function raises, nothing is recorded and the next caller fetches again.
+    """
+
+    def __init__(self):
+        self._items = {}
+        self._indexes = {}
+
+    def add(self, kind, items, namespace=None):
+        """Record a list of resources that was obtained some other way."""
+        key = (kind, namespace)
+        self._items[key] = list(items or [])
+        for index_key in [index_key for index_key in self._indexes if index_key[:2] == key]:
+            del self._indexes[index_key]
+
+    def has(self, kind, namespace=None):
+        """Return True if resources of the kind have already been recorded."""
+        return (kind, namespace) in self._items
+
+    def items(self, kind, namespace=None, fetch=None):
+        """Return the list of resources of a kind, calling fetch() to obtain it if it is not known yet."""
+        key = (kind, namespace)
+        if key not in self._items:
+            if fetch is None:
+                raise KeyError("no {} resources in snapshot".format(kind))
+            self.add(kind, fetch(), namespace)
+        return self._items[key]
+
+    def by_name(self, kind, namespace=None, fetch=None):
+        """Returns: dict(name: resource)"""
+        return self._index(kind, namespace, fetch, "name", lambda item: [
+            item.get("metadata", {}).get("name")
+        ], unique=True)
+
+    # pylint: disable=too-many-arguments
+    def by_label(self, kind, label, value, namespace=None, fetch=None):
+        """Returns: list of resources having the label set to value"""
+        index = self._index(kind, namespace, fetch, ("label", label), lambda item: [
+            item.get("metadata", {}).get("labels", {}).get(label)
+        ])
+        return index.get(value, [])
+
+    def by_node(self, kind="pods", namespace=None, fetch=None):
+        """Returns: dict(node name: list of resources scheduled on it)"""
+        return self._index(kind, namespace, fetch, "node", lambda item: [
+            item.get("spec", {}).get("nodeName")
+        ])
+
+    def by_address(self, kind="nodes", namespace=None, fetch=None):
+        """Returns: dict(address: resource) covering every address a resource reports in its status"""
+        return self._index(kind, namespace, fetch, "address", lambda item: [
+            address.get("address") for address in item.get("status", {}).get("addresses", [])
+        ], unique=True)
+
+    # pylint: disable=too-many-arguments
+    def _index(self, kind, namespace, fetch, index_name, keys_for, unique=False):
+        """Build (once) and return a dict mapping the keys of each resource to the resource(s)."""
+        index_key = (kind, namespace, index_name)
+        if index_key not in self._indexes:
+            index = {} if unique else defaultdict(list)
+            for item in self.items(kind, namespace, fetch):
+                for key in keys_for(item):
+                    if key is None:
+                        continue
+                    if unique:
+                        index.setdefault(key, item)
+                    else:
+                        index[key].append(item)
+            self._indexes[index_key] = dict(index)
+        return self._indexes[index_key]
@@ -4,6 +4,7 @@ Check that the SDN is routing traffic properly.
 
 import datetime
 import os
+import random
 import textwrap
 import time
 
@@ -181,8 +182,12 @@ class SDNCheck(OpenShiftCheck):
                 'No nodes appear to be defined according to the API.'
             )
 
-        for node in nodes:
-            self.check_node_kubelet(node)
+        if self.get_var('openshift_check_sdn_kubelet_sweep', default=True,
+                        convert=bool):
+            self.sweep_node_kubelets(nodes)
+        else:
+            for node in nodes:
+                self.check_node_kubelet(node)
 
     def save_component_container_logs(self, component, container):
         """Save the first and last 2000 lines of logs for the specified
@@ -215,6 +220,10 @@ class SDNCheck(OpenShiftCheck):
 
     def get_resource(self, kind):
         """Return a list of all resources of the specified kind."""
+        return self.snapshot.items(kind, fetch=lambda: self.get_prefetched_resource(kind))
+
+    def get_prefetched_resource(self, kind):
+        """Return the resources of the specified kind from the "resources" var."""
         for resource in self.task_vars['resources']['results']:
             if resource['item'] == kind:
                 return resource['results']['results'][0]['items']
@@ -282,6 +291,7 @@ class SDNCheck(OpenShiftCheck):
         subnet = six.text_type(subnet)
         address = ipaddress.ip_network(subnet)[1]
 
+        peers = []
         for remote_node in self.get_resource('nodes'):
             remote_node_name = remote_node['metadata']['name']
             if remote_node_name == node_name:
@@ -291,7 +301,23 @@ class SDNCheck(OpenShiftCheck):
             if remote_subnet is None:
                 continue
             remote_subnet = six.text_type(remote_subnet)
-            remote_address = ipaddress.ip_network(remote_subnet)[1]
+            peers.append((remote_node_name, ipaddress.ip_network(remote_subnet)))
+
+        sample_size = self.get_var('openshift_check_sdn_sample_size',
+                                   default=0, convert=int)
+        if sample_size > 0:
+            peers = SDNCheck.sample_peers(node_name, peers, sample_size)
+            self.register_log('sampled peer nodes',
+                              [name for name, _ in peers])
+
+        if self.get_var('openshift_check_sdn_mesh_probe', default=False,
+                        convert=bool):
+            self.probe_node_mesh(node_name, address, peers,
+                                 exec_in_ovs_container)
+            return
+
+        for remote_node_name, remote_network in peers:
+            remote_address = remote_network[1]
 
             self.save_command_output(
                 'trace_node_%s_to_node_%s' % (node_name, remote_node_name),
@@ -309,6 +335,74 @@ class SDNCheck(OpenShiftCheck):
                 self.register_failure('Node %s cannot ping node %s.' %
                                       (node_name, remote_node_name))
 
+    @staticmethod
+    def sample_peers(node_name, peers, sample_size, range_prefixlen=16):
+        """Return a sample of the (name, hostsubnet) peers of a node.
+
+        The sample has sample_size peers picked at random plus one peer from
+        each range of hostsubnets (the supernet of the given prefix length), so
+        that every part of the cluster network is probed.  The choice is seeded
+        by the node name so that reruns probe the same peers.
+        """
+        if len(peers) <= sample_size:
+            return list(peers)
+
+        rand = random.Random(node_name)
+        sample = set(rand.sample(range(len(peers)), sample_size))
+
+        by_range = {}
+        for index, (_, network) in enumerate(peers):
+            prefixlen = min(range_prefixlen, network.prefixlen)
+            by_range.setdefault(network.supernet(new_prefix=prefixlen), []).append(index)
+        for _, indices in sorted(by_range.items()):
+            if not sample.intersection(indices):
+                sample.add(rand.choice(indices))
+
+        return [peers[index] for index in sorted(sample)]
+
+    def probe_node_mesh(self, node_name, address, peers, exec_in_ovs_container):
+        """Trace flows to and ping all peers with one module execution on the node."""
+        exec_prefix = [
+            part.decode('utf-8').strip() if isinstance(part, bytes) else part
+            for part in exec_in_ovs_container
+        ]
+        args = dict(
+            source_address=str(address),
+            peers=[dict(name=name, address=str(network[1]))
+                   for name, network in peers],
+            exec_prefix=exec_prefix,
+            concurrency=self.get_var('openshift_check_sdn_mesh_concurrency',
+                                     default=20, convert=int),
+            full_output=self.want_full_results,
+        )
+        result = self.execute_module('sdn_mesh_probe', args, register=False)
+        if result.get('failed'):
+            raise OpenShiftCheckException(
+                'MeshProbeFailure',
+                'Failed to probe peer nodes from node %s: %s' %
+                (node_name, result.get('msg', 'unknown error')))
+
+        for peer in result.get('results', []):
+            remote_node_name = peer['name']
+            if self.want_full_results:
+                self.register_file('trace_node_%s_to_node_%s' %
+                                   (node_name, remote_node_name),
+                                   peer.get('trace', ''))
+                self.register_file('ping_node_%s_to_node_%s' %
+                                   (node_name, remote_node_name),
+                                   peer.get('ping_output', ''))
+            if peer.get('trace_rc', 0) != 0:
+                self.register_failure('Node %s cannot trace flows to node %s.' %
+                                      (node_name, remote_node_name))
+            if not peer.get('ping'):
+                self.register_failure('Node %s cannot ping node %s.' %
+                                      (node_name, remote_node_name))
+        self.register_log('mesh probe results', dict(
+            peers=len(result.get('results', [])),
+            ping_failures=sum(1 for peer in result.get('results', [])
+                              if not peer.get('ping')),
+        ))
+
     def get_container_exec_command(self, container_name, namespace):
         """Return an array comprising a command and arguments that can be used
         to execute commands inside the specified container running in a pod in
@@ -378,12 +472,7 @@ class SDNCheck(OpenShiftCheck):
             self.register_failure('Node %s: no preferred address' % name)
             return
 
-        internal_addr = None
-        for address in node.get('status', {}).get('addresses', []):
-            if address.get('type') == 'InternalIP':
-                internal_addr = address.get('address')
-                break
-
+        internal_addr = SDNCheck.get_node_internal_address(node)
         if not internal_addr:
             self.register_failure('Node %s: no IP address in OpenShift' % name)
         else:
@@ -405,6 +494,72 @@ class SDNCheck(OpenShiftCheck):
                 'Kubelet on node %s is not responding: %s' %
                 (name, result.get('msg', 'unknown error')))
 
+    def sweep_node_kubelets(self, nodes):
+        """Resolve the addresses of all nodes and connect to their kubelets
+        with one module execution on the master."""
+        probes = []
+        internal_addrs = {}
+        for node in nodes:
+            name = node['metadata']['name']
+            preferred_addr = SDNCheck.get_node_preferred_address(node)
+            if not preferred_addr:
+                self.register_failure('Node %s: no preferred address' % name)
+                continue
+            internal_addrs[name] = SDNCheck.get_node_internal_address(node)
+            if not internal_addrs[name]:
+                self.register_failure('Node %s: no IP address in OpenShift' % name)
+            probes.append(dict(name=name, address=preferred_addr))
+
+        if not probes:
+            return
+
+        args = dict(
+            nodes=probes,
+            timeout=self.get_var('openshift_check_sdn_kubelet_timeout',
+                                 default=3, convert=float),
+            concurrency=self.get_var('openshift_check_sdn_kubelet_concurrency',
+                                     default=50, convert=int),
+        )
+        result = self.execute_module('kubelet_sweep', args, register=False)
+        if result.get('failed'):
+            raise OpenShiftCheckException(
+                'KubeletSweepFailure',
+                'Failed to connect to kubelets from the master: %s' %
+                result.get('msg', 'unknown error'))
+
+        latencies = []
+        for probe in result.get('results', []):
+            name = probe['name']
+            internal_addr = internal_addrs.get(name)
+            if probe.get('resolved') is None:
+                self.register_failure('Cannot resolve node %s' % probe['address'])
+            elif internal_addr and probe['resolved'] != internal_addr:
+                self.register_failure(
+                    ('Node %s: the IP address in OpenShift (%s)' +
+                     ' does not match DNS/hosts (%s)') %
+                    (name, internal_addr, probe['resolved']))
+            if 'latency_ms' not in probe:
+                continue
+            if probe.get('error'):
+                self.register_failure(
+                    'Kubelet on node %s is not responding: %s' %
+                    (name, probe['error']))
+            latencies.append((probe['latency_ms'], name))
+
+        # slowest first, so that kubelets in trouble stand out
+        self.register_log('kubelet connect latency (ms)', [
+            dict(node=name, latency_ms=latency)
+            for latency, name in sorted(latencies, reverse=True)
+        ])
+
+    @staticmethod
+    def get_node_internal_address(node):
+        """Return the InternalIP address of the given node, or None."""
+        for address in node.get('status', {}).get('addresses', []):
+            if address.get('type') == 'InternalIP':
+                return address.get('address')
+        return None
+
     @staticmethod
     def get_node_preferred_address(node):
         """Return a host name or address for the given node, or None.
@@ -1,14 +1,17 @@
+import time
+
 import pytest
 
 from ansible.playbook.play_context import PlayContext
 
-from openshift_health_check import ActionModule, resolve_checks
-from openshift_health_check import copy_remote_file_to_dir, write_result_to_output_dir, write_to_output_file
+from openshift_health_check import ActionModule, resolve_checks, run_check
+from openshift_health_check import copy_remote_file_to_dir, write_files_to_save, write_result_to_output_dir
+from openshift_health_check import write_to_output_file
 from openshift_checks import OpenShiftCheckException, FileToSave
 
 
 def fake_check(name='fake_check', tags=None, is_active=True, run_return=None, run_exception=None,
-               run_logs=None, run_files=None, changed=False, get_var_return=None):
+               run_logs=None, run_files=None, changed=False, get_var_return=None, fingerprint=None):
     """Returns a new class that is compatible with OpenShiftCheck for testing."""
 
     _name, _tags = name, tags
@@ -22,6 +25,7 @@ def fake_check(name='fake_check', tags=None, is_active=True, run_return=None, ru
             self.failures = []
             self.logs = run_logs or []
             self.files_to_save = run_files or []
+            self.module_calls = []
 
         def is_active(self):
             if isinstance(is_active, Exception):
@@ -37,6 +41,11 @@ def fake_check(name='fake_check', tags=None, is_active=True, run_return=None, ru
         def get_var(*args, **_):
             return get_var_return
 
+        def fingerprint(self):
+            if isinstance(fingerprint, Exception):
+                raise fingerprint
+            return fingerprint
+
         def register_failure(self, exc):
             self.failures.append(OpenShiftCheckException(str(exc)))
             return
@@ -256,6 +265,80 @@ def test_action_plugin_run_check_output_dir(plugin, task_vars, tmpdir, monkeypat
     assert any(path.basename == 'save.file.2' for path in tmpdir.visit())
 
 
+def test_action_plugin_invalid_cache_ttl(plugin, task_vars, monkeypatch):
+    monkeypatch.setattr(plugin, 'load_known_checks', lambda *_: {})
+    monkeypatch.setattr('openshift_health_check.resolve_checks', lambda *args: ['fake_check'])
+    task_vars['openshift_checks_cache_ttl'] = 'forever'
+
+    result = plugin.run(tmp=None, task_vars=task_vars)
+
+    assert failed(result, msg_has=['openshift_checks_cache_ttl'])
+
+
+@pytest.mark.parametrize('fingerprint, run_return, cache_ttl, expect_cached', [
+    ('abc', {'ok': 'test'}, 3600, True),
+    ('abc', {'ok': 'test'}, 0, False),  # caching disabled
+    (None, {'ok': 'test'}, 3600, False),  # check does not declare inputs
+    (Exception('probe failed'), {'ok': 'test'}, 3600, False),
+    ('abc', {'failed': True, 'msg': 'failure'}, 3600, False),  # failures are not reused
+])
+def test_run_check_cache(fingerprint, run_return, cache_ttl, expect_cached, tmpdir):
+    check_class = fake_check(run_return=run_return, fingerprint=fingerprint)
+
+    first = run_check('fake_check', check_class(), [], str(tmpdir), cache_ttl)
+    assert not first.get('cached')
+
+    second = run_check('fake_check', check_class(), [], str(tmpdir), cache_ttl)
+    assert expect_cached == bool(second.get('cached'))
+    if expect_cached:
+        assert 'cached_at' in second
+        assert 'timing' not in second
+        assert second['ok'] == 'test'
+
+
+def test_run_check_timing():
+    check = fake_check(run_return={'ok': 'test'})()
+    check.module_calls = [
+        dict(module='command', seconds=0.5, output_bytes=100),
+        dict(module='yum', seconds=1.25, output_bytes=2000),
+    ]
+
+    timing = run_check('fake_check', check, [])['timing']
+
+    assert timing['duration'] >= 0
+    assert timing['module_executions'] == 2
+    assert timing['module_seconds'] == 1.75
+    assert timing['module_output_bytes'] == 2100
+    assert timing['slowest_module_calls'] == check.module_calls[::-1]
+
+    assert 'timing' not in run_check('fake_check', check, ['fake_check'])  # skipped
+
+
+def test_run_check_timing_lists_slowest_calls():
+    check = fake_check(run_return={'ok': 'test'})()
+    check.module_calls = [dict(module='command', seconds=i / 10.0, output_bytes=10) for i in range(20)]
+
+    timing = run_check('fake_check', check, [])['timing']
+
+    assert timing['module_executions'] == 20
+    assert timing['module_output_bytes'] == 200
+    assert [call['seconds'] for call in timing['slowest_module_calls']] == [1.9, 1.8, 1.7, 1.6, 1.5]
+
+
+def test_run_check_cache_invalidated(tmpdir, monkeypatch):
+    run_check('fake_check', fake_check(run_return={}, fingerprint='abc')(), [], str(tmpdir), 60)
+
+    # inputs changed
+    result = run_check('fake_check', fake_check(run_return={}, fingerprint='def')(), [], str(tmpdir), 60)
+    assert not result.get('cached')
+
+    # cached result is too old
+    now = time.time()
+    monkeypatch.setattr('time.time', lambda: now + 61)
+    result = run_check('fake_check', fake_check(run_return={}, fingerprint='def')(), [], str(tmpdir), 60)
+    assert not result.get('cached')
+
+
 def test_action_plugin_resolve_checks_exception(plugin, task_vars, monkeypatch):
     monkeypatch.setattr(plugin, 'load_known_checks', lambda *_: {})
 
@@ -358,3 +441,82 @@ def test_write_to_output_exceptions(tmpdir, monkeypatch, capsys):
     monkeypatch.setattr("openshift_health_check.prepare_output_dir", lambda *_: False)
     write_result_to_output_dir(str(tmpdir), test)
     assert "Error creating" in test["output_files"]
+
+
+def test_fetch_remote_files(plugin, task_vars, tmpdir, monkeypatch):
+    modules = []
+
+    def execute_module(module_name, module_args, *_):
+        modules.append((module_name, module_args))
+        if module_name == 'collect_files':
+            return dict(dest='/tmp/collected', files=[
+                dict(src='/etc/hosts', name='hosts', dest='/tmp/collected/0.gz', size=10),
+                dict(src='/var/log/big', name='big', dest='/tmp/collected/1.gz', size=10 ** 9, truncated=True),
+                dict(src='/missing', name='missing', error='No such file or directory'),
+            ])
+        if module_name == 'slurp':
+            return dict(content='c3BhbQo=', encoding='base64')
+        return {}
+
+    def fetch_file(remote_file, local_file):
+        if remote_file.endswith('1.gz'):
+            raise IOError('permission denied')
+        with open(local_file, 'w') as outfile:
+            outfile.write('fetched')
+
+    monkeypatch.setattr(plugin, '_execute_module', execute_module)
+    plugin._connection.fetch_file = fetch_file
+    output_dir = str(tmpdir.join('fake_check'))
+
+    plugin.fetch_remote_files(output_dir, [('/etc/hosts', 'hosts'), ('/var/log/big', 'big'), ('/missing', 'missing')],
+                              task_vars=task_vars, max_size=1024)
+
+    assert modules[0] == ('collect_files', dict(files=[
+        dict(src='/etc/hosts', name='hosts'),
+        dict(src='/var/log/big', name='big'),
+        dict(src='/missing', name='missing'),
+    ], max_size=1024))
+    assert tmpdir.join('fake_check', 'hosts.gz').read() == 'fetched'
+    assert tmpdir.join('fake_check', 'big.gz').read() == 'spam\n'  # slurped instead
+    assert not tmpdir.join('fake_check', 'missing.gz').check()
+    assert modules[-1] == ('file', dict(path='/tmp/collected', state='absent'))
+
+
+def test_fetch_remote_files_cleanup_failure(plugin, task_vars, tmpdir, monkeypatch):
+    def execute_module(module_name, module_args, *_):
+        if module_name == 'collect_files':
+            return dict(dest='/tmp/collected', files=[])
+        raise IOError('connection lost')
+
+    warnings = []
+    monkeypatch.setattr(plugin, '_execute_module', execute_module)
+    monkeypatch.setattr('openshift_health_check.display.warning', warnings.append)
+
+    # does not raise, so the other checks of the host still run
+    plugin.fetch_remote_files(str(tmpdir.join('fake_check')), [('/etc/hosts', 'hosts')], task_vars=task_vars)
+
+    assert len(warnings) == 1 and 'connection lost' in warnings[0]
+
+
+def test_write_files_to_save_fetches_remote_files_together(tmpdir):
+    check = fake_check(run_files=[
+        FileToSave('hosts', None, '/etc/hosts'),
+        FileToSave('notes', 'contents', None),
+        FileToSave('hosts', None, '/etc/hosts'),
+    ])()
+    fetched = []
+
+    write_files_to_save(str(tmpdir), check, lambda output_dir, files: fetched.append((output_dir, files)))
+
+    assert fetched == [(str(tmpdir.join('fake_check')), [('/etc/hosts', 'hosts'), ('/etc/hosts', 'hosts.2')])]
+    assert tmpdir.join('fake_check', 'notes').read() == 'contents'
+
+
+def test_action_plugin_invalid_max_file_size(plugin, task_vars, monkeypatch):
+    monkeypatch.setattr(plugin, 'load_known_checks', lambda *_: {})
+    monkeypatch.setattr('openshift_health_check.resolve_checks', lambda *args: ['fake_check'])
+    task_vars['openshift_checks_output_max_file_size'] = '10M'
+
+    result = plugin.run(tmp=None, task_vars=task_vars)
+
+    assert failed(result, msg_has=['openshift_checks_output_max_file_size'])
@@ -194,3 +194,218 @@ def test_check_multi_minor_release_fail(pkgs, expect_to_flag_pkgs):
     with pytest.raises(aos_version.FoundMultiRelease) as e:
         aos_version._check_multi_minor_release(pkgs, expected_pkgs)
     assert set(expect_to_flag_pkgs) == set(e.value.problem_pkgs)
+
+
+class FakeRepoError(Exception):
+    pass
+
+
+class FakeYumRepo(object):
+    def __init__(self, repoid, cachedir, packages):
+        self.id = repoid
+        self.cachedir = cachedir
+        self.packages = packages
+
+    def getRepoXML(self):
+        pass
+
+
+FakeYumPackage = namedtuple('FakeYumPackage', ['name', 'epoch', 'version', 'release', 'arch', 'repoid'])
+
+
+def fake_yum(repos, loads):
+    """Returns a stand-in for the yum module, serving the given repos and recording which are loaded."""
+
+    class FakeRepos(object):
+        def __init__(self):
+            self.enabled = list(repos)
+
+        def listEnabled(self):
+            return list(self.enabled)
+
+        def disableRepo(self, repoid):
+            self.enabled = [repo for repo in self.enabled if repo.id != repoid]
+
+    class FakeSack(object):
+        def __init__(self, yb):
+            self.yb = yb
+
+        def returnPackages(self):
+            loads.append(sorted(repo.id for repo in self.yb.repos.enabled))
+            return [pkg for repo in self.yb.repos.enabled for pkg in repo.packages]
+
+    class FakeRpmdb(object):
+        @staticmethod
+        def returnPackages(patterns):
+            return []
+
+    class FakeYumBase(object):
+        def __init__(self):
+            self.conf = type('conf', (object,), {})()
+            self.repos = FakeRepos()
+            self.rpmdb = FakeRpmdb()
+
+        @property
+        def pkgSack(self):
+            return FakeSack(self)
+
+    class FakeErrors(object):
+        RepoError = FakeRepoError
+        PackageSackError = FakeRepoError
+
+    return type('yum', (object,), dict(YumBase=FakeYumBase, Errors=FakeErrors))
+
+
+def test_yum_repo_index(tmpdir, monkeypatch):
+    repos = []
+    for repoid, version in (('rhel', '3.9.1'), ('ose', '3.9.2')):
+        cachedir = tmpdir.mkdir(repoid)
+        cachedir.join('repomd.xml').write('metadata for ' + version)
+        repos.append(FakeYumRepo(repoid, str(cachedir), [
+            FakeYumPackage('atomic-openshift', '0', version, '1.el7', 'x86_64', repoid),
+            FakeYumPackage('unrelated', '0', '1.0', '1.el7', 'noarch', repoid),
+        ]))
+    loads = []
+    monkeypatch.setattr(aos_version, 'yum', fake_yum(repos, loads), raising=False)
+    repo_index = aos_version.RepoIndex(str(tmpdir.join('index')))
+
+    pkgs = aos_version._retrieve_indexed_packages('yum', ['atomic-openshift'], repo_index)
+    assert sorted(pkg.version for pkg in pkgs) == ['3.9.1', '3.9.2']
+    assert loads == [['ose', 'rhel']]
+
+    # nothing changed: no repo metadata is loaded
+    pkgs = aos_version._retrieve_indexed_packages('yum', ['atomic-openshift'], repo_index)
+    assert sorted(pkg.version for pkg in pkgs) == ['3.9.1', '3.9.2']
+    assert loads == [['ose', 'rhel']]
+
+    # only the repo whose metadata changed is loaded again
+    tmpdir.join('ose', 'repomd.xml').write('new metadata')
+    repos[1].packages.append(FakeYumPackage('atomic-openshift', '0', '3.9.3', '1.el7', 'x86_64', 'ose'))
+    pkgs = aos_version._retrieve_indexed_packages('yum', ['atomic-openshift'], repo_index)
+    assert sorted(pkg.version for pkg in pkgs) == ['3.9.1', '3.9.2', '3.9.3']
+    assert loads == [['ose', 'rhel'], ['ose']]
+
+    with pytest.raises(aos_version.AosVersionException):
+        aos_version._retrieve_indexed_packages('yum', ['missing'], repo_index)
+
+
+class FakeDnfRepo(object):
+    def __init__(self, repoid, packages, enabled_repos):
+        self.id = repoid
+        self.metadata_expire = -1
+        self.packages = packages
+        self.enabled_repos = enabled_repos
+
+    def disable(self):
+        self.enabled_repos.remove(self)
+
+
+FakeDnfPackage = namedtuple('FakeDnfPackage', ['name', 'epoch', 'version', 'release', 'arch', 'reponame'])
+
+
+def fake_dnf(cachedir, repos, loads):
+    """Returns a stand-in for the dnf module, serving the given repos and recording which are loaded."""
+
+    class FakeRepos(object):
+        def __init__(self):
+            self.enabled = []
+
+        def iter_enabled(self):
+            return iter(list(self.enabled))
+
+        def __getitem__(self, repoid):
+            return next(repo for repo in self.enabled if repo.id == repoid)
+
+    class FakeQuery(object):
+        def __init__(self, packages):
+            self.packages = packages
+
+        def available(self):
+            return self.packages
+
+    class FakeBase(object):
+        def __init__(self):
+            self.conf = type('conf', (object,), dict(cachedir=cachedir))()
+            self.repos = FakeRepos()
+            self.sack = None
+
+        def read_all_repos(self):
+            self.repos.enabled = [FakeDnfRepo(repoid, packages, None) for repoid, packages in repos]
+            for repo in self.repos.enabled:
+                repo.enabled_repos = self.repos.enabled
+
+        def fill_sack(self, load_system_repo, load_available_repos):
+            assert not load_system_repo and load_available_repos
+            loads.append(sorted(repo.id for repo in self.repos.enabled))
+            packages = [pkg for repo in self.repos.enabled for pkg in repo.packages]
+            self.sack = type('sack', (object,), dict(query=lambda _: FakeQuery(packages)))()
+
+    return type('dnf', (object,), dict(Base=FakeBase))
+
+
+def test_dnf_repo_index(tmpdir, monkeypatch):
+    def write_repomd(dirname, contents):
+        tmpdir.join('cache', dirname, 'repodata', 'repomd.xml').write(contents, ensure=True)
+
+    write_repomd('rhel-0123456789abcdef', 'metadata for 3.9.1')
+    write_repomd('ose-fedcba9876543210', 'metadata for 3.9.2')
+    # neither another repo whose id starts the same nor a leftover directory get in the way
+    write_repomd('ose-testing-0123456789abcdef', 'other metadata')
+    write_repomd('ose-00000000000000ff', 'metadata of former URLs')
+    stale = tmpdir.join('cache', 'ose-00000000000000ff', 'repodata', 'repomd.xml')
+    stale.setmtime(stale.mtime() - 3600)
+
+    repos = [
+        ('rhel', [FakeDnfPackage('atomic-openshift', '0', '3.9.1', '1.el7', 'x86_64', 'rhel')]),
+        ('ose', [FakeDnfPackage('atomic-openshift', '0', '3.9.2', '1.el7', 'x86_64', 'ose'),
+                 FakeDnfPackage('unrelated', '0', '1.0', '1.el7', 'noarch', 'ose')]),
+    ]
+    loads = []
+    monkeypatch.setattr(aos_version, 'dnf', fake_dnf(str(tmpdir.join('cache')), repos, loads), raising=False)
+    repo_index = aos_version.RepoIndex(str(tmpdir.join('index')))
+
+    pkgs = aos_version._retrieve_indexed_packages('dnf', ['atomic-openshift'], repo_index)
+    assert sorted(pkg.version for pkg in pkgs) == ['3.9.1', '3.9.2']
+    assert loads == [['ose', 'rhel']]
+
+    # nothing changed: no repo metadata is loaded
+    pkgs = aos_version._retrieve_indexed_packages('dnf', ['atomic-openshift'], repo_index)
+    assert sorted(pkg.version for pkg in pkgs) == ['3.9.1', '3.9.2']
+    assert loads == [['ose', 'rhel']]
+
+    # only the repo whose metadata changed is loaded again
+    write_repomd('ose-fedcba9876543210', 'new metadata')
+    repos[1][1].append(FakeDnfPackage('atomic-openshift', '0', '3.9.3', '1.el7', 'x86_64', 'ose'))
+    pkgs = aos_version._retrieve_indexed_packages('dnf', ['atomic-openshift'], repo_index)
+    assert sorted(pkg.version for pkg in pkgs) == ['3.9.1', '3.9.2', '3.9.3']
+    assert loads == [['ose', 'rhel'], ['ose']]
+
+
+def test_repo_index_ignores_unusable_entries(tmpdir):
+    repo_index = aos_version.RepoIndex(str(tmpdir))
+    repo_index.save('rhel', 'abc', {'spam': [['0', '1.0', '1', 'noarch']]})
+
+    assert repo_index.load('rhel', 'abc') == {'spam': [['0', '1.0', '1', 'noarch']]}
+    assert repo_index.load('rhel', 'def') is None
+    assert repo_index.load('rhel', None) is None
+    assert repo_index.load('other', 'abc') is None
+
+    tmpdir.join('rhel.json').write('not json')
+    assert repo_index.load('rhel', 'abc') is None
+
+
+@pytest.mark.parametrize('age, metadata_expire, expected', [
+    (10, 60, True),
+    (120, 60, False),
+    (10, 0, False),
+    (10 ** 8, -1, True),
+])
+def test_dnf_metadata_current(tmpdir, age, metadata_expire, expected):
+    repomd = tmpdir.join('repomd.xml')
+    repomd.write('metadata')
+    repomd.setmtime(repomd.mtime() - age)
+    assert aos_version._dnf_metadata_current(str(repomd), metadata_expire) == expected
+
+
+def test_dnf_metadata_current_without_cache():
+    assert not aos_version._dnf_metadata_current(None, -1)
@@ -0,0 +1,44 @@
+from check_timing_summary import check_timings, slowest_checks, slowest_checks_table, format_size
+
+
+def timing(duration, module_executions=1, module_output_bytes=100):
+    return dict(duration=duration, module_executions=module_executions, module_output_bytes=module_output_bytes)
+
+
+def test_check_timings():
+    checks = {
+        'disk_availability': dict(timing=timing(1.5)),
+        'docker_storage': dict(skipped=True, skipped_reason='Disabled by user request'),
+        'package_version': dict(cached=True),
+    }
+    assert check_timings('node1', checks) == [
+        dict(host='node1', check='disk_availability', duration=1.5, module_executions=1, module_output_bytes=100),
+    ]
+
+
+def test_slowest_checks():
+    timings = (
+        check_timings('master1', {'a': dict(timing=timing(1.0)), 'b': dict(timing=timing(30.0, 5, 2048))}) +
+        check_timings('node1', {'a': dict(timing=timing(4.0)), 'b': dict(timing=timing(2.0, 5, 2048))}) +
+        check_timings('node2', {'a': dict(timing=timing(3.0)), 'c': dict(timing=timing(0.1))})
+    )
+
+    summaries = slowest_checks(timings, limit=2)
+
+    assert [summary['check'] for summary in summaries] == ['b', 'a']
+    assert summaries[0] == dict(check='b', hosts=2, total=32.0, max=30.0, max_host='master1',
+                                module_executions=10, module_output_bytes=4096)
+    assert summaries[1]['hosts'] == 3
+    assert summaries[1]['max_host'] == 'node1'
+
+    table = slowest_checks_table(timings, limit=2).splitlines()
+    assert table[1] == 'Slowest health checks:'
+    assert table[3].split() == ['Check', 'Hosts', 'Total', 'Slowest', 'host', 'Modules', 'Output']
+    assert table[4].split() == ['b', '2', '32.0s', '30.0s', 'master1', '10', '4.0KiB']
+    assert len(table) == 6
+
+
+def test_format_size():
+    assert format_size(10) == '10B'
+    assert format_size(1536) == '1.5KiB'
+    assert format_size(3 * 1024 ** 3) == '3.0GiB'
@@ -0,0 +1,57 @@
+import gzip
+
+import collect_files
+
+
+def read_gzip(path):
+    infile = gzip.open(str(path), 'rb')
+    try:
+        return infile.read()
+    finally:
+        infile.close()
+
+
+def test_collect_file(tmpdir):
+    src = tmpdir.join('master-config.yaml')
+    src.write_binary(b'kind: MasterConfig\n' * 10000)
+    dest = tmpdir.join('0.gz')
+
+    result = collect_files.collect_file(str(src), str(dest))
+
+    assert 'error' not in result
+    assert not result['truncated']
+    assert result['size'] == 190000
+    assert result['compressed_size'] < result['size']
+    assert read_gzip(dest) == src.read_binary()
+
+
+def test_collect_file_truncated(tmpdir, monkeypatch):
+    monkeypatch.setattr(collect_files, 'CHUNK_SIZE', 7)  # several chunks on each side
+    src = tmpdir.join('journal')
+    src.write_binary(b'a' * 30 + b'b' * 40 + b'c' * 30)
+    dest = tmpdir.join('0.gz')
+
+    result = collect_files.collect_file(str(src), str(dest), max_size=60)
+
+    assert result['truncated']
+    assert read_gzip(dest) == b'a' * 30 + b'\n[... 40 bytes truncated ...]\n' + b'c' * 30
+
+
+def test_collect_file_missing(tmpdir):
+    result = collect_files.collect_file(str(tmpdir.join('missing')), str(tmpdir.join('0.gz')))
+    assert 'No such file' in result['error']
+
+
+def test_collect_files(tmpdir):
+    dest_dir = tmpdir.mkdir('dest')
+    files = []
+    for i in range(5):
+        src = tmpdir.join('file%d' % i)
+        src.write('content %d' % i)
+        files.append(dict(src=str(src), name='saved%d' % i))
+
+    results = collect_files.collect_files(files, str(dest_dir), 0, 2)
+
+    assert [result['name'] for result in results] == ['saved%d' % i for i in range(5)]
+    assert [read_gzip(result['dest']) for result in results] == [b'content %d' % i for i in range(5)]
+    assert collect_files.collect_files([], str(dest_dir), 0, 2) == []
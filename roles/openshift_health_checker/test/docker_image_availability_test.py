@@ -1,6 +1,23 @@
+import re
+
 import pytest
 
 from openshift_checks.docker_image_availability import DockerImageAvailability, DEPLOYMENT_IMAGE_INFO
+from openshift_checks.docker_image_availability import SharedProbeCache
+
+
+@pytest.fixture(autouse=True)
+def probe_cache(tmpdir, monkeypatch):
+    """Keep results shared between checks from leaking across tests."""
+    directory = str(tmpdir.join("probe_cache"))
+    monkeypatch.setattr(SharedProbeCache, "default_directory", staticmethod(lambda: directory))
+    return directory
+
+
+def skopeo_result(module_args, rc=0, failed=False):
+    """Return the result of the batched skopeo command with every probe exiting with rc."""
+    indices = re.findall(r"echo (\d+) \$\?", module_args["_raw_params"])
+    return dict(stdout="\n".join("{} {}".format(index, rc) for index in indices), failed=failed)
 
 
 @pytest.fixture()
@@ -60,9 +77,11 @@ def test_all_images_available_locally(task_vars, openshift_is_atomic):
     True,
 ])
 def test_all_images_available_remotely(task_vars, available_locally):
-    def execute_module(module_name, *_):
+    def execute_module(module_name, module_args, *_):
         if module_name == 'docker_image_facts':
             return {'images': [], 'failed': available_locally}
+        elif module_name == 'command':
+            return skopeo_result(module_args)
         return {}
 
     task_vars['openshift_docker_additional_registries'] = ["docker.io", "registry.redhat.io"]
@@ -149,11 +168,11 @@ def test_skopeo_update_failure(task_vars, message, extra_words):
     ])
 def test_registry_availability(image, registries, connection_test_failed, skopeo_failed,
                                expect_success, expect_registries_reached):
-    def execute_module(module_name=None, *_):
+    def execute_module(module_name=None, module_args=None, *_):
         if module_name == "wait_for":
             return dict(msg="msg", failed=connection_test_failed)
         elif module_name == "command":
-            return dict(msg="msg", failed=skopeo_failed)
+            return skopeo_result(module_args, rc=1 if skopeo_failed else 0)
 
     tv = task_vars()
     tv.update({"openshift_docker_additional_registries": registries})
@@ -165,6 +184,67 @@ def test_registry_availability(image, registries, connection_test_failed, skopeo
     assert expect_registries_reached == check.reachable_registries
 
 
+@pytest.mark.parametrize("concurrency, expect_batches", [
+    (1, 9),
+    (4, 3),
+    (10, 1),
+])
+def test_skopeo_probes_batched(task_vars, concurrency, expect_batches):
+    commands = []
+
+    def execute_module(module_name=None, module_args=None, *_):
+        if module_name == "command":
+            commands.append(module_args["_raw_params"])
+            return skopeo_result(module_args, rc=1)
+        return {}
+
+    task_vars["openshift_docker_additional_registries"] = ["one.reg", "two.reg"]
+    task_vars["openshift_check_skopeo_concurrency"] = concurrency
+    check = DockerImageAvailability(execute_module, task_vars)
+
+    assert check.available_images(["spam/eggs:v1", "spam/ham:v1", "spam/bacon:v1"]) == []
+    # all pairs of 3 images and 3 registries (incl. docker.io for origin) in one remote command
+    assert len(commands) == 1
+    assert commands[0].count("skopeo inspect") == 9
+    assert commands[0].count("wait") == expect_batches
+
+
+def test_skopeo_probe_results_shared(task_vars, probe_cache):
+    probed = []
+
+    def execute_module(module_name=None, module_args=None, *_):
+        if module_name == "command":
+            probed.append(module_args["_raw_params"])
+            return skopeo_result(module_args, rc=0)
+        return {}
+
+    task_vars["openshift_docker_additional_registries"] = ["one.reg"]
+    images = ["spam/eggs:v1", "spam/ham:v1"]
+
+    first_host = DockerImageAvailability(execute_module, task_vars)
+    assert sorted(first_host.available_images(images)) == images
+    assert len(probed) == 1
+
+    # another host targeting the same registry does not need to probe again
+    other_host = DockerImageAvailability(execute_module, task_vars)
+    assert sorted(other_host.available_images(images)) == images
+    assert len(probed) == 1
+    assert other_host.reachable_registries == {"one.reg": True}
+
+
+def test_skopeo_probe_timeout_marks_unreachable(task_vars):
+    def execute_module(module_name=None, module_args=None, *_):
+        if module_name == "command":
+            return skopeo_result(module_args, rc=124)
+        return {}
+
+    task_vars["openshift_docker_additional_registries"] = ["slow.reg"]
+    check = DockerImageAvailability(execute_module, task_vars)
+
+    assert check.available_images(["spam/eggs:v1"]) == []
+    assert check.reachable_registries == {"slow.reg": False, "docker.io": False}
+
+
 @pytest.mark.parametrize("deployment_type, openshift_is_atomic, groups, oreg_url, expected", [
     (  # standard set of stuff required on nodes
         "origin", False, ['oo_nodes_to_config'], "docker.io/openshift/origin-${component}:${version}",
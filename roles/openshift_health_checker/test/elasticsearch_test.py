@@ -1,5 +1,6 @@
 import pytest
 import json
+import re
 
 from openshift_checks.logging.elasticsearch import Elasticsearch, OpenShiftCheckExceptionList
 
@@ -84,11 +85,74 @@ def test_check_elasticsearch():
         else:
             raise Exception(cmd)
 
-    check = canned_elasticsearch({}, exec_oc)
+    check = canned_elasticsearch(dict(openshift_check_efk_es_batch=False), exec_oc)
     check.get_pods_for_component = lambda *_: [plain_es_pod]
     assert {} == check.run()
 
 
+def fake_diagnostics_output(cmd, responses):
+    """Return what the batched diagnostics command would output, given responses to each query."""
+    marker = Elasticsearch.diagnostics_marker
+    output = []
+    for query in re.findall(re.escape(marker) + r"(\w+)", cmd):
+        output.append(marker + query)
+        output.append(responses[query])
+    return "\n".join(output) + "\n"
+
+
+def test_check_elasticsearch_batched():
+    responses = dict(
+        master='name logging-es\n',
+        nodes=json.dumps(es_node_list),
+        health='{\n  "status" : "green"\n}\n',
+        df='IUse% Use%\n 3%  4%\n',
+    )
+    batches = []
+
+    def exec_oc_batch(cmds, concurrency, **_):
+        batches.append((cmds, concurrency))
+        return [fake_diagnostics_output(cmd, responses) for cmd in cmds]
+
+    def exec_oc(*_, **__):
+        raise AssertionError("every query should be answered by the batch")
+
+    check = canned_elasticsearch(dict(openshift_check_efk_es_concurrency=12), exec_oc)
+    check.exec_oc_batch = exec_oc_batch
+    check.get_pods_for_component = lambda *_: [plain_es_pod]
+    assert {} == check.run()
+
+    assert len(batches) == 1
+    cmds, concurrency = batches[0]
+    assert concurrency == 12
+    assert len(cmds) == 1  # one exec per pod
+    assert cmds[0].startswith("-c elasticsearch exec logging-es -- sh -c ")
+    assert check.diagnostics["logging-es"]["df"] == 'IUse% Use%\n 3%  4%'
+
+
+def test_check_elasticsearch_batched_errors():
+    pods = [plain_es_pod, split_es_pod]
+    responses = {
+        "logging-es": dict(master='name logging-es', nodes=json.dumps(es_node_list),
+                           health='{"status": "red"}', df='IUse% Use%\n 3%  4%'),
+        "logging-es-2": dict(master='name logging-es-2', nodes=json.dumps(es_node_list),
+                             health='{"status": "green"}', df='garbage'),
+    }
+
+    def exec_oc_batch(cmds, *_, **__):
+        return [
+            fake_diagnostics_output(cmd, responses[re.search(r"exec (\S+)", cmd).group(1)])
+            for cmd in cmds
+        ]
+
+    check = canned_elasticsearch(task_vars_config_base)
+    check.exec_oc_batch = exec_oc_batch
+    check.get_pods_for_component = lambda *_: pods
+    with pytest.raises(OpenShiftCheckExceptionList) as excinfo:
+        check.run()
+    for error in ['SplitBrainMasters', 'EsClusterHealthRed', 'BadDfResponse']:
+        assert_error_in_list(error, excinfo.value)
+
+
 def test_check_running_es_pods():
     pods, errors = Elasticsearch().running_elasticsearch_pods([plain_es_pod, unready_es_pod])
     assert plain_es_pod in pods
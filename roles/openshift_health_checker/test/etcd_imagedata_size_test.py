@@ -1,9 +1,11 @@
+import copy
 import pytest
 
 from collections import namedtuple
 from openshift_checks.etcd_imagedata_size import EtcdImageDataSize
 from openshift_checks import OpenShiftCheckException
-from etcdkeysize import check_etcd_key_size
+import etcdkeysize
+from etcdkeysize import check_etcd_key_size, check_etcd_key_size_recursive, check_etcd3_key_size
 
 
 def fake_etcd_client(root):
@@ -44,6 +46,46 @@ def fake_etcd_node(node, visited):
     return nodeinst
 
 
+class FakeEtcdRecursiveClient(object):
+    """In-memory etcd v2 tree whose recursive reads return every leaf below the key."""
+
+    resultclass = namedtuple("result", ["leaves"])
+
+    def __init__(self, root):
+        self.nodes = dict()
+        fake_etcd_node(copy.deepcopy(root), self.nodes)
+        self.reads = 0
+
+    def read(self, key, recursive):
+        assert recursive
+        self.reads += 1
+        prefix = key.rstrip("/") + "/"
+        return self.resultclass([
+            node for node_key, node in sorted(self.nodes.items())
+            if not node.dir and (node_key == key or node_key.startswith(prefix))
+        ])
+
+
+class FakeEtcd3Client(object):
+    """In-memory etcd v3 key-value store supporting paged range reads."""
+
+    metadataclass = namedtuple("metadata", ["key", "response_header"])
+    headerclass = namedtuple("header", ["revision"])
+
+    def __init__(self, data, revision=7):
+        self.data = dict((key.encode("utf-8"), value.encode("utf-8")) for key, value in data.items())
+        self.revision = revision
+        self.requests = []
+
+    def get_range(self, range_start, range_end, limit=None, sort_order=None, revision=None):
+        self.requests.append(dict(start=range_start, end=range_end, limit=limit, revision=revision))
+        assert sort_order == "ascend"
+        assert revision in (None, self.revision)
+        keys = sorted(key for key in self.data if range_start <= key < range_end)
+        for key in keys[:limit]:
+            yield self.data[key], self.metadataclass(key, self.headerclass(self.revision))
+
+
 @pytest.mark.parametrize('ansible_mounts,extra_words', [
     ([], ['none']),  # empty ansible_mounts
     ([{'mount': '/mnt'}], ['/mnt']),  # missing relevant mount paths
@@ -327,3 +369,121 @@ def test_etcdkeysize_module_failure():
 
 def fake_execute_module(*args):
     raise AssertionError('this function should not be called')
+
+
+ETCD_TREE = {
+    "dir": True,
+    "key": "/",
+    "leaves": [
+        {"dir": False, "key": "/foo1", "value": "1234567890"},
+        {
+            "dir": True,
+            "key": "/openshift.io",
+            "leaves": [
+                {"dir": False, "key": "/openshift.io/images/sha256:1", "value": "12345"},
+                {"dir": False, "key": "/openshift.io/images/sha256:2", "value": "123"},
+                {"dir": False, "key": "/openshift.io/imagestreams/ns/is", "value": "1"},
+            ],
+        },
+    ],
+}
+
+
+@pytest.mark.parametrize('root_path, size_limit, expected_size, expected_exceeded', [
+    ("/", 0, 19, False),
+    ("/openshift.io", 100, 9, False),
+    ("/openshift.io", 4, 5, True),  # stops at the first leaf over the limit
+    ("/openshift.io/images", 0, 8, False),
+    ("/missing", 10, 0, False),
+])
+def test_check_etcd_key_size_recursive(root_path, size_limit, expected_size, expected_exceeded):
+    client = FakeEtcdRecursiveClient(ETCD_TREE)
+    size, exceeded = check_etcd_key_size_recursive(client, root_path, size_limit)
+
+    assert (size, exceeded) == (expected_size, expected_exceeded)
+    assert client.reads == 1
+
+
+ETCD3_DATA = {
+    "/foo1": "1234567890",
+    "/openshift.io/images/sha256:1": "12345",
+    "/openshift.io/images/sha256:2": "123",
+    "/openshift.io/images/sha256:3": "1",
+    "/openshift.io/imagestreams/ns/is": "12",
+}
+
+
+@pytest.mark.parametrize('prefix, size_limit, page_size, expected_size, expected_exceeded, expected_requests', [
+    ("/openshift.io/images", 0, 1000, 9, False, 1),
+    ("/openshift.io/images/", 0, 1000, 9, False, 1),
+    ("/openshift.io", 0, 1000, 11, False, 1),
+    ("/openshift.io/images", 0, 2, 9, False, 2),
+    ("/openshift.io/images", 0, 3, 9, False, 2),  # full last page needs one more request to see the end
+    ("/openshift.io/images", 0, 1, 9, False, 4),
+    ("/openshift.io/images", 6, 1, 8, True, 2),  # stops reading once over the limit
+    ("/missing", 10, 10, 0, False, 1),
+])
+def test_check_etcd3_key_size(prefix, size_limit, page_size, expected_size, expected_exceeded, expected_requests):
+    client = FakeEtcd3Client(ETCD3_DATA)
+    size, exceeded = check_etcd3_key_size(client, prefix, size_limit, page_size)
+
+    assert (size, exceeded) == (expected_size, expected_exceeded)
+    assert len(client.requests) == expected_requests
+    # every page after the first reads at the revision of the first
+    assert all(request["revision"] == client.revision for request in client.requests[1:])
+
+
+def test_etcd3_api_version_passed_to_module():
+    def execute_module(module_name, module_args, *_):
+        assert module_args["api_version"] == "v3"
+        return {"size_limit_exceeded": False}
+
+    task_vars = dict(
+        ansible_mounts=[{'mount': '/', 'size_available': 40 * 10**9, 'size_total': 80 * 10**9}],
+        openshift=dict(common=dict(config_base="/var/lib/origin")),
+        openshift_master_etcd_hosts=["localhost"],
+        openshift_check_etcd_api_version="v3",
+    )
+    assert not EtcdImageDataSize(execute_module, task_vars).run().get("failed")
+
+    task_vars["openshift_check_etcd_api_version"] = "v4"
+    with pytest.raises(OpenShiftCheckException) as excinfo:
+        EtcdImageDataSize(execute_module, task_vars).run()
+    assert "openshift_check_etcd_api_version" in str(excinfo.value)
+
+
+@pytest.mark.parametrize('protocol, expected_cert', [
+    ('https', dict(ca_cert='/etc/etcd/ca.crt', cert_cert='/etc/etcd/client.crt', cert_key='/etc/etcd/client.key')),
+    ('http', dict(ca_cert=None, cert_cert=None, cert_key=None)),
+])
+def test_etcd_clients_from_check_args(monkeypatch, protocol, expected_cert):
+    module_args = {}
+
+    def execute_module(module_name, args, *_):
+        module_args.update(args)
+        return {"size_limit_exceeded": False}
+
+    task_vars = dict(
+        ansible_mounts=[{'mount': '/', 'size_available': 40 * 10**9, 'size_total': 80 * 10**9}],
+        openshift=dict(common=dict(config_base="/var/lib/origin")),
+        openshift_master_etcd_hosts=["localhost"],
+        openshift_master_etcd_port=2379,
+        openshift_check_etcd_api_version="v3",
+        etcd_client_cert="/etc/etcd/client.crt",
+        etcd_client_key="/etc/etcd/client.key",
+        etcd_client_ca_cert="/etc/etcd/ca.crt",
+    )
+    EtcdImageDataSize(execute_module, task_vars).run()
+    module_args["protocol"] = protocol
+    # what AnsibleModule leaves in params once the module's own options are popped
+    params = dict((key, value) for key, value in module_args.items()
+                  if key not in ("size_limit_bytes", "paths", "api_version", "walk", "page_size"))
+
+    clients = []
+    monkeypatch.setattr(etcdkeysize, "etcd3", namedtuple("etcd3", ["client"])(lambda **kwargs: kwargs), raising=False)
+    monkeypatch.setattr(etcdkeysize, "etcd", namedtuple("etcd", ["Client"])(lambda **kwargs: clients.append(kwargs)))
+
+    assert etcdkeysize.etcd3_client(params) == dict(expected_cert, host="localhost", port=2379)
+    etcdkeysize.etcd_client(params)
+    assert clients[0]["cert"] == ("/etc/etcd/client.crt", "/etc/etcd/client.key")
+    assert module_args["cert"] == {"cert": "/etc/etcd/client.crt", "key": "/etc/etcd/client.key"}
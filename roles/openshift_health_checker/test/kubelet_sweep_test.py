@@ -0,0 +1,78 @@
+import socket
+
+import kubelet_sweep
+
+
+class FakeSocket(object):
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def fake_connect(failing_addresses=()):
+    connections = []
+
+    def connect(address, timeout):
+        connections.append((address, timeout))
+        if address[0] in failing_addresses:
+            raise socket.timeout('timed out')
+        return FakeSocket()
+
+    return connect, connections
+
+
+def test_resolve_address_is_cached(monkeypatch):
+    lookups = []
+
+    def getaddrinfo(host, *_):
+        lookups.append(host)
+        if host == 'unknown':
+            raise socket.gaierror('Name or service not known')
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, '', ('10.0.0.1', 0))]
+
+    monkeypatch.setattr(socket, 'getaddrinfo', getaddrinfo)
+    cache = {}
+
+    assert kubelet_sweep.resolve_address('node1', cache) == '10.0.0.1'
+    assert kubelet_sweep.resolve_address('node1', cache) == '10.0.0.1'
+    assert kubelet_sweep.resolve_address('unknown', cache) is None
+    assert kubelet_sweep.resolve_address('unknown', cache) is None
+    assert lookups == ['node1', 'unknown']
+
+
+def test_probe_kubelet():
+    connect, connections = fake_connect(failing_addresses=['10.0.0.2'])
+    cache = {'node1': '10.0.0.1', 'node2': '10.0.0.2', 'node3': None}
+
+    result = kubelet_sweep.probe_kubelet(dict(name='n1', address='node1'), 10250, 3, False, cache, connect)
+    assert result['resolved'] == '10.0.0.1'
+    assert 'error' not in result
+    assert result['latency_ms'] >= 0
+
+    result = kubelet_sweep.probe_kubelet(dict(name='n2', address='node2'), 10250, 3, False, cache, connect)
+    assert result['error'] == 'timed out'
+    assert 'latency_ms' in result
+
+    result = kubelet_sweep.probe_kubelet(dict(name='n3', address='node3'), 10250, 3, False, cache, connect)
+    assert result['error'] == 'Cannot resolve node node3'
+    assert 'latency_ms' not in result
+
+    assert connections == [(('10.0.0.1', 10250), 3), (('10.0.0.2', 10250), 3)]
+
+
+def test_sweep_kubelets(monkeypatch):
+    probed = []
+
+    def probe_kubelet(node, port, timeout, use_tls, cache):
+        probed.append(node['name'])
+        return dict(name=node['name'], port=port)
+
+    monkeypatch.setattr(kubelet_sweep, 'probe_kubelet', probe_kubelet)
+    nodes = [dict(name='node%d' % i, address='10.0.0.%d' % i) for i in range(10)]
+
+    results = kubelet_sweep.sweep_kubelets(nodes, 10250, 1, True, 4)
+
+    assert [result['name'] for result in results] == [node['name'] for node in nodes]
+    assert sorted(probed) == sorted(node['name'] for node in nodes)
+    assert kubelet_sweep.sweep_kubelets([], 10250, 1, True, 4) == []
@@ -98,6 +98,35 @@ def test_oc_failure(problem, expect):
     assert expect in str(excinfo)
 
 
+@pytest.mark.parametrize('problem, expect', [
+    ("[Errno 2] No such file or directory", "supposed to be a master"),
+    ("Permission denied", "Error executing `oc get bar`"),
+])
+def test_oc_batch_failure(problem, expect):
+    def execute_module(module_name, module_args, *_):
+        assert module_name == "ocutil"
+        assert module_args["cmds"] == ["get foo", "get bar"]
+        return dict(results=[
+            dict(cmd="get foo", failed=False, result="foo"),
+            dict(cmd="get bar", failed=True, result=problem),
+        ])
+
+    check = LoggingCheck(execute_module, task_vars_config_base)
+
+    with pytest.raises(CouldNotUseOc) as excinfo:
+        check.exec_oc_batch(['get foo', 'get bar'])
+    assert expect in str(excinfo.value)
+
+
+def test_oc_batch():
+    def execute_module(module_name, module_args, *_):
+        assert module_args["concurrency"] == 2
+        return dict(results=[dict(cmd=cmd, failed=False, result=cmd + " output") for cmd in module_args["cmds"]])
+
+    check = LoggingCheck(execute_module, task_vars_config_base)
+    assert check.exec_oc_batch(['get foo', 'get bar'], 2) == ['get foo output', 'get bar output']
+
+
 groups_with_first_master = dict(oo_first_master=['this-host'])
 groups_not_a_master = dict(oo_first_master=['other-host'], oo_masters=['other-host'])
 
@@ -164,3 +193,21 @@ def test_get_not_running_pods_no_container_status(name, pods, expected_pods):
     result = check.not_running_pods(pods)
 
     assert result == expected_pods
+
+
+def test_pods_shared_between_checks():
+    commands = []
+
+    def exec_oc(cmd, *_):
+        commands.append(cmd)
+        return json.dumps({'items': [plain_es_pod, plain_kibana_pod]})
+
+    es_check = canned_loggingcheck(exec_oc)
+    kibana_check = LoggingCheck(None, snapshot=es_check.snapshot)
+    kibana_check.exec_oc = exec_oc
+
+    assert es_check.get_pods_for_component("es") == [plain_es_pod]
+    assert kibana_check.get_pods_for_component("kibana") == [plain_kibana_pod]
+    with pytest.raises(MissingComponentPods):
+        kibana_check.get_pods_for_component("curator")
+    assert commands == ["get pods -o json"]
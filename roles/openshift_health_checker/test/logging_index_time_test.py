@@ -2,6 +2,7 @@ import json
 
 import pytest
 
+from openshift_checks.logging import logging_index_time
 from openshift_checks.logging.logging_index_time import LoggingIndexTime, OpenShiftCheckException
 
 
@@ -168,3 +169,69 @@ def test_failed_curl_kibana_with_uuid(name, json_response, expect_error):
         check.curl_kibana_with_uuid(plain_running_kibana_pod)
 
     assert expect_error == error.value.name
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_benchmark(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(logging_index_time, 'time', clock)
+    markers = ['%032x' % i for i in range(4)]
+    injected = {}
+    queries = []
+
+    def exec_oc(cmd, *_, **__):
+        if '-c kibana' in cmd:
+            for marker in markers:
+                if marker in cmd:
+                    injected[marker] = clock.now
+            return ''
+        queries.append(cmd)
+        # every marker but the last becomes searchable a second after it was sent
+        visible = [marker for marker, sent in injected.items() if marker != markers[-1] and clock.now >= sent + 1]
+        return json.dumps({'hits': {'hits': [
+            {'_source': {'message': 'GET /%s 404' % marker}} for marker in visible
+        ]}})
+
+    check = LoggingIndexTime(task_vars=dict(
+        openshift_check_logging_index_benchmark_markers=4,
+        openshift_check_logging_index_benchmark_rate=2,
+        openshift_check_logging_index_timeout_seconds=10,
+    ))
+    check.exec_oc = exec_oc
+    check.get_pods_for_component = lambda *_: [plain_running_kibana_pod, plain_running_elasticsearch_pod]
+    marker_iter = iter(markers)
+    check.generate_marker = lambda: next(marker_iter)
+
+    result = check.run()
+
+    assert sorted(injected.values()) == [1000.0, 1000.5, 1001.0, 1001.5]
+    assert '"terms": {"message": [' in queries[0]
+    benchmark = result['benchmark']
+    assert benchmark['indexed'] == 3
+    assert benchmark['lost'] == 1
+    assert benchmark['loss_rate'] == 0.25
+    assert 1 <= benchmark['latency_seconds']['p50'] <= benchmark['latency_seconds']['max'] < 2
+    assert clock.now >= 1001.5 + 10, 'should wait for lost markers until the timeout'
+    assert [failure.name for failure in check.failures] == ['MarkersLost']
+    assert check.files_to_save[0].filename == 'logging_index_time_benchmark.json'
+    assert check.files_to_save[0].contents['latencies'][-1] is None
+
+
+def test_benchmark_report():
+    report = LoggingIndexTime.benchmark_report(5, 1.0, [0.5, None, 2.0, 1.0, 3.0])
+    assert report['indexed'] == 4
+    assert report['loss_rate'] == 0.2
+    assert report['latency_seconds'] == dict(p50=1.0, p90=3.0, p99=3.0, max=3.0)
+
+    assert LoggingIndexTime.benchmark_report(2, 1.0, [None, None])['latency_seconds'] is None
+    assert LoggingIndexTime.percentile(list(range(1, 101)), 90) == 90
@@ -1,7 +1,7 @@
 import pytest
 
 from openshift_checks import OpenShiftCheck, OpenShiftCheckException
-from openshift_checks.mixins import NotContainerizedMixin
+from openshift_checks.mixins import NotContainerizedMixin, PackageRepoFingerprintMixin
 
 
 class NotContainerizedCheck(NotContainerizedMixin, OpenShiftCheck):
@@ -9,6 +9,12 @@ class NotContainerizedCheck(NotContainerizedMixin, OpenShiftCheck):
     run = NotImplemented
 
 
+class RepoFingerprintCheck(PackageRepoFingerprintMixin, OpenShiftCheck):
+    name = "repo_fingerprint"
+    run = NotImplemented
+    fingerprint_vars = ("openshift_release",)
+
+
 @pytest.mark.parametrize('task_vars,expected', [
     (dict(openshift_is_atomic=False), True),
     (dict(openshift_is_atomic=True), False),
@@ -21,3 +27,21 @@ def test_is_active_missing_task_vars():
     with pytest.raises(OpenShiftCheckException) as excinfo:
         NotContainerizedCheck().is_active()
     assert 'openshift_is_atomic' in str(excinfo.value)
+
+
+def test_repo_fingerprint_follows_metadata():
+    probe = dict(rc=0, stdout="abc  /var/cache/yum/x86_64/7/base/repomd.xml")
+
+    def execute_module(module_name, *_):
+        assert module_name == "command"
+        return dict(probe)
+
+    check = RepoFingerprintCheck(execute_module, dict(openshift_release="3.11"))
+    fingerprint = check.fingerprint()
+    probe["stdout"] = "def  /var/cache/yum/x86_64/7/base/repomd.xml"
+    assert check.fingerprint() != fingerprint
+
+    probe.update(rc=1, msg="find failed")
+    with pytest.raises(OpenShiftCheckException) as excinfo:
+        check.fingerprint()
+    assert "find failed" in str(excinfo.value)
@@ -143,3 +143,44 @@ def test_register(task_vars):
     check._execute_module = lambda *args, **_: dict()
     check.execute_module("eggs", module_args={}, register=False)
     assert not check.files_to_save
+
+
+def test_execute_module_accounting(task_vars):
+    check = dummy_check(task_vars)
+    check._execute_module = lambda *args, **_: dict(stdout="x" * 100, stdout_lines=["x" * 100], rc=0)
+
+    check.execute_module("spam", module_args={})
+    check.execute_module("eggs", module_args={}, register=False)
+
+    assert [call["module"] for call in check.module_calls] == ["spam", "eggs"]
+    assert all(call["seconds"] >= 0 for call in check.module_calls)
+    assert check.module_calls[0]["output_bytes"] == 200
+
+
+def test_execute_module_accounting_nested_output(task_vars):
+    check = dummy_check(task_vars)
+    # batched modules return their output in lists of dicts
+    check._execute_module = lambda *args, **_: dict(results=[
+        dict(host="node1", stdout="x" * 100, rc=0),
+        dict(host="node2", stdout="y" * 50, lines=["z" * 10]),
+    ], changed=False)
+
+    check.execute_module("ocutil", module_args={}, register=False)
+
+    assert check.module_calls[0]["output_bytes"] == len("node1") + 100 + len("node2") + 50 + 10
+
+
+def test_fingerprint(task_vars):
+    check = dummy_check(task_vars)
+    assert check.fingerprint() is None  # no inputs declared, not cacheable
+
+    check.fingerprint_vars = ("foo", "bar.baz", "notfound")
+    fingerprint = check.fingerprint()
+    assert fingerprint and fingerprint == check.fingerprint()
+
+    task_vars["bar"]["baz"] = "origin"
+    assert check.fingerprint() != fingerprint
+
+    task_vars["bar"]["baz"] = "openshift"
+    check.fingerprint_probe = lambda: "repo metadata changed"
+    assert check.fingerprint() != fingerprint
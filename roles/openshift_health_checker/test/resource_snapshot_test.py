@@ -0,0 +1,73 @@
+import pytest
+
+from openshift_checks.resource_snapshot import ResourceSnapshot
+
+
+def node(name, address, hostname=None):
+    return {
+        'metadata': {'name': name, 'labels': {'kubernetes.io/hostname': hostname or name}},
+        'status': {'addresses': [{'type': 'InternalIP', 'address': address}]},
+    }
+
+
+def pod(name, component, node_name):
+    return {
+        'metadata': {'name': name, 'labels': {'component': component}},
+        'spec': {'nodeName': node_name},
+    }
+
+
+def counting_fetch(items):
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return items
+
+    return fetch, calls
+
+
+def test_items_fetched_once():
+    snapshot = ResourceSnapshot()
+    fetch, calls = counting_fetch([node('node1', '10.0.0.1')])
+
+    assert not snapshot.has('nodes')
+    assert snapshot.items('nodes', fetch=fetch) == [node('node1', '10.0.0.1')]
+    assert snapshot.by_name('nodes', fetch=fetch) == {'node1': node('node1', '10.0.0.1')}
+    assert snapshot.by_address(fetch=fetch) == {'10.0.0.1': node('node1', '10.0.0.1')}
+    assert snapshot.has('nodes')
+    assert len(calls) == 1
+
+
+def test_items_keyed_by_namespace():
+    snapshot = ResourceSnapshot()
+    snapshot.add('pods', [pod('es', 'es', 'node1')], 'logging')
+
+    assert snapshot.items('pods', 'logging') == [pod('es', 'es', 'node1')]
+    with pytest.raises(KeyError):
+        snapshot.items('pods')
+
+
+def test_failed_fetch_not_recorded():
+    snapshot = ResourceSnapshot()
+
+    def fetch():
+        raise ValueError('not json')
+
+    with pytest.raises(ValueError):
+        snapshot.items('nodes', fetch=fetch)
+    assert not snapshot.has('nodes')
+
+
+def test_indexes():
+    pods = [pod('es', 'es', 'node1'), pod('fluentd-1', 'fluentd', 'node1'), pod('fluentd-2', 'fluentd', 'node2')]
+    snapshot = ResourceSnapshot()
+    snapshot.add('pods', pods, 'logging')
+
+    assert snapshot.by_label('pods', 'component', 'fluentd', 'logging') == pods[1:]
+    assert snapshot.by_label('pods', 'component', 'kibana', 'logging') == []
+    assert snapshot.by_node(namespace='logging') == {'node1': pods[:2], 'node2': pods[2:]}
+
+    # indexes follow the items when they are replaced
+    snapshot.add('pods', pods[:1], 'logging')
+    assert snapshot.by_label('pods', 'component', 'fluentd', 'logging') == []
@@ -0,0 +1,62 @@
+import sdn_mesh_probe
+
+
+TRACE_OUTPUT = '''Bridge: br0
+Flow: ip,in_port=2,nw_src=10.128.0.1,nw_dst=10.129.0.1
+
+Final flow: unchanged
+Datapath actions: set(tunnel(tun_id=0x0,dst=172.31.50.2)),1
+'''
+
+
+def fake_run(failing_addresses=()):
+    commands = []
+
+    def run(command):
+        commands.append(command)
+        if any(address in command[-1] for address in failing_addresses):
+            return 1, 'failure'
+        if 'ofproto/trace' in command:
+            return 0, TRACE_OUTPUT
+        return 0, 'pong'
+
+    return run, commands
+
+
+def test_probe_peer():
+    run, commands = fake_run()
+    peer = dict(name='node1', address='10.129.0.1')
+
+    result = sdn_mesh_probe.probe_peer(peer, '10.128.0.1', ['/bin/docker', 'exec', 'ovs'], 2, True, False, run)
+
+    assert result == dict(
+        name='node1', address='10.129.0.1', trace_rc=0,
+        trace_summary='Datapath actions: set(tunnel(tun_id=0x0,dst=172.31.50.2)),1',
+        ping=True,
+    )
+    assert commands[0][:3] == ['/bin/docker', 'exec', 'ovs']
+    assert commands[0][-1] == 'in_port=2,reg0=0,ip,nw_src=10.128.0.1,nw_dst=10.129.0.1'
+    assert commands[1] == ['/bin/ping', '-c', '1', '-W', '2', '10.129.0.1']
+
+
+def test_probe_peer_failure_keeps_output():
+    run, _ = fake_run(failing_addresses=['10.129.0.1'])
+    peer = dict(name='node1', address='10.129.0.1')
+
+    result = sdn_mesh_probe.probe_peer(peer, '10.128.0.1', [], 2, True, False, run)
+
+    assert result['trace_rc'] == 1 and result['trace'] == 'failure'
+    assert not result['ping'] and result['ping_output'] == 'failure'
+
+
+def test_probe_peers_in_order(monkeypatch):
+    run, commands = fake_run(failing_addresses=['10.130.0.1'])
+    monkeypatch.setattr(sdn_mesh_probe, 'run_command', run)
+    peers = [dict(name='node%d' % i, address='10.%d.0.1' % (128 + i)) for i in range(1, 5)]
+
+    results = sdn_mesh_probe.probe_peers(peers, '10.128.0.1', [], 3, 2, False, False)
+
+    assert [result['name'] for result in results] == ['node1', 'node2', 'node3', 'node4']
+    assert [result['ping'] for result in results] == [True, False, True, True]
+    assert len(commands) == 4  # ping only
+    assert sdn_mesh_probe.probe_peers([], '10.128.0.1', [], 3, 2, True, False) == []
@@ -1,4 +1,6 @@
+import ipaddress
 import pytest
+from ansible.module_utils import six
 from openshift_checks.sdn import SDNCheck
 from openshift_checks import OpenShiftCheckException
 
@@ -19,52 +21,59 @@ def test_check_nodes_missing_node_name():
     assert 'Could not determine node name' in str(check.failures[0])
 
 
-def test_check_master():
-    nodes = [
-        {
-            'apiVersion': 'v1',
-            'kind': 'Node',
-            'metadata': {
-                'annotations': {'kubernetes.io/hostname': 'node1'},
-                'name': 'ip-172-31-50-1.ec2.internal'
-            },
-            'status': {
-                'addresses': [
-                    {'address': '172.31.50.1', 'type': 'InternalIP'},
-                    {'address': '52.0.0.1', 'type': 'ExternalIP'},
-                    {
-                        'address': 'ip-172-31-50-1.ec2.internal',
-                        'type': 'Hostname'
-                    }
-                ]
-            }
+MASTER_NODES = [
+    {
+        'apiVersion': 'v1',
+        'kind': 'Node',
+        'metadata': {
+            'annotations': {'kubernetes.io/hostname': 'node1'},
+            'name': 'ip-172-31-50-1.ec2.internal'
         },
-        {
-            'apiVersion': 'v1',
-            'kind': 'Node',
-            'metadata': {'name': 'ip-172-31-50-2.ec2.internal'},
-            'status': {
-                'addresses': [
-                    {'address': '172.31.50.2', 'type': 'InternalIP'},
-                    {'address': '52.0.0.2', 'type': 'ExternalIP'},
-                    {
-                        'address': 'ip-172-31-50-2.ec2.internal',
-                        'type': 'Hostname'
-                    }
-                ]
-            }
+        'status': {
+            'addresses': [
+                {'address': '172.31.50.1', 'type': 'InternalIP'},
+                {'address': '52.0.0.1', 'type': 'ExternalIP'},
+                {
+                    'address': 'ip-172-31-50-1.ec2.internal',
+                    'type': 'Hostname'
+                }
+            ]
         }
-    ]
+    },
+    {
+        'apiVersion': 'v1',
+        'kind': 'Node',
+        'metadata': {'name': 'ip-172-31-50-2.ec2.internal'},
+        'status': {
+            'addresses': [
+                {'address': '172.31.50.2', 'type': 'InternalIP'},
+                {'address': '52.0.0.2', 'type': 'ExternalIP'},
+                {
+                    'address': 'ip-172-31-50-2.ec2.internal',
+                    'type': 'Hostname'
+                }
+            ]
+        }
+    }
+]
 
-    task_vars = dict(
+
+def master_task_vars(nodes, **kwargs):
+    return dict(
         group_names=['oo_masters_to_config'],
         resources=dict(results=[
             dict(item='nodes', results=dict(results=[dict(items=nodes)])),
             dict(item='pods', results=dict(results=[dict(items={})])),
             dict(item='services', results=dict(results=[dict(items={})]))
-        ])
+        ]),
+        **kwargs
     )
 
+
+def test_check_master():
+    nodes = MASTER_NODES
+    task_vars = master_task_vars(nodes, openshift_check_sdn_kubelet_sweep=False)
+
     node_addresses = {
         node['metadata']['name']: {
             address['type']: address['address']
@@ -103,6 +112,36 @@ def test_check_master():
     assert set(expected_hostnames) == set(resolve_address_hostnames), 'should try to resolve the node\'s address'
 
 
+def test_check_master_kubelet_sweep():
+    sweeps = []
+
+    def execute_module(module_name, args, *_):
+        if module_name != 'kubelet_sweep':
+            raise ValueError('not expecting module %s' % module_name)
+        sweeps.append(args)
+        return dict(results=[
+            dict(name='ip-172-31-50-1.ec2.internal', address='ip-172-31-50-1.ec2.internal',
+                 resolved='172.31.50.1', latency_ms=12),
+            dict(name='ip-172-31-50-2.ec2.internal', address='ip-172-31-50-2.ec2.internal',
+                 resolved='172.31.50.9', latency_ms=3000, error='timed out'),
+        ])
+
+    check = SDNCheck(execute_module, master_task_vars(MASTER_NODES))
+    check.run()
+
+    assert len(sweeps) == 1  # all kubelets probed in one module execution
+    assert [node['address'] for node in sweeps[0]['nodes']] == [
+        'ip-172-31-50-1.ec2.internal', 'ip-172-31-50-2.ec2.internal']
+    assert [str(failure) for failure in check.failures] == [
+        'Node ip-172-31-50-2.ec2.internal: the IP address in OpenShift (172.31.50.2) does not match DNS/hosts (172.31.50.9)',
+        'Kubelet on node ip-172-31-50-2.ec2.internal is not responding: timed out',
+    ]
+    assert check.logs[-1][1] == [
+        dict(node='ip-172-31-50-2.ec2.internal', latency_ms=3000),
+        dict(node='ip-172-31-50-1.ec2.internal', latency_ms=12),
+    ]
+
+
 def test_check_nodes():
     nodes = [
         {
@@ -171,6 +210,62 @@ def test_check_nodes():
     SDNCheck(execute_module, task_vars).run()
 
 
+def mesh_task_vars(node_count, **extra):
+    nodes = [{'metadata': {'name': 'node%d' % i}} for i in range(node_count)]
+    hostsubnets = [{'metadata': {'name': 'node%d' % i},
+                    'subnet': '10.%d.%d.0/23' % (128 + i // 128, (i % 128) * 2)}
+                   for i in range(node_count)]
+    task_vars = dict(
+        group_names=['oo_nodes_to_config'],
+        resources=dict(results=[
+            dict(item='nodes', results=dict(results=[dict(items=nodes)])),
+            dict(item='hostsubnets', results=dict(results=[dict(items=hostsubnets)]))
+        ]),
+        openshift=dict(node=dict(nodename='node0')),
+        openshift_check_sdn_mesh_probe=True,
+    )
+    task_vars.update(extra)
+    return task_vars
+
+
+def test_check_nodes_mesh_probe():
+    probes = []
+
+    def execute_module(module_name, args, *_):
+        if module_name == 'command':
+            return dict(stdout='bogus_container_id\n')
+        if module_name == 'sdn_mesh_probe':
+            probes.append(args)
+            return dict(results=[
+                dict(name=peer['name'], address=peer['address'], trace_rc=0,
+                     ping=peer['name'] != 'node2')
+                for peer in args['peers']
+            ])
+        raise ValueError('not expecting module %s' % module_name)
+
+    check = SDNCheck(execute_module, mesh_task_vars(4))
+    check.run()
+
+    assert len(probes) == 1  # all peers probed in one module execution
+    assert probes[0]['source_address'] == '10.128.0.1'
+    assert [peer['name'] for peer in probes[0]['peers']] == ['node1', 'node2', 'node3']
+    assert probes[0]['exec_prefix'] == ['/bin/docker', 'exec', 'bogus_container_id']
+    assert [str(failure) for failure in check.failures] == ['Node node0 cannot ping node node2.']
+
+
+def test_sample_peers():
+    peers = [('node%d' % i, ipaddress.ip_network(six.text_type('10.%d.%d.0/23' % (128 + i // 128, (i % 128) * 2))))
+             for i in range(1, 512)]
+
+    sample = SDNCheck.sample_peers('node0', peers, 5)
+    # 5 random peers and at least one from each of the 4 /16 ranges
+    assert 5 <= len(sample) <= 9
+    assert len(set(network.supernet(new_prefix=16) for _, network in sample)) == 4
+    assert sample == SDNCheck.sample_peers('node0', peers, 5), 'sampling should be stable'
+
+    assert SDNCheck.sample_peers('node0', peers[:3], 5) == peers[:3]
+
+
 def test_resolve_address():
     def execute_module(module_name, args, *_):
         if module_name != 'command':
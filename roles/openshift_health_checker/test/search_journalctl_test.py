@@ -82,7 +82,7 @@ def create_test_log_object(stamp, msg):
     ),
 ], ids=lambda argval: argval[0])
 def test_get_log_matches(name, matchers, log_input, expected_matches, expected_errors):
-    def get_log_output(matcher):
+    def get_log_output(unit, since_seconds):
         return log_input
 
     module = canned_search_journalctl(get_log_output)
@@ -155,3 +155,58 @@ def test_get_log_matches(name, matchers, log_input, expected_matches, expected_e
 def test_find_matches_skips_logs(name, matcher, log_count_lim, stamp_lim_seconds, log_input, expected_match):
     match = search_journalctl.find_matches(log_input, matcher, log_count_lim, stamp_lim_seconds)
     assert match == expected_match
+
+
+def test_get_log_matches_reads_each_unit_once(monkeypatch):
+    log_input = {
+        "etcd": [
+            create_test_log_object(get_timestamp_microseconds(), "etcd second message"),
+            create_test_log_object(get_timestamp_microseconds(), "etcd first message"),
+            create_test_log_object(get_timestamp_microseconds(), "etcd started"),
+            create_test_log_object(get_timestamp_microseconds(), "etcd first message from before restart"),
+        ],
+        "docker": [
+            create_test_log_object(get_timestamp_microseconds(), "docker message"),
+        ],
+    }
+    reads = []
+    lines_read = []
+
+    def get_log_output(unit, since_seconds):
+        reads.append((unit, since_seconds))
+        for line in log_input[unit]:
+            lines_read.append(line)
+            yield line
+
+    monkeypatch.setattr(search_journalctl, "get_log_output", get_log_output)
+    matchers = [
+        {"start_regexp": r"etcd started", "regexp": r"etcd first", "unit": "etcd"},
+        {"start_regexp": r"docker started", "regexp": r"nothing matches", "unit": "docker"},
+        {"start_regexp": r"etcd started", "regexp": r"etcd second", "unit": "etcd"},
+        {"start_regexp": r"etcd started", "regexp": r"etcd third", "unit": "etcd"},
+    ]
+    matched_regexp, errors = search_journalctl.get_log_matches(matchers, 500, get_timestamp(-60))
+
+    assert matched_regexp == [r"etcd first", r"etcd second"]
+    assert errors == []
+    assert reads == [("etcd", get_timestamp(-60)), ("docker", get_timestamp(-60))]
+    # all etcd matchers are resolved at the restart, so older entries are not read
+    assert len(lines_read) == 4
+
+
+def test_scan_log_stops_when_all_matchers_resolved():
+    matchers = [
+        search_journalctl.compile_matcher({"regexp": r"first", "start_regexp": r"start"}),
+        search_journalctl.compile_matcher({"regexp": r"second", "start_regexp": r"start"}),
+    ]
+    log_input = iter([
+        create_test_log_object(get_timestamp_microseconds(), "second"),
+        create_test_log_object(get_timestamp_microseconds(), "first"),
+        create_test_log_object(get_timestamp_microseconds(), "never read"),
+    ])
+
+    matched, error = search_journalctl.scan_log(log_input, matchers, 500, get_timestamp(-60))
+
+    assert error is None
+    assert all(matched)
+    assert "never read" in next(log_input)
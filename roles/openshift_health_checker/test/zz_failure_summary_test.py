@@ -1,4 +1,4 @@
-from zz_failure_summary import deduplicate_failures
+from zz_failure_summary import deduplicate_failures, format_failure, mask_message
 
 import pytest
 
@@ -14,6 +14,7 @@ import pytest
         [
             {
                 'host': ('master1',),
+                'host_count': 1,
                 'msg': 'One or more checks failed',
             },
         ],
@@ -32,6 +33,7 @@ import pytest
         [
             {
                 'host': ('master1', 'node1'),
+                'host_count': 2,
                 'msg': 'One or more checks failed',
             },
         ],
@@ -56,30 +58,99 @@ import pytest
         [
             {
                 'host': ('master1', 'node1'),
+                'host_count': 2,
                 'msg': 'One or more checks failed',
                 'checks': (('test_check', 'error message'),),
             },
             {
                 'host': ('master2',),
+                'host_count': 1,
                 'msg': 'Some error happened',
             },
         ],
     ),
-    # if a failure contain an unhashable value, it will not be deduplicated
+    # unhashable values are compared by their text
     (
         [
             {
                 'host': 'master1',
                 'msg': {'unhashable': 'value'},
             },
+            {
+                'host': 'master2',
+                'msg': {'unhashable': 'value'},
+            },
         ],
         [
             {
-                'host': 'master1',
+                'host': ('master1', 'master2'),
+                'host_count': 2,
                 'msg': {'unhashable': 'value'},
             },
         ],
     ),
+    # messages differing only by host names, addresses, UUIDs and timestamps are grouped,
+    # the message of the first failure being kept
+    (
+        [
+            {
+                'host': 'node1.example.com',
+                'msg': 'node1 cannot reach 10.0.0.1:5000 at 2018-01-10T16:35:21Z (request 3c9b6a4e-8f1d-4d2a-9e7b-1a2b3c4d5e6f)',
+            },
+            {
+                'host': 'node2.example.com',
+                'msg': 'node2 cannot reach 10.0.0.2:5000 at 2018-01-10T16:35:24Z (request 0f9b6a4e-8f1d-4d2a-9e7b-1a2b3c4d5e6f)',
+            },
+            {
+                'host': 'node3.example.com',
+                'msg': 'node3 cannot reach 10.0.0.3:5000 at 2018-01-10T16:35:29Z (request 1c9b6a4e-8f1d-4d2a-9e7b-1a2b3c4d5e6f)',
+            },
+            {
+                'host': 'node4.example.com',
+                'msg': 'node3 cannot reach 10.0.0.4:5000 at 2018-01-10T16:35:29Z (request 1c9b6a4e-8f1d-4d2a-9e7b-1a2b3c4d5e6f)',
+            },
+        ],
+        [
+            {
+                'host': ('node1.example.com', 'node2.example.com', 'node3.example.com'),
+                'host_count': 3,
+                'msg': 'node1 cannot reach 10.0.0.1:5000 at 2018-01-10T16:35:21Z (request 3c9b6a4e-8f1d-4d2a-9e7b-1a2b3c4d5e6f)',
+            },
+            {
+                'host': ('node4.example.com',),
+                'host_count': 1,
+                'msg': 'node3 cannot reach 10.0.0.4:5000 at 2018-01-10T16:35:29Z (request 1c9b6a4e-8f1d-4d2a-9e7b-1a2b3c4d5e6f)',
+            },
+        ],
+    ),
 ])
 def test_deduplicate_failures(failures, deduplicated):
     assert deduplicate_failures(failures) == deduplicated
+
+
+def test_deduplicate_failures_samples_hosts():
+    failures = [{'host': 'node{:03}'.format(i), 'play': 'Install', 'msg': 'Registry unreachable'} for i in range(800)]
+
+    deduplicated = deduplicate_failures(failures, sample_size=3)
+
+    assert deduplicated == [{
+        'host': ('node000', 'node001', 'node002'),
+        'host_count': 800,
+        'play': 'Install',
+        'msg': 'Registry unreachable',
+    }]
+    assert format_failure(dict(deduplicated[0], task='Pull image'))[0].endswith(
+        'node000, node001, node002 and 797 more (800 hosts in total)')
+
+
+@pytest.mark.parametrize('message,host,masked', [
+    ('Timed out on master1', 'master1', 'Timed out on <host>'),
+    ('master10 is down', 'master1', 'master10 is down'),
+    ('node1.example.com and node1 failed', 'node1.example.com', '<host> and <host> failed'),
+    ('at 20180110163521Z and 16:35:21.123', None, 'at <timestamp> and <timestamp>'),
+    ('listen on [2001:db8::8a2e:370:7334]:443', None, 'listen on [<ip>]:443'),
+    ('Error: exit status 1', None, 'Error: exit status 1'),
+    ({'rc': 1}, None, "{'rc': 1}"),
+])
+def test_mask_message(message, host, masked):
+    assert mask_message(message, host) == masked